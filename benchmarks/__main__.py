@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from prettytable import PrettyTable
+
+from src.primitive_db.cache import query_cache
+
+from .suite import OPERATIONS, Environment, run_operation
+
+# Размеры таблиц по умолчанию (1 000 000 строк - по запросу: прогон
+# занимает несколько минут)
+DEFAULT_SIZES = (10_000, 100_000)
+
+# Допустимое ухудшение p50 относительно базового запуска (20%)
+DEFAULT_THRESHOLD = 0.2
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Бенчмарк основных операций базы данных на синтетических "
+                    "таблицах разного размера.",
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, metavar="N",
+        help="размеры таблиц в строках (по умолчанию 10000 100000)",
+    )
+    parser.add_argument(
+        "--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS,
+        metavar="OP", help=f"операции: {', '.join(OPERATIONS)}",
+    )
+    parser.add_argument(
+        "--ops", type=int, default=1000,
+        help="количество точечных операций (select, insert, ...) на размер",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="количество повторов операций над всей таблицей "
+             "(bulk_load, save, load)",
+    )
+    parser.add_argument("--storage", choices=["rows", "columnar"], default="rows",
+                        help="способ хранения таблиц в памяти")
+    parser.add_argument("--format", choices=["json", "binary"], default="json",
+                        dest="file_format", help="формат файлов таблиц")
+    parser.add_argument(
+        "--query-cache", action="store_true",
+        help="не отключать кэш результатов select (повторные условия будут "
+             "браться из кэша, а не выполняться)",
+    )
+    parser.add_argument("--seed", type=int, default=0,
+                        help="начальное значение генератора данных")
+    parser.add_argument("--output", metavar="FILE",
+                        help="сохранить результаты в JSON")
+    parser.add_argument(
+        "--compare", metavar="FILE",
+        help="сравнить с результатами предыдущего запуска (JSON из --output)",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD,
+        help="допустимое ухудшение p50 при сравнении (0.2 - на 20%%)",
+    )
+    return parser.parse_args(argv)
+
+
+def _run(args):
+    """Выполняет бенчмарк во временном каталоге и возвращает результаты"""
+    results = []
+    cwd = os.getcwd()
+    max_entries = query_cache.max_entries
+    if not args.query_cache:
+        query_cache.max_entries = 0
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="primitive_db_bench_") as tmp:
+            os.chdir(tmp)
+            os.mkdir("data")
+            try:
+                print(f"Подготовка таблицы на {size} строк...", file=sys.stderr)
+                env = Environment(size, args.storage, args.file_format, args.seed)
+                try:
+                    for operation in OPERATIONS:
+                        if operation not in args.operations:
+                            continue
+                        print(f"  {operation}", file=sys.stderr)
+                        results.append(
+                            run_operation(env, operation, args.ops, args.repeat))
+                finally:
+                    env.close()
+            finally:
+                os.chdir(cwd)
+    query_cache.max_entries = max_entries
+    return results
+
+
+def _print_results(results):
+    table = PrettyTable()
+    table.field_names = ["операция", "строк", "операций", "пропускная способность",
+                         "p50, мкс", "p99, мкс", "пик памяти, КиБ"]
+    for result in results:
+        table.add_row([
+            result["operation"], result["size"], result["ops"],
+            f'{result["throughput"]:,.0f} {result["unit"]}',
+            f'{result["p50_us"]:,.1f}', f'{result["p99_us"]:,.1f}',
+            f'{result["peak_kib"]:,.1f}',
+        ])
+    table.align = "r"
+    table.align["операция"] = "l"
+    print(table)
+
+
+def _compare(results, baseline, threshold):
+    """
+    Сравнивает результаты с базовым запуском.
+
+    Returns:
+        list: Операции, p50 которых ухудшился больше чем на threshold
+    """
+    previous = {(r["operation"], r["size"]): r for r in baseline["results"]}
+    table = PrettyTable()
+    table.field_names = ["операция", "строк", "p50 было", "p50 стало",
+                         "изменение", ""]
+    regressions = []
+    for result in results:
+        key = (result["operation"], result["size"])
+        if key not in previous:
+            continue
+        before, after = previous[key]["p50_us"], result["p50_us"]
+        change = after / before - 1 if before else 0.0
+        mark = ""
+        if change > threshold:
+            mark = "хуже"
+            regressions.append(key)
+        elif change < -threshold:
+            mark = "лучше"
+        table.add_row([key[0], key[1], f"{before:,.1f}", f"{after:,.1f}",
+                       f"{change:+.1%}", mark])
+    table.align = "r"
+    table.align["операция"] = "l"
+    print(table)
+    return regressions
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = _run(args)
+    _print_results(results)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "storage": args.storage,
+                "format": args.file_format,
+                "ops": args.ops,
+                "repeat": args.repeat,
+                "seed": args.seed,
+                "query_cache": args.query_cache,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.output}")
+
+    if baseline is not None:
+        regressions = _compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Ухудшение больше {args.threshold:.0%}: "
+                  + ", ".join(f"{op} ({size})" for op, size in regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
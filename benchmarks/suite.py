@@ -0,0 +1,306 @@
+import csv
+import gc
+import os
+import random
+import time
+import tracemalloc
+from itertools import islice
+
+from src.primitive_db.api import Database
+from src.primitive_db.core import format_table, insert_records, set_format, set_storage
+from src.primitive_db.utils import iter_import_file
+
+# Столбцы синтетической таблицы (ID добавляется автоматически)
+COLUMNS = {"name": "str", "age": "int", "score": "int", "active": "bool"}
+
+# Значения score равномерно распределены в [0, SCORE_RANGE)
+SCORE_RANGE = 1_000_000
+
+# Доля таблицы, попадающая в одну выборку по диапазону
+RANGE_FRACTION = 0.001
+
+# Количество строк, форматируемых одним вызовом format_table
+FORMAT_PAGE = 50
+
+# Порядок запуска важен: изменяющие операции идут после выборок,
+# сохранение - перед загрузкой (загрузка читает основной файл без журнала)
+OPERATIONS = (
+    "bulk_load",
+    "point_select",
+    "range_select",
+    "indexed_select",
+    "format_table",
+    "update",
+    "insert",
+    "delete",
+    "save",
+    "load",
+)
+
+# Операции, состоящие из одного тяжелого вызова на всю таблицу
+WHOLE_TABLE = ("bulk_load", "save", "load")
+
+_WORDS = ("alpha", "bravo", "delta", "echo", "kilo", "lima", "oscar", "tango")
+
+
+def generate_records(count, seed=0):
+    """
+    Генерирует синтетические записи таблицы бенчмарка.
+
+    Args:
+        count (int): Количество записей
+        seed (int): Начальное значение генератора (одинаковые данные
+            при одинаковом seed)
+
+    Returns:
+        generator: Записи {'столбец': значение} без ID
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "name": f"{rng.choice(_WORDS)}_{i}",
+            "age": rng.randrange(100),
+            "score": rng.randrange(SCORE_RANGE),
+            "active": rng.random() < 0.5,
+        }
+
+
+def percentile(sorted_values, fraction):
+    """Перцентиль отсортированного списка (ближайший ранг)"""
+    if not sorted_values:
+        return 0.0
+    rank = round(fraction * (len(sorted_values) - 1))
+    return sorted_values[rank]
+
+
+class Environment:
+    """
+    Окружение одного размера таблицы: база в текущем каталоге и
+    заполненная таблица bench с сортированным индексом по score.
+
+    Сброс на диск отключен (большой flush_interval), чтобы операции
+    в памяти измерялись без fsync; запись на диск измеряет операция save.
+    """
+
+    def __init__(self, size, storage="rows", file_format="json", seed=0):
+        self.size = size
+        self.storage = storage
+        self.file_format = file_format
+        self.rng = random.Random(seed)
+        self.db = Database(flush_interval=3600)
+        self._tables = 0
+        self.table = self.create_table("bench")
+        self.table.insert_many(generate_records(size, seed))
+        self.table.create_index("score", "sorted")
+        self.db.session.flush()
+
+    def create_table(self, name):
+        """Создает пустую таблицу бенчмарка с заданным хранением"""
+        db = self.db
+        table = db.create_table(name, COLUMNS)
+        metadata = db.session.metadata
+        if self.file_format == "binary":
+            set_format(metadata, name, "binary")
+        elif self.storage == "columnar":
+            set_storage(metadata, name, "columnar")
+        db.session.save_metadata(name)
+        return table
+
+    def new_table(self):
+        """Создает еще одну пустую таблицу (для массовой загрузки)"""
+        self._tables += 1
+        return self.create_table(f"bulk{self._tables}")
+
+    def random_ids(self, count):
+        """Различные ID существующих записей"""
+        return self.rng.sample(range(1, self.size + 1), min(count, self.size))
+
+    def close(self):
+        self.db.close()
+
+
+def _prepare_bulk_load(env, count):
+    # Файл импорта пишется заранее, измеряется только импорт, как в команде
+    # import: чтение CSV, проверка, вставка и контрольная точка на диск
+    path = f"bulk_{env.size}.csv"
+    if not os.path.exists(path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for record in generate_records(env.size, seed=1):
+                writer.writerow(record.values())
+    session = env.db.session
+
+    def bulk_load():
+        name = env.new_table().name
+        state = session.table(name, write=True)
+        journal = []
+        records = iter_import_file(path, session.metadata[name]["columns"])
+        insert_records(session.metadata, name, records, state.data,
+                       state.indexes, journal)
+        session.record(name, state.data, journal, checkpoint=True)
+        session.flush()
+
+    return [bulk_load] * count
+
+
+def _prepare_point_select(env, count):
+    get = env.table.get
+    return [lambda record_id=record_id: get(record_id)
+            for record_id in env.random_ids(count)]
+
+
+def _range_thunks(env, count, column, width, high):
+    find = env.db.prepare(f"select from bench where {column} >= ? "
+                          f"and {column} < ?")
+    starts = [env.rng.randrange(high - width) for _ in range(count)]
+    return [lambda start=start: list(find.execute(start, start + width))
+            for start in starts]
+
+
+def _prepare_range_select(env, count):
+    # Без индекса: полный просмотр таблицы, выбирается 1% записей
+    return _range_thunks(env, count, "age", 1, 100)
+
+
+def _prepare_indexed_select(env, count):
+    # По сортированному индексу score выбирается RANGE_FRACTION записей
+    width = int(SCORE_RANGE * RANGE_FRACTION)
+    return _range_thunks(env, count, "score", width, SCORE_RANGE)
+
+
+def _prepare_format_table(env, count):
+    columns = env.db.session.metadata["bench"]["columns"]
+    pages = []
+    for _ in range(count):
+        offset = env.rng.randrange(max(1, env.size - FORMAT_PAGE))
+        pages.append(list(islice(env.table.select(offset=offset), FORMAT_PAGE)))
+    return [lambda page=page: format_table(page, columns).get_string()
+            for page in pages]
+
+
+def _prepare_update(env, count):
+    update = env.db.prepare("update bench set active = ? where ID = ?")
+    return [lambda record_id=record_id: update.execute(True, record_id)
+            for record_id in env.random_ids(count)]
+
+
+def _prepare_insert(env, count):
+    insert = env.db.prepare("insert into bench values (?, ?, ?, ?)")
+    records = generate_records(count, seed=2)
+    return [lambda record=record: insert.execute(*record.values())
+            for record in records]
+
+
+def _prepare_delete(env, count):
+    delete = env.db.prepare("delete from bench where ID = ?")
+    return [lambda record_id=record_id: delete.execute(record_id)
+            for record_id in env.random_ids(count)]
+
+
+def _prepare_save(env, count):
+    session = env.db.session
+
+    def save():
+        # Контрольная точка: основной файл переписывается целиком с fsync
+        state = session.table("bench", write=True)
+        session.record("bench", state.data, [], checkpoint=True)
+        session.flush()
+    return [save] * count
+
+
+def _prepare_load(env, count):
+    def load():
+        db = Database()
+        try:
+            db.session.table("bench")
+        finally:
+            db.close()
+    return [load] * count
+
+
+_PREPARERS = {
+    "bulk_load": _prepare_bulk_load,
+    "point_select": _prepare_point_select,
+    "range_select": _prepare_range_select,
+    "indexed_select": _prepare_indexed_select,
+    "format_table": _prepare_format_table,
+    "update": _prepare_update,
+    "insert": _prepare_insert,
+    "delete": _prepare_delete,
+    "save": _prepare_save,
+    "load": _prepare_load,
+}
+
+
+def measure(thunks, memory_thunks):
+    """
+    Выполняет операции и измеряет время каждой и пиковую память.
+
+    Время измеряется без tracemalloc (он замедляет выделение памяти),
+    память - отдельным проходом по memory_thunks.
+
+    Returns:
+        dict: Количество операций, общее время, задержки p50/p99 и пиковый
+            прирост памяти за одну операцию
+    """
+    latencies = []
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()  # паузы сборщика мусора не приписываются случайной операции
+    try:
+        for thunk in thunks:
+            start = time.perf_counter()
+            thunk()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for thunk in memory_thunks:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            thunk()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "ops": len(latencies),
+        "total_s": total,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_operation(env, operation, ops, repeat=1):
+    """
+    Измеряет одну операцию на таблице окружения.
+
+    Args:
+        env (Environment): Окружение с заполненной таблицей
+        operation (str): Имя операции из OPERATIONS
+        ops (int): Количество точечных операций (для операций над всей
+            таблицей используется repeat)
+        repeat (int): Количество повторов операций над всей таблицей
+
+    Returns:
+        dict: Результат measure с именем операции, размером таблицы и
+            пропускной способностью (строк или операций в секунду)
+    """
+    whole = operation in WHOLE_TABLE
+    count = repeat if whole else ops
+    memory_count = 1 if whole else max(1, min(ops // 10, 100))
+    thunks = _PREPARERS[operation](env, count + memory_count)
+    result = measure(thunks[:count], thunks[count:])
+    rows = env.size if whole else 1
+    result["throughput"] = (rows * result["ops"] / result["total_s"]
+                            if result["total_s"] else 0.0)
+    result["unit"] = "rows/s" if whole else "ops/s"
+    return {"operation": operation, "size": env.size, **result}
@@ -1,8 +1,10 @@
-import time
 from functools import wraps
 
 import prompt
 
+from src.primitive_db.errors import TableExistsError, TableNotFoundError
+from src.primitive_db.metrics import metrics
+
 
 def handle_db_errors(func):
     """Декоратор для обработки ошибок базы данных"""
@@ -10,6 +12,8 @@ def handle_db_errors(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except (TableNotFoundError, TableExistsError) as e:
+            return f"Ошибка: {e}."
         except FileNotFoundError as e:
             return f"Ошибка: Файл данных не найден. {e}"
         except KeyError as e:
@@ -21,47 +25,47 @@ def handle_db_errors(func):
     return wrapper
 
 
+# Ответ на запросы подтверждения: None - спрашивать пользователя,
+# True/False - подтверждать или отклонять без вопроса (пакетный режим)
+_confirm_answer = None
+
+
+def set_confirm_policy(answer):
+    """Задает ответ на запросы подтверждения (None - спрашивать пользователя)"""
+    global _confirm_answer
+    _confirm_answer = answer
+
+
 def confirm_action(action_name):
     """Декоратор для подтверждения опасных операций"""
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            response = prompt.string(
-                f'Вы уверены, что хотите выполнить "{action_name}"? [y/n]: '
-            )
-            if response.lower() != 'y':
+            if _confirm_answer is None:
+                response = prompt.string(
+                    f'Вы уверены, что хотите выполнить "{action_name}"? [y/n]: '
+                )
+                confirmed = response.lower() == 'y'
+            else:
+                confirmed = _confirm_answer
+            if not confirmed:
                 return "Операция отменена."
             return func(*args, **kwargs)
         return wrapper
     return decorator
 
 
-def log_time(func):
-    """Декоратор для замера времени выполнения"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.monotonic()
-        result = func(*args, **kwargs)
-        end_time = time.monotonic()
-        duration = end_time - start_time
-        print(f"Функция {func.__name__} выполнилась за {duration:.3f} секунд.")
-        return result
-    return wrapper
-
-
-def create_cacher():
-    """Фабрика для создания кэшера с замыканием"""
-    cache = {}
-    
-    def cache_result(key, value_func):
-        if key in cache:
-            return cache[key]
-        result = value_func()
-        cache[key] = result
-        return result
-    
-    return cache_result
+def timed(phase):
+    """
+    Декоратор для замера времени выполнения как фазы phase (см. metrics).
 
-
-# Создаем глобальный кэшер
-cacher = create_cacher()
\ No newline at end of file
+    Пока сбор метрик выключен, функция вызывается без замера.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            return metrics.measure(phase, func, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,179 @@
+from .parser import parse_columns
+
+# Типы столбцов, допустимые для функций (count - любой столбец)
+_NUMERIC = ("int",)
+_ORDERED = ("int", "str", "bool")
+
+
+def item_label(function, column):
+    """Имя столбца результата: count(*), sum(score) или имя столбца"""
+    if function is None:
+        return column
+    return f"{function}({column or '*'})"
+
+
+def check_aggregates(columns, items, group_by):
+    """
+    Проверяет список select с агрегатными функциями по схеме таблицы.
+
+    Args:
+        columns (list): Столбцы таблицы ['имя:тип', ...]
+        items (list): Элементы списка select (см. parser.parse_select_list)
+        group_by (list): Столбцы группировки
+
+    Returns:
+        list: Столбцы результата ['имя:тип', ...]
+
+    Raises:
+        ValueError: Если столбца нет, тип не подходит функции или столбец
+            без функции не входит в GROUP BY
+    """
+    types = dict(parse_columns(columns))
+    for column in group_by:
+        if column not in types:
+            raise ValueError(f'Столбец "{column}" не существует')
+    if not items:
+        raise ValueError("укажите агрегатные функции или столбцы GROUP BY")
+    result = []
+    for function, column in items:
+        if column is not None and column not in types:
+            raise ValueError(f'Столбец "{column}" не существует')
+        if function is None and column not in group_by:
+            raise ValueError(
+                f'Столбец "{column}" должен входить в GROUP BY '
+                "или быть аргументом агрегатной функции"
+            )
+        if function in ("sum", "avg") and types[column] not in _NUMERIC:
+            raise ValueError(
+                f"{function} ожидает столбец типа int, "
+                f'"{column}" имеет тип {types[column]}'
+            )
+        if function in ("min", "max") and types[column] not in _ORDERED:
+            raise ValueError(f'{function} не поддерживает столбец "{column}"')
+        if function in ("count", "sum"):
+            col_type = "int"
+        elif function == "avg":
+            col_type = "float"
+        else:
+            col_type = types[column]
+        result.append(f"{item_label(function, column)}:{col_type}")
+    return result
+
+
+def _count(state, value):
+    return state if value is None else state + 1
+
+
+def _sum(state, value):
+    if value is None:
+        return state
+    return value if state is None else state + value
+
+
+def _min(state, value):
+    if value is None or (state is not None and state <= value):
+        return state
+    return value
+
+
+def _max(state, value):
+    if value is None or (state is not None and state >= value):
+        return state
+    return value
+
+
+def _avg(state, value):
+    if value is not None:
+        state[0] += value
+        state[1] += 1
+    return state
+
+
+_UPDATES = {"count": _count, "sum": _sum, "min": _min, "max": _max, "avg": _avg}
+
+
+def _initial(function):
+    if function == "count":
+        return 0
+    if function == "avg":
+        return [0, 0]
+    return None
+
+
+def _combine(function, state, other):
+    """Объединяет состояния функции, накопленные по разным частям таблицы"""
+    if function == "count":
+        return state + other
+    if function == "avg":
+        return [state[0] + other[0], state[1] + other[1]]
+    if function == "sum":
+        return _sum(state, other)
+    return _UPDATES[function](state, other)  # min и max
+
+
+def _final(function, state):
+    if function == "avg":
+        total, count = state
+        return total / count if count else None
+    return state
+
+
+def accumulate(rows, group_width, functions):
+    """
+    Накапливает агрегаты за один проход с группировкой по хэшу.
+
+    Память пропорциональна количеству групп, а не строк: для каждой группы
+    хранится только состояние агрегатов (счетчик, сумма, минимум...).
+
+    Args:
+        rows (iterable): Кортежи значений строк - сначала group_width
+            значений группировки, затем аргументы функций
+        group_width (int): Количество столбцов группировки
+        functions (list): Функции по порядку аргументов
+
+    Returns:
+        dict: {(значения группировки): [состояния агрегатов]} в порядке
+            появления групп (см. merge и finalize)
+    """
+    updates = [(i, _UPDATES[function])
+               for i, function in enumerate(functions, start=group_width)]
+    initial = [_initial(function) for function in functions]
+    groups = {}
+    for values in rows:
+        key = values[:group_width]
+        states = groups.get(key)
+        if states is None:
+            states = groups[key] = [
+                list(state) if type(state) is list else state for state in initial
+            ]
+        for slot, (i, update) in enumerate(updates):
+            states[slot] = update(states[slot], values[i])
+    return groups
+
+
+def merge(groups, other, functions):
+    """Добавляет к groups состояния групп other (см. accumulate)"""
+    for key, states in other.items():
+        current = groups.get(key)
+        if current is None:
+            groups[key] = states
+            continue
+        for slot, function in enumerate(functions):
+            current[slot] = _combine(function, current[slot], states[slot])
+    return groups
+
+
+def finalize(groups, group_width, functions):
+    """
+    Вычисляет значения агрегатов по накопленным состояниям.
+
+    Returns:
+        dict: {(значения группировки): [значения агрегатов]}; без
+            группировки - одна группа () даже для пустой выборки
+    """
+    if not group_width and not groups:
+        groups = {(): [_initial(function) for function in functions]}
+    return {
+        key: [_final(function, state) for function, state in zip(functions, states)]
+        for key, states in groups.items()
+    }
@@ -0,0 +1,379 @@
+from contextlib import contextmanager
+
+from .cache import make_cache_key
+from .columnar import ColumnarTable
+from .core import (
+    add_table,
+    delete_records,
+    insert_records,
+    iter_select,
+    register_index,
+    remove_table,
+    require_table,
+    update_records,
+    validate_values,
+)
+from .errors import ValidationError
+from .parser import PLACEHOLDER, parse_columns, parse_where
+from .plans import parse_command, validated
+from .predicates import Predicate, compile_where
+from .session import DEFAULT_FLUSH_INTERVAL, Session
+
+
+def _compile(columns, where):
+    """
+    Компилирует условие в Predicate с проверкой по схеме таблицы.
+
+    Args:
+        columns (list): Столбцы таблицы ['имя:тип', ...]
+        where (str | dict | tuple | Predicate | None): Условие - текст
+            ("age > 30 and name = 'Ann'"), словарь равенств, дерево
+            (см. parser.parse_where) или уже скомпилированное условие
+
+    Raises:
+        ValidationError: Если условие некорректно или не подходит к схеме
+    """
+    if isinstance(where, str):
+        where = validated(parse_where, where)
+    return validated(compile_where, where, columns)
+
+
+class Table:
+    """
+    Таблица базы данных.
+
+    Методы принимают и возвращают значения Python: записи - словари
+    {'столбец': значение}, ошибки - исключения из модуля errors.
+    """
+
+    def __init__(self, db, name):
+        self._db = db
+        self.name = name
+
+    def __repr__(self):
+        return f"Table({self.name!r})"
+
+    @property
+    def columns(self):
+        """Столбцы таблицы: список пар (имя, тип), первым идет ID"""
+        return parse_columns(self._schema())
+
+    def _schema(self):
+        return require_table(self._db.session.metadata, self.name)["columns"]
+
+    def insert(self, **values):
+        """
+        Добавляет запись.
+
+        Returns:
+            int: ID новой записи
+        """
+        return self.insert_many([values])[0]
+
+    def insert_many(self, records):
+        """
+        Добавляет записи одной операцией (все или ни одной).
+
+        Args:
+            records (iterable): Записи {'столбец': значение} без ID
+
+        Returns:
+            list: ID новых записей
+
+        Raises:
+            ValidationError: Если запись не подходит к схеме (в том числе
+                int вне 64-битного диапазона колоночной таблицы)
+        """
+        session = self._db.session
+        require_table(session.metadata, self.name)
+        state = session.table(self.name, write=True)
+        journal = []
+        ids = validated(insert_records, session.metadata, self.name, records,
+                        state.data, state.indexes, journal)
+        if ids:
+            session.record(self.name, state.data, journal)
+        self._db.maybe_flush()
+        return list(ids)
+
+    def select(self, where=None, limit=None, offset=0):
+        """
+        Возвращает итератор записей, удовлетворяющих условию.
+
+        Записи выдаются по мере нахождения; каждая запись - новый словарь,
+        который можно изменять.
+        """
+        predicate = _compile(self._schema(), where)
+        return self._db.select(self.name, predicate, offset, limit)
+
+    def get(self, record_id):
+        """Возвращает запись по ID или None"""
+        records = self._db.execute(f"select from {self.name} where ID = ?",
+                                   record_id)
+        return next(records, None)
+
+    def count(self, where=None):
+        """Возвращает количество записей, удовлетворяющих условию"""
+        if where is None:
+            return self._db.session.row_count(self.name)
+        return sum(1 for _ in self.select(where))
+
+    def update(self, values, where):
+        """
+        Изменяет записи, удовлетворяющие условию.
+
+        Args:
+            values (dict): Новые значения {'столбец': значение}
+            where: Условие (см. select)
+
+        Returns:
+            int: Количество измененных записей
+        """
+        predicate = _compile(self._schema(), where)
+        validate_values(self._schema(), values)
+        return self._db.update(self.name, values, predicate)
+
+    def delete(self, where=None):
+        """
+        Удаляет записи, удовлетворяющие условию (без условия - все записи).
+
+        Returns:
+            int: Количество удаленных записей
+        """
+        predicate = _compile(self._schema(), where)
+        return self._db.delete(self.name, predicate)
+
+    def create_index(self, column, kind="hash"):
+        """Создает индекс по столбцу: 'hash' (равенство) или 'sorted'"""
+        session = self._db.session
+        session.lock_table(self.name)
+        register_index(session.metadata, self.name, column, kind)
+        session.save_metadata(self.name)
+        session.add_index(self.name, column)
+
+
+class Statement:
+    """
+    Подготовленная команда языка команд (select, insert, update, delete).
+
+    Команда разбирается один раз (план берется из общего кэша планов, см.
+    plans.PlanCache) и проверяется по схеме таблицы; если схема изменилась,
+    план проверяется заново при следующем выполнении. Вместо значений в
+    команде можно писать ?, их значения передаются в execute:
+
+        find = db.prepare("select from users where age > ? limit ?")
+        seniors = list(find.execute(65, 10))
+
+    execute возвращает: для select - итератор записей-словарей, для insert -
+    список ID новых записей, для update и delete - количество записей.
+    """
+
+    def __init__(self, db, command):
+        self._db = db
+        self.command = command
+        plan, params = validated(parse_command, command)
+        if plan is None:
+            raise ValidationError(f"Команду нельзя подготовить: {command}")
+        self._plan = plan
+        self._params = params
+        self._slots = [i for i, value in enumerate(params)
+                       if value is PLACEHOLDER]
+        self.kind = plan.kind
+        self.table = plan.table
+        validated(plan.prepare, db.session.metadata)
+
+    def execute(self, *args):
+        """
+        Выполняет команду (см. описание класса).
+
+        Args:
+            *args: Значения параметров ? в порядке их следования
+
+        Raises:
+            ValidationError: Если количество или типы значений не подходят
+        """
+        if len(args) != len(self._slots):
+            raise ValidationError(
+                f"ожидается {len(self._slots)} значений параметров, "
+                f"получено {len(args)}"
+            )
+        params = self._params
+        if args:
+            params = list(params)
+            for slot, value in zip(self._slots, args):
+                params[slot] = value
+        return self._db.run(self._plan, params)
+
+
+class Database:
+    """
+    Встраиваемая база данных: программный интерфейс без разбора сообщений.
+
+    Работает с тем же каталогом данных и метаданными, что и командная
+    строка, и с теми же блокировками, поэтому может использоваться
+    одновременно с другими процессами.
+
+    Пример:
+        with Database() as db:
+            users = db.create_table("users", {"name": "str", "age": int})
+            user_id = users.insert(name="Ann", age=30)
+            adults = list(users.select("age >= 18", limit=10))
+            find = db.prepare("select from users where age > ?")
+            seniors = list(find.execute(65))
+    """
+
+    def __init__(self, metadata_path="db_meta.json",
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.session = Session(flush_interval, metadata_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def tables(self):
+        """Возвращает список имен таблиц"""
+        return list(self.session.metadata)
+
+    def table(self, name):
+        """
+        Возвращает таблицу по имени.
+
+        Raises:
+            TableNotFoundError: Если таблица не существует
+        """
+        require_table(self.session.metadata, name)
+        return Table(self, name)
+
+    def create_table(self, name, columns):
+        """
+        Создает таблицу.
+
+        Args:
+            name (str): Имя таблицы
+            columns (dict | list): {'имя': тип} (тип - 'int', 'str', 'bool'
+                или int, str, bool) либо список ['имя:тип', ...]; столбец
+                ID добавляется автоматически
+
+        Returns:
+            Table: Созданная таблица
+        """
+        if isinstance(columns, dict):
+            columns = [
+                f"{col}:{getattr(col_type, '__name__', col_type)}"
+                for col, col_type in columns.items()
+            ]
+        self.session.lock_table(name)
+        add_table(self.session.metadata, name, columns)
+        self.session.save_metadata(name)
+        return Table(self, name)
+
+    def drop_table(self, name):
+        """Удаляет таблицу (без запроса подтверждения)"""
+        self.session.lock_table(name)
+        remove_table(self.session.metadata, name)
+        self.session.save_metadata(name)
+        self.session.drop_table(name)
+
+    def prepare(self, command):
+        """
+        Подготавливает команду для многократного выполнения.
+
+        Returns:
+            Statement: Подготовленная команда
+
+        Raises:
+            ValidationError: Если команда некорректна
+            TableNotFoundError: Если таблица не существует
+        """
+        return Statement(self, command)
+
+    def execute(self, command, *args):
+        """Выполняет команду со значениями параметров ? (см. Statement)"""
+        return self.prepare(command).execute(*args)
+
+    def run(self, plan, params):
+        """Выполняет план команды (см. plans.StatementPlan.run)"""
+        result = validated(plan.run, self.session, params)
+        if plan.kind == "select":
+            if plan.join is not None:
+                return result  # записи соединения создаются заново
+            return self._copies(plan.table, result)
+        self.maybe_flush()
+        return list(result) if plan.kind == "insert" else result
+
+    def select(self, table_name, predicate=None, offset=0, limit=None):
+        """Итератор записей таблицы по скомпилированному условию"""
+        state = self.session.table(table_name)
+        cache_key = None
+        if isinstance(predicate, Predicate):
+            cache_key = make_cache_key(table_name, state.version, predicate)
+        records = iter_select(state.data, predicate, state.indexes, cache_key,
+                              offset, limit, self._stats(table_name),
+                              state.partitions)
+        return self._copies(table_name, records)
+
+    def _stats(self, table_name):
+        """Статистика таблицы для планировщика (None, если не собрана)"""
+        return self.session.metadata[table_name].get("stats")
+
+    def _copies(self, table_name, records):
+        """Записи, которые можно изменять, не затрагивая таблицу"""
+        if isinstance(self.session.table(table_name).data, ColumnarTable):
+            return records  # строки колоночной таблицы создаются заново
+        return map(dict, records)
+
+    def update(self, table_name, values, predicate):
+        """Изменяет записи по проверенным значениям и условию"""
+        state = self.session.table(table_name, write=True)
+        journal = []
+        data, count = validated(update_records, state.data, values, predicate,
+                                state.indexes, journal,
+                                self._stats(table_name), state.partitions)
+        if count:
+            self.session.record(table_name, data, journal)
+        self.maybe_flush()
+        return count
+
+    def delete(self, table_name, predicate=None):
+        """Удаляет записи по условию (None - все записи)"""
+        state = self.session.table(table_name, write=True)
+        journal = []
+        data, count = delete_records(state.data, predicate, state.indexes,
+                                     journal, self._stats(table_name),
+                                     state.partitions)
+        if count:
+            self.session.record(table_name, data, journal)
+        self.maybe_flush()
+        return count
+
+    def begin(self):
+        """Начинает транзакцию"""
+        self.session.begin()
+
+    def commit(self):
+        """Фиксирует транзакцию или сохраняет накопленные изменения"""
+        self.session.commit()
+
+    def rollback(self):
+        """Отменяет транзакцию"""
+        self.session.rollback()
+
+    @contextmanager
+    def transaction(self):
+        """Выполняет блок в транзакции: commit при успехе, иначе rollback"""
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def maybe_flush(self):
+        """Сбрасывает изменения на диск, если истек интервал сброса"""
+        self.session.maybe_flush()
+
+    def close(self):
+        """Сохраняет изменения и освобождает блокировки"""
+        self.session.close()
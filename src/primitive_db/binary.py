@@ -0,0 +1,189 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import compress
+
+from .columnar import BoolColumn, ColumnarTable, IntColumn, StrColumn
+from .parser import parse_columns
+
+# Формат файла таблицы (.tbl):
+#   MAGIC | версия (uint16) | длина заголовка (uint32) | заголовок (JSON)
+#   | блоки столбцов, выровненные по 8 байт
+# Заголовок хранит схему, количество строк и смещения блоков:
+#   int  - 'data': int64 на строку
+#   bool - 'data': битовое множество, младший бит - первая строка
+#   str  - 'codes': uint32 на строку (код в словаре),
+#          'offsets': int64 * (размер словаря + 1), 'heap': строки в UTF-8
+# Все числа записаны в порядке байт little-endian.
+MAGIC = b"PDBT"
+VERSION = 1
+_PREFIX = struct.Struct("<4sHI")
+_ALIGN = 8
+
+
+def _little_endian(values):
+    """Приводит array к порядку байт little-endian"""
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _column_blocks(col, live):
+    """
+    Возвращает блоки столбца {'имя_блока': bytes}.
+
+    live - маска неудаленных строк или None, если удаленных строк нет.
+    """
+    if isinstance(col, IntColumn):
+        values = col.buffer()
+        if live is not None:
+            values = array("q", compress(values, live))
+        elif isinstance(values, memoryview):
+            return {"data": values.tobytes()}
+        return {"data": _little_endian(values).tobytes()}
+    if isinstance(col, BoolColumn):
+        if live is None:
+            return {"data": bytes(col.buffer())}
+        packed = BoolColumn()
+        for value in compress(col, live):
+            packed.append(value)
+        return {"data": bytes(packed.buffer())}
+    codes = col.buffer()
+    if live is not None:
+        codes = array("I", compress(codes, live))
+    if isinstance(codes, memoryview):
+        codes_data = codes.tobytes()
+    else:
+        codes_data = _little_endian(codes).tobytes()
+    heap = bytearray()
+    offsets = array("q", [0])
+    for value in col.dictionary():
+        heap += value.encode("utf-8")
+        offsets.append(len(heap))
+    return {
+        "codes": codes_data,
+        "offsets": _little_endian(offsets).tobytes(),
+        "heap": bytes(heap),
+    }
+
+
+def write_table_file(filepath, table):
+    """
+    Записывает колоночную таблицу в бинарный файл и сбрасывает его на диск.
+
+    Args:
+        filepath (str): Путь к файлу .tbl
+        table (ColumnarTable): Данные таблицы
+    """
+    live = table.live_mask()
+    blocks = {}
+    payload = []
+    offset = 0
+    for name, _ in table.schema:
+        blocks[name] = {}
+        for block_name, data in _column_blocks(table.column(name), live).items():
+            blocks[name][block_name] = [offset, len(data)]
+            padding = -len(data) % _ALIGN
+            payload.append(data + b"\0" * padding)
+            offset += len(data) + padding
+
+    header = json.dumps({
+        "columns": table.columns,
+        "rows": len(table),
+        "blocks": blocks,
+    }, separators=(",", ":")).encode("utf-8")
+    header += b" " * (-(_PREFIX.size + len(header)) % _ALIGN)
+
+    with open(filepath, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for data in payload:
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_table(filepath, table):
+    """Атомарно записывает колоночную таблицу в бинарный файл"""
+    tmp_path = f"{filepath}.tmp"
+    write_table_file(tmp_path, table)
+    os.replace(tmp_path, filepath)
+
+
+def _read_prefix(f):
+    magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Файл не является таблицей поддерживаемой версии")
+    return header_len
+
+
+def read_header(filepath):
+    """
+    Читает только заголовок бинарного файла таблицы.
+
+    Returns:
+        dict: {'columns': [...], 'rows': int, 'blocks': {...}}
+    """
+    with open(filepath, "rb") as f:
+        header_len = _read_prefix(f)
+        return json.loads(f.read(header_len))
+
+
+class BinaryTableFile:
+    """
+    Бинарный файл таблицы, отображенный в память (mmap).
+
+    Столбцы int и bool, а также коды строк читаются без копирования -
+    как memoryview поверх отображения. Страницы файла подгружаются
+    операционной системой только для тех столбцов, к которым есть обращение.
+    """
+
+    def __init__(self, filepath):
+        with open(filepath, "rb") as f:
+            header_len = _read_prefix(f)
+            self.header = json.loads(f.read(header_len))
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data_start = _PREFIX.size + header_len
+        self.columns = self.header["columns"]
+        self.row_count = self.header["rows"]
+
+    def _block(self, column, block_name):
+        offset, length = self.header["blocks"][column][block_name]
+        start = self._data_start + offset
+        return memoryview(self._map)[start:start + length]
+
+    def _native(self, block, typecode):
+        # На big-endian платформах чтение без копирования невозможно
+        if sys.byteorder == "little":
+            return block.cast(typecode)
+        values = array(typecode)
+        values.frombytes(block)
+        values.byteswap()
+        return values
+
+    def load_column(self, column, col_type):
+        """Создает объект столбца поверх данных файла"""
+        if col_type == "int":
+            return IntColumn(self._native(self._block(column, "data"), "q"))
+        if col_type == "bool":
+            return BoolColumn(self._block(column, "data"), self.row_count)
+        offsets = self._native(self._block(column, "offsets"), "q")
+        heap = self._block(column, "heap")
+        values = [
+            sys.intern(str(heap[offsets[i]:offsets[i + 1]], "utf-8"))
+            for i in range(len(offsets) - 1)
+        ]
+        return StrColumn(self._native(self._block(column, "codes"), "I"), values)
+
+    def to_table(self):
+        """Возвращает колоночную таблицу с ленивой загрузкой столбцов"""
+        loaders = {
+            name: (lambda name=name, col_type=col_type:
+                   self.load_column(name, col_type))
+            for name, col_type in parse_columns(self.columns)
+        }
+        return ColumnarTable.from_loaders(self.columns, self.row_count, loaders)
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+
+from .predicates import condition_key
+
+# Ограничения кэша по умолчанию
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_ROWS = 100_000
+
+
+def make_cache_key(table_name, version, where_clause):
+    """
+    Строит ключ кэша для запроса.
+
+    Условие нормализуется (см. predicates.condition_key): порядок операндов
+    не важен, а тип значения учитывается, чтобы True и 1 не давали
+    одинаковый ключ.
+    """
+    return table_name, version, condition_key(where_clause)
+
+
+class QueryCache:
+    """
+    Кэш результатов SELECT с вытеснением давно неиспользуемых записей (LRU).
+
+    Ключ содержит имя таблицы и версию ее данных, поэтому после изменения
+    таблицы старые результаты недостижимы; invalidate() дополнительно
+    освобождает занимаемую ими память.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_rows=DEFAULT_MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Возвращает результат из кэша или None, если его нет"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Сохраняет результат, если он не превышает max_rows"""
+        if len(result) <= self.max_rows and key not in self._entries:
+            self._entries[key] = result
+            self._rows += len(result)
+            self._evict()
+
+    def get_or_compute(self, key, value_func):
+        """Возвращает результат из кэша или вычисляет и сохраняет его"""
+        result = self.get(key)
+        if result is None:
+            result = value_func()
+            self.put(key, result)
+        return result
+
+    def _evict(self):
+        while (len(self._entries) > self.max_entries
+               or self._rows > self.max_rows):
+            _, result = self._entries.popitem(last=False)
+            self._rows -= len(result)
+            self.evictions += 1
+
+    def invalidate(self, table_name):
+        """Удаляет из кэша все результаты для таблицы"""
+        stale = [key for key in self._entries if key[0] == table_name]
+        for key in stale:
+            self._rows -= len(self._entries.pop(key))
+        self.invalidations += len(stale)
+
+    def clear(self):
+        """Полностью очищает кэш"""
+        self._entries.clear()
+        self._rows = 0
+
+    def stats(self):
+        """Возвращает счетчики кэша в виде словаря"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "rows": self._rows,
+        }
+
+
+# Глобальный кэш запросов
+query_cache = QueryCache()
@@ -0,0 +1,156 @@
+import json
+import queue
+import socket
+from contextlib import contextmanager
+
+# Адрес сервера по умолчанию (клиент не зависит от модулей движка)
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class ClientError(Exception):
+    """Сервер вернул ошибку выполнения команды"""
+
+
+class Connection:
+    """Одно соединение с сервером базы данных"""
+
+    def __init__(self, socket_path=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 timeout=None):
+        if socket_path:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(socket_path)
+        else:
+            self._sock = socket.create_connection((host, port), timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rb")
+        self.closed = False
+
+    def request(self, command):
+        """
+        Отправляет команду и возвращает ответ сервера.
+
+        Returns:
+            dict: Ответ ({'columns', 'rows'} для select, иначе {'message'})
+
+        Raises:
+            ClientError: Если команда завершилась ошибкой
+            ConnectionError: Если соединение разорвано
+        """
+        data = json.dumps({"command": command}, ensure_ascii=False)
+        try:
+            self._sock.sendall(data.encode("utf-8") + b"\n")
+            line = self._file.readline()
+        except OSError:
+            self.close()
+            raise
+        if not line:
+            self.close()
+            raise ConnectionError("сервер закрыл соединение")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise ClientError(response["error"])
+        return response
+
+    def execute(self, command):
+        """Выполняет команду и возвращает сообщение сервера"""
+        return self.request(command).get("message", "")
+
+    def select(self, command):
+        """
+        Выполняет select и возвращает записи.
+
+        Returns:
+            list: Записи в виде словарей {'столбец': значение}
+        """
+        response = self.request(command)
+        columns = response["columns"]
+        return [dict(zip(columns, row)) for row in response["rows"]]
+
+    def close(self):
+        """Закрывает соединение"""
+        if not self.closed:
+            self.closed = True
+            self._file.close()
+            self._sock.close()
+
+
+class Client:
+    """
+    Клиент сервера базы данных с пулом соединений.
+
+    Соединения открываются по мере необходимости и возвращаются в пул после
+    каждой команды, поэтому клиент можно использовать из нескольких потоков.
+    В пуле хранится не более pool_size свободных соединений.
+
+    Пример:
+        client = Client(socket_path="db.sock")
+        client.execute('insert into users values ("Ann", 30)')
+        rows = client.select("select from users where age > 18")
+        with client.transaction() as conn:
+            conn.execute("update users set age = 31 where ID = 1")
+    """
+
+    def __init__(self, socket_path=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 pool_size=4, timeout=None):
+        self._address = {"socket_path": socket_path, "host": host, "port": port,
+                         "timeout": timeout}
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    @contextmanager
+    def connection(self):
+        """Берет соединение из пула (или открывает новое) на время блока"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = Connection(**self._address)
+        try:
+            yield conn
+        finally:
+            if not conn.closed:
+                try:
+                    self._pool.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+
+    def execute(self, command):
+        """Выполняет команду и возвращает сообщение сервера"""
+        with self.connection() as conn:
+            return conn.execute(command)
+
+    def select(self, command):
+        """Выполняет select и возвращает записи в виде словарей"""
+        with self.connection() as conn:
+            return conn.select(command)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Выполняет блок в транзакции на одном соединении.
+
+        При выходе из блока транзакция фиксируется, при исключении - отменяется.
+        """
+        with self.connection() as conn:
+            conn.execute("begin")
+            try:
+                yield conn
+            except BaseException:
+                if not conn.closed:
+                    conn.execute("rollback")
+                raise
+            conn.execute("commit")
+
+    def close(self):
+        """Закрывает все соединения пула"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
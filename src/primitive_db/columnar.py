@@ -0,0 +1,498 @@
+import sys
+from array import array
+from itertools import compress, islice, repeat
+from operator import and_, eq
+
+from .parser import parse_columns
+
+# Доля удаленных строк, после которой таблица уплотняется
+COMPACT_RATIO = 0.5
+COMPACT_MIN_ROWS = 1024
+
+# Сколько строк-кандидатов проверяется через материализованные записи
+FILTER_ROWS_LIMIT = 64
+
+# Диапазон значений столбца int (array('q'))
+INT_MIN, INT_MAX = -2**63, 2**63 - 1
+
+# Разложение байта на 8 булевых значений (младший бит - первый)
+_BITS = tuple(tuple(bool(byte >> i & 1) for i in range(8)) for byte in range(256))
+
+
+def _to_array(typecode, buffer):
+    """Копирует буфер (например, memoryview файла) в изменяемый array"""
+    values = array(typecode)
+    values.frombytes(buffer.cast("B"))
+    return values
+
+
+class IntColumn:
+    """
+    Столбец int: значения хранятся в array('q') по 8 байт.
+
+    Столбец может ссылаться на memoryview отображенного в память файла;
+    копия в array создается только при первом изменении.
+    """
+
+    type_name = "int"
+
+    def __init__(self, values=None):
+        self._values = array("q") if values is None else values
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, pos):
+        return self._values[pos]
+
+    def __setitem__(self, pos, value):
+        self._writable()[pos] = value
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def _writable(self):
+        if isinstance(self._values, memoryview):
+            self._values = _to_array("q", self._values)
+        return self._values
+
+    def append(self, value):
+        self._writable().append(value)
+
+    def extend(self, values):
+        self._writable().extend(values)
+
+    def truncate(self, length):
+        """Удаляет значения начиная с номера строки length"""
+        del self._writable()[length:]
+
+    def buffer(self):
+        """Значения столбца в виде буфера для записи на диск"""
+        return self._values
+
+    def validate(self, value):
+        if not isinstance(value, int) or not INT_MIN <= value <= INT_MAX:
+            raise ValueError("Ожидается 64-битный int")
+
+    def validate_range(self, values):
+        """Проверяет, что целые значения values помещаются в 64 бита"""
+        if values and (min(values) < INT_MIN or max(values) > INT_MAX):
+            raise ValueError("Ожидается 64-битный int")
+
+    def mask(self, op, value):
+        """Возвращает итератор флагов op(значение строки, value) по строкам"""
+        return map(op, self._values, repeat(value))
+
+    def isin_mask(self, values):
+        """Возвращает итератор флагов вхождения значения строки в values"""
+        return map(values.__contains__, self._values)
+
+    def nbytes(self):
+        return self._values.itemsize * len(self._values)
+
+
+class BoolColumn:
+    """Столбец bool: битовое множество, по одному биту на строку"""
+
+    type_name = "bool"
+
+    def __init__(self, bits=None, length=0):
+        self._bits = bytearray() if bits is None else bits
+        self._len = length
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, pos):
+        return bool(self._bits[pos >> 3] >> (pos & 7) & 1)
+
+    def __setitem__(self, pos, value):
+        bits = self._writable()
+        if value:
+            bits[pos >> 3] |= 1 << (pos & 7)
+        else:
+            bits[pos >> 3] &= ~(1 << (pos & 7)) & 0xFF
+
+    def __iter__(self):
+        bits = (bit for byte in self._bits for bit in _BITS[byte])
+        return islice(bits, self._len)
+
+    def _writable(self):
+        if isinstance(self._bits, memoryview):
+            self._bits = bytearray(self._bits)
+        return self._bits
+
+    def append(self, value):
+        if self._len & 7 == 0:
+            self._writable().append(0)
+        self._len += 1
+        self[self._len - 1] = value
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def truncate(self, length):
+        """Удаляет значения начиная с номера строки length"""
+        bits = self._writable()
+        del bits[(length + 7) >> 3:]
+        if length & 7:
+            bits[-1] &= (1 << (length & 7)) - 1
+        self._len = length
+
+    def buffer(self):
+        """Биты столбца в виде буфера для записи на диск"""
+        return self._bits
+
+    def validate(self, value):
+        if not isinstance(value, bool):
+            raise ValueError("Ожидается bool")
+
+    def mask(self, op, value):
+        return map(op, self, repeat(value))
+
+    def isin_mask(self, values):
+        return map(values.__contains__, self)
+
+    def nbytes(self):
+        return len(self._bits)
+
+
+class StrColumn:
+    """
+    Столбец str со словарным кодированием.
+
+    Каждая уникальная строка хранится один раз (интернирована), а для каждой
+    строки таблицы хранится 4-байтовый код в array('I').
+    """
+
+    type_name = "str"
+
+    def __init__(self, codes=None, values=None):
+        self._codes = array("I") if codes is None else codes
+        self._values = [] if values is None else values
+        self._lookup = {value: code for code, value in enumerate(self._values)}
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, pos):
+        return self._values[self._codes[pos]]
+
+    def __setitem__(self, pos, value):
+        self._writable()[pos] = self._encode(value)
+
+    def __iter__(self):
+        return map(self._values.__getitem__, self._codes)
+
+    def _encode(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self._values)
+            self._values.append(sys.intern(value))
+            self._lookup[value] = code
+        return code
+
+    def _writable(self):
+        if isinstance(self._codes, memoryview):
+            self._codes = _to_array("I", self._codes)
+        return self._codes
+
+    def append(self, value):
+        self._writable().append(self._encode(value))
+
+    def extend(self, values):
+        self._writable().extend(map(self._encode, values))
+
+    def truncate(self, length):
+        """Удаляет значения начиная с номера строки length"""
+        del self._writable()[length:]
+
+    def dictionary(self):
+        """Список уникальных строк столбца (индекс в списке - код)"""
+        return self._values
+
+    def buffer(self):
+        """Коды строк столбца в виде буфера для записи на диск"""
+        return self._codes
+
+    def validate(self, value):
+        if not isinstance(value, str):
+            raise ValueError("Ожидается str")
+
+    def mask(self, op, value):
+        """
+        Условие вычисляется один раз для каждой строки словаря, а затем
+        результат выбирается по коду каждой строки таблицы.
+        """
+        if op is eq:
+            code = self._lookup.get(value) if isinstance(value, str) else None
+            if code is None:
+                return repeat(False, len(self._codes))
+            return map(eq, self._codes, repeat(code))
+        flags = bytes(op(item, value) for item in self._values)
+        return map(flags.__getitem__, self._codes)
+
+    def isin_mask(self, values):
+        flags = bytes(item in values for item in self._values)
+        return map(flags.__getitem__, self._codes)
+
+    def nbytes(self):
+        heap = sum(sys.getsizeof(value) for value in self._values)
+        return self._codes.itemsize * len(self._codes) + heap
+
+
+_COLUMN_TYPES = {"int": IntColumn, "bool": BoolColumn, "str": StrColumn}
+
+
+class ColumnarTable:
+    """
+    Колоночное представление таблицы в памяти.
+
+    Значения каждого столбца хранятся в типизированном контейнере, построенном
+    по схеме из метаданных. Строки адресуются номером позиции; удаленные
+    строки помечаются в _live и вычищаются при уплотнении. Словари записей
+    создаются только при обходе таблицы (например, при выводе).
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.schema = parse_columns(self.columns)
+        self._columns = {
+            name: _COLUMN_TYPES[col_type]() for name, col_type in self.schema
+        }
+        self._loaders = {}
+        self._live = bytearray()
+        self._deleted = 0
+
+    @classmethod
+    def from_records(cls, columns, records):
+        """Строит колоночную таблицу из списка записей-словарей"""
+        table = cls(columns)
+        for record in records:
+            table.append(record)
+        return table
+
+    @classmethod
+    def from_loaders(cls, columns, row_count, loaders):
+        """
+        Строит таблицу, столбцы которой загружаются при первом обращении.
+
+        Args:
+            columns (list): Список столбцов в формате ['имя:тип', ...]
+            row_count (int): Количество строк
+            loaders (dict): {'столбец': функция без аргументов, возвращающая
+                объект столбца}
+        """
+        table = cls(columns)
+        table._columns = {}
+        table._loaders = dict(loaders)
+        table._live = bytearray(b"\x01" * row_count)
+        return table
+
+    def _column(self, name):
+        """Возвращает столбец, загружая его при необходимости (None, если нет)"""
+        col = self._columns.get(name)
+        if col is None and name in self._loaders:
+            col = self._columns[name] = self._loaders.pop(name)()
+        return col
+
+    def _all_columns(self):
+        """Возвращает все столбцы в порядке схемы, загружая недостающие"""
+        return {name: self._column(name) for name, _ in self.schema}
+
+    def column(self, name):
+        """Объект столбца по имени (KeyError, если столбца нет)"""
+        col = self._column(name)
+        if col is None:
+            raise KeyError(name)
+        return col
+
+    def live_mask(self):
+        """Байтовая маска неудаленных строк (None, если удаленных строк нет)"""
+        return self._live if self._deleted else None
+
+    def __len__(self):
+        return len(self._live) - self._deleted
+
+    def __iter__(self):
+        return self.rows(self.positions())
+
+    def slot_count(self):
+        """Количество номеров строк, включая удаленные строки"""
+        return len(self._live)
+
+    def positions(self):
+        """Возвращает итератор номеров неудаленных строк"""
+        return compress(range(len(self._live)), self._live)
+
+    def max_id(self):
+        """Максимальный ID среди неудаленных строк (0 для пустой таблицы)"""
+        return max(compress(self.column("ID"), self._live), default=0)
+
+    def value(self, pos, column):
+        """Значение столбца в строке pos (None, если столбца нет)"""
+        col = self._column(column)
+        return None if col is None else col[pos]
+
+    def row(self, pos):
+        """Материализует строку pos в словарь"""
+        return {name: col[pos] for name, col in self._all_columns().items()}
+
+    def rows(self, positions):
+        """Материализует строки по номерам позиций"""
+        columns = list(self._all_columns().items())
+        return ({name: col[pos] for name, col in columns} for pos in positions)
+
+    def iter_column(self, column):
+        """Перебирает пары (значение, номер строки) по неудаленным строкам"""
+        col = self.column(column)
+        return compress(zip(col, range(len(self._live))), self._live)
+
+    def validate(self, values):
+        """
+        Проверяет, что значения {'столбец': значение} можно записать в столбцы.
+
+        Raises:
+            ValueError: Если тип значения не подходит (или int вне 64 бит)
+        """
+        for name, value in values.items():
+            try:
+                self.column(name).validate(value)
+            except ValueError as e:
+                raise ValueError(f"{e} для столбца {name}") from None
+
+    def append(self, record):
+        """Добавляет запись-словарь и возвращает номер ее строки"""
+        self.validate(record)
+        for name, col in self._all_columns().items():
+            col.append(record[name])
+        self._live.append(1)
+        return len(self._live) - 1
+
+    def extend(self, records):
+        """
+        Добавляет пачку записей-словарей, типы значений которых уже
+        проверены по схеме.
+
+        Диапазон значений int проверяется до изменения столбцов, поэтому
+        при ошибке таблица остается прежней.
+
+        Returns:
+            range: Номера строк добавленных записей
+
+        Raises:
+            ValueError: Если значение int не помещается в 64 бита
+        """
+        start = len(self._live)
+        columns = self._all_columns()
+        values = {name: [record[name] for record in records] for name in columns}
+        for name, col in columns.items():
+            if isinstance(col, IntColumn):
+                try:
+                    col.validate_range(values[name])
+                except ValueError as e:
+                    raise ValueError(f"{e} для столбца {name}") from None
+        for name, col in columns.items():
+            col.extend(values[name])
+        self._live.extend(b"\x01" * len(records))
+        return range(start, len(self._live))
+
+    def truncate(self, length):
+        """Удаляет строки начиная с номера length (отмена вставки)"""
+        for col in self._columns.values():
+            if len(col) > length:
+                col.truncate(length)
+        del self._live[length:]
+        self._deleted = self._live.count(0)
+
+    def iter_scan(self, predicate):
+        """
+        Лениво перебирает номера строк, удовлетворяющих условию.
+
+        Условие (predicates.Predicate) вычисляется сравнением целых столбцов;
+        для AND остальные операнды проверяются только для строк, отобранных
+        первым (см. Predicate.scan_plan).
+        """
+        mask, residual = predicate.scan_plan(self)
+        if self._deleted:
+            mask = map(and_, mask, self._live)
+        positions = compress(range(len(self._live)), mask)
+        return positions if residual is None else filter(residual, positions)
+
+    def scan(self, predicate):
+        """Возвращает список строк, удовлетворяющих условию (см. iter_scan)"""
+        return list(self.iter_scan(predicate))
+
+    def filter(self, positions, predicate):
+        """Оставляет из positions неудаленные строки, удовлетворяющие условию"""
+        live = self._live
+        if len(positions) <= FILTER_ROWS_LIMIT:
+            # Немного кандидатов (например, поиск по ID) - дешевле проверить
+            # материализованные строки, чем компилировать проверку по столбцам
+            return [pos for pos in positions
+                    if live[pos] and predicate.test(self.row(pos))]
+        test = predicate.position_test(self)
+        return [pos for pos in positions if live[pos] and test(pos)]
+
+    def update(self, positions, set_clause):
+        """Записывает новые значения столбцов в строки positions"""
+        self.validate(set_clause)
+        for column, value in set_clause.items():
+            col = self.column(column)
+            for pos in positions:
+                col[pos] = value
+
+    def delete(self, positions):
+        """
+        Помечает строки как удаленные.
+
+        Returns:
+            bool: True, если таблица была уплотнена и номера строк изменились
+        """
+        for pos in positions:
+            if self._live[pos]:
+                self._live[pos] = 0
+                self._deleted += 1
+        if (self._deleted >= COMPACT_MIN_ROWS
+                and self._deleted >= len(self._live) * COMPACT_RATIO):
+            self.compact()
+            return True
+        return False
+
+    def clear(self):
+        """Удаляет все строки"""
+        self.__init__(self.columns)
+
+    def compact(self):
+        """Перестраивает столбцы без удаленных строк"""
+        rows = list(self)
+        self.clear()
+        for record in rows:
+            self.append(record)
+
+    def nbytes(self):
+        """Приблизительный объем памяти, занимаемый данными столбцов"""
+        return len(self._live) + sum(
+            col.nbytes() for col in self._columns.values()
+            if not isinstance(col.buffer(), memoryview)
+        )
+
+
+class Selection:
+    """
+    Результат выборки из колоночной таблицы.
+
+    Хранит только номера строк; словари записей создаются при обходе,
+    то есть в момент вывода.
+    """
+
+    def __init__(self, table, positions):
+        self.table = table
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        return self.table.rows(self.positions)
@@ -1,62 +1,308 @@
+from bisect import bisect_left
+from itertools import chain, compress, islice
+from operator import itemgetter
+
 from prettytable import PrettyTable
 
 from src.decorators import (  # меняем импорт
-    cacher,
     confirm_action,
     handle_db_errors,
-    log_time,
+    timed,
 )
 
-from .parser import parse_value
+from .aggregates import accumulate, finalize, item_label
+from .cache import query_cache
+from .columnar import ColumnarTable, Selection
+from .errors import TableExistsError, TableNotFoundError, ValidationError
+from .indexes import (
+    INDEX_KINDS,
+    PRIMARY_KEY,
+    add_to_indexes,
+    build_index,
+    remove_from_indexes,
+)
+from .joins import choose_sides
+from .metrics import metrics
+from .ordering import order_records
+from .parser import Param, parse_columns, parse_value
+from .planner import choose_path
+from .predicates import compile_where
 
+STORAGE_KINDS = ("rows", "columnar")
+FILE_FORMATS = ("json", "binary")
 
-@handle_db_errors
-def create_table(metadata, table_name, columns):
+# Размер пачки записей при массовой вставке
+BATCH_SIZE = 10_000
+
+# До скольких удаляемых записей они удаляются из списка записей на месте
+# (иначе список пересобирается за один проход)
+POINT_DELETE_ROWS = 64
+
+_PY_TYPES = {"int": int, "str": str, "bool": bool}
+
+
+def _index_candidates(table_data, predicate, indexes, stats):
+    """
+    Кандидаты по индексам, если планировщик выбрал их, иначе None.
+
+    Индекс выдает строки в порядке своих ключей; кандидаты возвращаются в
+    порядке таблицы, чтобы результат (и LIMIT/OFFSET) не зависел от
+    выбранного способа доступа. Записи лежат в таблице по возрастанию ID.
+    """
+    if not indexes:
+        return None
+    path = choose_path(predicate.condition, indexes, stats, len(table_data))
+    if path.node is None:
+        return None
+    candidates = predicate.candidates(indexes, path.node)
+    if candidates is None:
+        return None
+    if isinstance(table_data, ColumnarTable):
+        return sorted(candidates)
+    return sorted(candidates, key=itemgetter(PRIMARY_KEY))
+
+
+def _partitioned(partitions):
+    """Просматривать ли таблицу по разделам (см. partitions.Partitions)"""
+    return partitions is not None and len(partitions) > 1
+
+
+def _iter_refs(table_data, where_clause, indexes=None, stats=None,
+               partitions=None):
+    """
+    Лениво перебирает записи, удовлетворяющие условию WHERE.
+
+    Условие компилируется один раз (см. predicates.compile_where). Способ
+    доступа выбирает планировщик по оценке стоимости (см.
+    planner.choose_path, stats - статистика таблицы): кандидаты по индексу
+    (равенство, IN, диапазон по упорядоченному индексу) или полный
+    просмотр таблицы. Полный просмотр большой таблицы идет по разделам
+    partitions: разделы, не подходящие по зонам min/max, пропускаются,
+    остальные просматриваются параллельно. Для колоночной таблицы
+    возвращаются номера строк, иначе - сами записи.
+
+    При включенном сборе метрик учитываются просмотренные строки (для
+    колоночной таблицы - все кандидаты или все строки сразу: условие
+    проверяется по столбцам целиком).
+    """
+    predicate = compile_where(where_clause)
+    columnar = isinstance(table_data, ColumnarTable)
+    candidates = _index_candidates(table_data, predicate, indexes, stats)
+    if candidates is None and _partitioned(partitions):
+        refs = partitions.scan(predicate)
+        if refs is not None:
+            return refs
+    rows = table_data if candidates is None else candidates
+    if metrics.enabled:
+        if columnar:
+            metrics.count_rows(scanned=len(rows))
+        else:
+            rows = metrics.scanning(rows)
+    if candidates is not None:
+        if columnar:
+            return iter(table_data.filter(candidates, predicate))
+        return filter(predicate.test, rows)
+    if columnar:
+        return table_data.iter_scan(predicate)
+    return filter(predicate.test, rows)
+
+
+def _find_records(table_data, where_clause, indexes=None, stats=None,
+                  partitions=None):
+    """Возвращает список записей, удовлетворяющих условию (см. _iter_refs)"""
+    return list(_iter_refs(table_data, where_clause, indexes, stats, partitions))
+
+
+def _cached_stream(refs, cache_key, to_record, make_result):
+    """
+    Выдает записи по мере их нахождения и кэширует полный результат.
+
+    Результат попадает в кэш, только если выборка была прочитана до конца.
+    Выборка больше query_cache.max_rows в кэш все равно не поместится -
+    такие ссылки перестают накапливаться, чтобы просмотр большой таблицы
+    не держал в памяти ссылки на все выданные строки.
+    """
+    collected = []
+    for ref in refs:
+        if collected is not None:
+            collected.append(ref)
+            if len(collected) > query_cache.max_rows:
+                collected = None
+        yield to_record(ref)
+    if collected is not None:
+        query_cache.put(cache_key, make_result(collected))
+
+
+def _max_id(table_data):
+    """Возвращает максимальный ID в таблице (0 для пустой таблицы)"""
+    if isinstance(table_data, ColumnarTable):
+        return table_data.max_id()
+    return max((record["ID"] for record in table_data), default=0)
+
+
+def _next_id(metadata, table_name, table_data):
+    """
+    Возвращает ID для новой записи.
+    
+    Берется из счетчика next_id в метаданных таблицы; если счетчика еще нет,
+    он вычисляется один раз по максимальному ID.
+    """
+    table_meta = metadata[table_name]
+    if "next_id" not in table_meta:
+        table_meta["next_id"] = _max_id(table_data) + 1
+    return table_meta["next_id"]
+
+
+def _validate_batch(batch, schema, first_line):
+    """
+    Проверяет пачку записей по схеме таблицы.
+    
+    Args:
+        batch (list): Записи {'столбец': значение} без ID
+        schema (tuple): Пары (имя, тип) столбцов без ID
+        first_line (int): Номер первой записи пачки (для сообщений)
+    
+    Raises:
+        ValidationError: Если запись не соответствует схеме
+    """
+    names = {name for name, _ in schema}
+    for offset, record in enumerate(batch):
+        if record.keys() != names:
+            unknown = sorted(record.keys() - names)
+            missing = sorted(names - record.keys())
+            raise ValidationError(
+                f"запись {first_line + offset}: неизвестные столбцы {unknown}, "
+                f"отсутствуют {missing}"
+            )
+    for name, col_type in schema:
+        py_type = _PY_TYPES[col_type]
+        for offset, record in enumerate(batch):
+            if not isinstance(record[name], py_type):
+                raise ValidationError(
+                    f"запись {first_line + offset}: ожидается {col_type} "
+                    f"для столбца {name}"
+                )
+
+
+def validate_values(columns, values):
+    """
+    Проверяет новые значения столбцов (например, SET в update) по схеме.
+    
+    Args:
+        columns (list): Столбцы таблицы в формате ['имя:тип', ...]
+        values (dict): Значения {'столбец': значение}
+    
+    Raises:
+        ValidationError: Если столбца нет, это ID или тип значения не совпадает
+            (параметры parser.Param пропускаются - их значения еще не заданы)
+    """
+    types = dict(parse_columns(columns))
+    for name, value in values.items():
+        if name == PRIMARY_KEY:
+            raise ValidationError(f"столбец {PRIMARY_KEY} изменять нельзя")
+        if name not in types:
+            raise ValidationError(f'Столбец "{name}" не существует')
+        if type(value) is not _PY_TYPES[types[name]] and not isinstance(
+                value, Param):
+            raise ValidationError(
+                f"ожидается {types[name]} для столбца {name}"
+            )
+
+
+def require_table(metadata, table_name):
+    """
+    Возвращает метаданные таблицы.
+    
+    Raises:
+        TableNotFoundError: Если таблица не существует
+    """
+    try:
+        return metadata[table_name]
+    except KeyError:
+        raise TableNotFoundError(
+            f'Таблица "{table_name}" не существует'
+        ) from None
+
+
+def add_table(metadata, table_name, columns):
     """
-    Создает новую таблицу в базе данных.
+    Регистрирует новую таблицу в метаданных.
     
     Args:
         metadata (dict): Метаданные всех таблиц
         table_name (str): Имя создаваемой таблицы
-        columns (list): Список столбцов в формате ['имя:тип', ...]
+        columns (list): Список столбцов в формате ['имя:тип', ...] (без ID)
     
     Returns:
-        str: Сообщение об успешном создании или ошибке
+        list: Столбцы таблицы, включая ID
     
     Raises:
-        ValueError: Если имя таблицы или столбцов некорректно
-        KeyError: Если таблица уже существует
+        TableExistsError: Если таблица уже существует
+        ValidationError: Если имя таблицы или столбцов некорректно
     """
     if table_name in metadata:
-        return f'Ошибка: Таблица "{table_name}" уже существует.'
+        raise TableExistsError(f'Таблица "{table_name}" уже существует')
     
     # Проверяем имя таблицы
     if not table_name or not table_name.isidentifier():
-        return f'Некорректное имя таблицы: "{table_name}"'
+        raise ValidationError(f'Некорректное имя таблицы: "{table_name}"')
     
     # Добавляем ID столбец
-    all_columns = ["ID:int"] + columns
+    all_columns = ["ID:int"] + list(columns)
     
     # Проверяем типы и имена столбцов
     valid_types = {"int", "str", "bool"}
     for col in all_columns:
         if ":" not in col:
-            return f'Некорректный формат столбца: "{col}". Используйте "имя:тип"'
+            raise ValidationError(
+                f'Некорректный формат столбца: "{col}". Используйте "имя:тип"'
+            )
         
         col_name, col_type = col.split(":")
         
         # Проверяем имя столбца
         if not col_name or not col_name.isidentifier():
-            return f'Некорректное имя столбца: "{col_name}"'
+            raise ValidationError(f'Некорректное имя столбца: "{col_name}"')
         
         # Проверяем тип
         if col_type not in valid_types:
-            return f'Неподдерживаемый тип данных: "{col_type}". Допустимые: int, str, bool' # noqa: E501
+            raise ValidationError(
+                f'Неподдерживаемый тип данных: "{col_type}". '
+                "Допустимые: int, str, bool"
+            )
     
-    metadata[table_name] = all_columns
-    cols_str = ", ".join(all_columns)
+    # Счетчик next_id не задается: при первой вставке он вычисляется по
+    # максимальному ID (см. _next_id) - на случай, если на диске остались
+    # файлы прежней таблицы с тем же именем
+    metadata[table_name] = {"columns": all_columns, "indexes": {}}
+    return all_columns
+
+@handle_db_errors
+def create_table(metadata, table_name, columns):
+    """
+    Создает новую таблицу в базе данных (см. add_table).
+    
+    Args:
+        metadata (dict): Метаданные всех таблиц
+        table_name (str): Имя создаваемой таблицы
+        columns (list): Список столбцов в формате ['имя:тип', ...]
+    
+    Returns:
+        str: Сообщение об успешном создании или ошибке
+    """
+    cols_str = ", ".join(add_table(metadata, table_name, columns))
     return f'Таблица "{table_name}" успешно создана со столбцами: {cols_str}'
 
+def remove_table(metadata, table_name):
+    """
+    Удаляет таблицу из метаданных.
+    
+    Raises:
+        TableNotFoundError: Если таблица не существует
+    """
+    require_table(metadata, table_name)
+    del metadata[table_name]
+
 @handle_db_errors
 @confirm_action("удаление таблицы")
 def drop_table(metadata, table_name):
@@ -73,10 +319,7 @@ def drop_table(metadata, table_name):
     Note:
         Требует подтверждения пользователя перед выполнением
     """
-    if table_name not in metadata:
-        return f'Ошибка: Таблица "{table_name}" не существует.'
-    
-    del metadata[table_name]
+    remove_table(metadata, table_name)
     return f'Таблица "{table_name}" успешно удалена.'
 
 @handle_db_errors
@@ -94,9 +337,99 @@ def list_tables(metadata):
         return "Нет созданных таблиц."
     return "\n".join(f"- {table}" for table in metadata.keys())
 
+def register_index(metadata, table_name, column, kind="hash"):
+    """
+    Регистрирует индекс по столбцу таблицы в метаданных.
+    
+    Raises:
+        TableNotFoundError: Если таблица не существует
+        ValidationError: Если столбца нет, тип индекса не поддерживается
+            или индекс уже существует
+    """
+    table_meta = require_table(metadata, table_name)
+    col_names = [col.split(":")[0] for col in table_meta["columns"]]
+    if column not in col_names:
+        raise ValidationError(
+            f'Столбец "{column}" не существует в таблице "{table_name}"'
+        )
+    if kind not in INDEX_KINDS:
+        raise ValidationError(
+            f'Неподдерживаемый тип индекса: "{kind}". Допустимые: hash, sorted'
+        )
+    if column in table_meta["indexes"]:
+        raise ValidationError(f'Индекс по столбцу "{column}" уже существует')
+    
+    table_meta["indexes"][column] = kind
+
 @handle_db_errors
-@log_time
-def insert(metadata, table_name, values, table_data):
+def create_index(metadata, table_name, column, kind="hash"):
+    """
+    Регистрирует индекс по столбцу таблицы (см. register_index).
+    
+    Args:
+        metadata (dict): Метаданные всех таблиц
+        table_name (str): Имя таблицы
+        column (str): Имя индексируемого столбца
+        kind (str): Тип индекса: 'hash' (равенство) или 'sorted' (диапазоны)
+    
+    Returns:
+        str: Сообщение об успешном создании или ошибке
+    """
+    register_index(metadata, table_name, column, kind)
+    return f'Индекс {kind} по столбцу "{column}" таблицы "{table_name}" успешно создан.' # noqa: E501
+
+@handle_db_errors
+def set_storage(metadata, table_name, storage):
+    """
+    Задает способ хранения таблицы в памяти.
+    
+    Args:
+        metadata (dict): Метаданные всех таблиц
+        table_name (str): Имя таблицы
+        storage (str): 'rows' (список записей) или 'columnar' (по столбцам)
+    
+    Returns:
+        str: Сообщение об успешном изменении или ошибке
+    """
+    if table_name not in metadata:
+        return f'Ошибка: Таблица "{table_name}" не существует.'
+    if storage not in STORAGE_KINDS:
+        return f'Неподдерживаемый способ хранения: "{storage}". Допустимые: rows, columnar' # noqa: E501
+    if storage == "rows" and metadata[table_name].get("format") == "binary":
+        return 'Ошибка: Бинарный формат файла требует хранения columnar.'
+    
+    metadata[table_name]["storage"] = storage
+    return f'Способ хранения таблицы "{table_name}" успешно изменен на {storage}.'
+
+@handle_db_errors
+def set_format(metadata, table_name, file_format):
+    """
+    Задает формат основного файла таблицы на диске.
+    
+    Args:
+        metadata (dict): Метаданные всех таблиц
+        table_name (str): Имя таблицы
+        file_format (str): 'json' или 'binary' (столбцы с чтением через mmap)
+    
+    Returns:
+        str: Сообщение об успешном изменении или ошибке
+    
+    Note:
+        Бинарный формат автоматически включает колоночное хранение в памяти
+    """
+    if table_name not in metadata:
+        return f'Ошибка: Таблица "{table_name}" не существует.'
+    if file_format not in FILE_FORMATS:
+        return f'Неподдерживаемый формат файла: "{file_format}". Допустимые: json, binary' # noqa: E501
+    
+    metadata[table_name]["format"] = file_format
+    if file_format == "binary":
+        metadata[table_name]["storage"] = "columnar"
+    return f'Формат файла таблицы "{table_name}" успешно изменен на {file_format}.' # noqa: E501
+
+@handle_db_errors
+@timed("execute")
+def insert(metadata, table_name, values, table_data, indexes=None, journal=None):
     """
     Добавляет новую запись в таблицу.
     
@@ -104,32 +437,32 @@ def insert(metadata, table_name, values, table_data):
         metadata (dict): Метаданные всех таблиц
         table_name (str): Имя таблицы
         values (list): Список значений для вставки
-        table_data (list): Существующие данные таблицы
+        table_data (list | ColumnarTable): Существующие данные таблицы
+        indexes (dict, optional): Индексы таблицы {'столбец': индекс}
+        journal (list, optional): Список, в который добавляется запись журнала
     
     Returns:
         tuple: (обновленные данные таблицы, сообщение о результате)
     
     Note:
         Автоматически генерирует ID для новой записи
-        Логирует время выполнения операции
+        Время выполнения учитывается в метриках (фаза execute)
     """
     if table_name not in metadata:
         return f'Ошибка: Таблица "{table_name}" не существует.'
 
-    columns = metadata[table_name]
+    columns = metadata[table_name]["columns"]
     
     # Проверяем количество значений (без ID)
     if len(values) != len(columns) - 1:
         return f'Ошибка: Ожидается {len(columns)-1} значений, получено {len(values)}'
     
     # Генерируем ID
-    existing_ids = [record["ID"] for record in table_data]
-    new_id = max(existing_ids) + 1 if existing_ids else 1
+    new_id = _next_id(metadata, table_name, table_data)
     
     # Создаем запись
     record = {"ID": new_id}
-    for i, col_def in enumerate(columns[1:]):  # пропускаем ID
-        col_name, col_type = col_def.split(":")
+    for i, (col_name, col_type) in enumerate(parse_columns(columns)[1:]):
         value = parse_value(values[i])
         
         # Валидация типа
@@ -142,46 +475,471 @@ def insert(metadata, table_name, values, table_data):
         
         record[col_name] = value
     
-    table_data.append(record)
+    if isinstance(table_data, ColumnarTable):
+        add_to_indexes(indexes, record, table_data.append(record))
+    else:
+        table_data.append(record)
+        add_to_indexes(indexes, record)
+    metadata[table_name]["next_id"] = new_id + 1
+    if journal is not None:
+        journal.append({"op": "insert", "row": record})
     return table_data, f'Запись с ID={new_id} успешно добавлена в таблицу "{table_name}".' #noqa 501
 
+def _rollback_insert(metadata, table_name, table_data, start, next_id):
+    """Отменяет частично выполненную массовую вставку"""
+    metadata[table_name]["next_id"] = next_id
+    if isinstance(table_data, ColumnarTable):
+        table_data.truncate(start)
+    else:
+        del table_data[start:]
+
+def insert_records(metadata, table_name, records, table_data, indexes=None,
+                   journal=None):
+    """
+    Добавляет в таблицу множество записей за одну операцию.
+    
+    Записи читаются потоком и проверяются пачками по BATCH_SIZE.
+    При ошибке валидации вставка отменяется целиком.
+    
+    Args:
+        metadata (dict): Метаданные всех таблиц
+        table_name (str): Имя таблицы
+        records (iterable): Записи {'столбец': значение} без ID
+        table_data (list | ColumnarTable): Существующие данные таблицы
+        indexes (dict, optional): Индексы таблицы {'столбец': индекс}
+        journal (list, optional): Список, в который добавляется запись журнала
+    
+    Returns:
+        range: ID добавленных записей
+    
+    Raises:
+        TableNotFoundError: Если таблица не существует
+        ValueError: Если запись не соответствует схеме
+    """
+    schema = parse_columns(require_table(metadata, table_name)["columns"])[1:]
+    columnar = isinstance(table_data, ColumnarTable)
+    first_id = _next_id(metadata, table_name, table_data)
+    start = table_data.slot_count() if columnar else len(table_data)
+    inserted = []
+    count = 0
+    
+    records = iter(records)
+    try:
+        while True:
+            batch = [record for _, record in zip(range(BATCH_SIZE), records)]
+            if not batch:
+                break
+            _validate_batch(batch, schema, count + 1)
+            new_rows = [
+                {"ID": first_id + count + i, **record}
+                for i, record in enumerate(batch)
+            ]
+            if columnar:
+                refs = table_data.extend(new_rows)
+            else:
+                table_data.extend(new_rows)
+                refs = new_rows
+            for record, ref in zip(new_rows, refs):
+                add_to_indexes(indexes, record, ref)
+            inserted.extend(new_rows)
+            count += len(batch)
+    except Exception:
+        _rollback_insert(metadata, table_name, table_data, start, first_id)
+        for col, index in (indexes or {}).items():
+            indexes[col] = build_index(col, index.kind, table_data)
+        raise
+    
+    metadata[table_name]["next_id"] = first_id + count
+    if journal is not None and inserted:
+        journal.append({"op": "insert_many", "rows": inserted})
+    return range(first_id, first_id + count)
+
+@handle_db_errors
+@timed("execute")
+def insert_many(metadata, table_name, records, table_data, indexes=None,
+                journal=None):
+    """
+    Добавляет в таблицу множество записей (см. insert_records).
+    
+    Returns:
+        tuple: (обновленные данные таблицы, сообщение о результате)
+    """
+    ids = insert_records(metadata, table_name, records, table_data, indexes,
+                         journal)
+    return table_data, f'В таблицу "{table_name}" успешно добавлено записей: {len(ids)}.' # noqa: E501
+
 @handle_db_errors
-@log_time
-def select(table_data, columns, where_clause=None):
+@timed("execute")
+def select(table_data, columns, where_clause=None, indexes=None, cache_key=None):
     """
     Выполняет запрос на выборку данных из таблицы.
     
     Args:
-        table_data (list): Данные таблицы
+        table_data (list | ColumnarTable): Данные таблицы
         columns (list): Список столбцов таблицы
-        where_clause (dict, optional): Условия фильтрации {'столбец': значение}
+        where_clause (tuple | dict, optional): Условие (см. parser.parse_where)
+            или словарь {'столбец': значение}
+        indexes (dict, optional): Индексы таблицы {'столбец': индекс}
+        cache_key (tuple, optional): Ключ кэша (см. cache.make_cache_key);
+            без ключа результат не кэшируется
     
     Returns:
-        list: Отфильтрованные данные таблицы
+        list | Selection: Отфильтрованные данные таблицы (для колоночной
+            таблицы - выборка, строки которой создаются при выводе)
     
     Note:
         Использует кэширование для одинаковых запросов
-        Логирует время выполнения операции
+        Время выполнения учитывается в метриках (фаза execute)
     """
-    cache_key = f"select_{hash(str((columns, where_clause)))}"
     def perform_select():
         if not table_data:
             return []
         # Фильтрация
         if where_clause:
-            filtered_data = []
-            for record in table_data:
-                match = True
-                for col, val in where_clause.items():
-                    if record.get(col) != val:
-                        match = False
-                        break
-                if match:
-                    filtered_data.append(record)
-            return filtered_data
+            matched = _find_records(table_data, where_clause, indexes)
+            if isinstance(table_data, ColumnarTable):
+                return Selection(table_data, matched)
+            return matched
         else:
             return table_data
-    return cacher(cache_key, perform_select)
+    if cache_key is None or not where_clause:
+        return perform_select()
+    return query_cache.get_or_compute(cache_key, perform_select)
+
+def order_index(table_data, predicate, indexes, column, stats=None):
+    """
+    Индекс, в порядке которого можно выдать записи без сортировки, или None.
+
+    Подходят упорядоченный индекс по столбцу и индекс по ID: ID выдаются
+    по возрастанию, поэтому порядок ID - это порядок таблицы. Если
+    планировщик выбрал для условия поиск по индексу, найденных кандидатов
+    выгоднее отсортировать (None).
+    """
+    index = (indexes or {}).get(column)
+    if index is None or index.kind == "hash":
+        return None
+    if predicate is not None and choose_path(predicate.condition, indexes, stats,
+                                             len(table_data)).node is not None:
+        return None
+    return index
+
+def _reversed_refs(table_data):
+    """Ссылки на строки таблицы от последней к первой"""
+    if isinstance(table_data, ColumnarTable):
+        positions = range(table_data.slot_count() - 1, -1, -1)
+        live = table_data.live_mask()
+        return positions if live is None else compress(positions, reversed(live))
+    return reversed(table_data)
+
+def _iter_ordered(table_data, where_clause, indexes, cache_key, offset, limit,
+                  stats, partitions, order_by):
+    """
+    Выборка в порядке ORDER BY: обход индекса (см. order_index) или отбор
+    и сортировка найденных записей (см. ordering.order_records).
+    """
+    column, descending = order_by
+    predicate = compile_where(where_clause)
+    index = order_index(table_data, predicate, indexes, column, stats)
+    if index is None:
+        records = iter_select(table_data, predicate, indexes, cache_key,
+                              stats=stats, partitions=partitions)
+        return order_records(records, column, descending, offset, limit)
+    
+    columnar = isinstance(table_data, ColumnarTable)
+    if index.kind == "sorted":
+        refs = index.ordered(descending)
+    elif descending:
+        refs = _reversed_refs(table_data)
+    else:
+        refs = table_data.positions() if columnar else iter(table_data)
+    if metrics.enabled:
+        refs = metrics.scanning(refs)
+    if predicate is not None:
+        test = predicate.position_test(table_data) if columnar else predicate.test
+        refs = filter(test, refs)
+    records = table_data.rows(refs) if columnar else refs
+    stop = None if limit is None else offset + limit
+    return islice(records, offset, stop)
+
+def iter_select(table_data, where_clause=None, indexes=None, cache_key=None,
+                offset=0, limit=None, stats=None, partitions=None, order_by=None):
+    """
+    Выполняет выборку потоком: записи выдаются по мере их нахождения.
+    
+    Время до первой записи не зависит от размера таблицы, а при LIMIT
+    просмотр прекращается, как только набрано нужное число записей.
+    
+    Args:
+        table_data (list | ColumnarTable): Данные таблицы
+        where_clause (tuple | dict, optional): Условие (см. parser.parse_where)
+            или словарь {'столбец': значение}
+        indexes (dict, optional): Индексы таблицы {'столбец': индекс}
+        cache_key (tuple, optional): Ключ кэша (см. cache.make_cache_key)
+        offset (int): Сколько первых записей пропустить
+        limit (int, optional): Максимальное количество записей
+        stats (dict, optional): Статистика таблицы для выбора способа
+            доступа (см. planner.collect_stats)
+        partitions (Partitions, optional): Разделы таблицы для полного
+            просмотра (см. partitions.Partitions)
+        order_by (tuple, optional): (столбец, по убыванию) - порядок записей
+            (без него - порядок таблицы при любом способе доступа);
+            по упорядоченному индексу столбца и по ID записи выдаются без
+            сортировки (см. order_index), иначе с LIMIT отбираются кучей,
+            а без LIMIT сортируются (см. ordering.order_records)
+    
+    Returns:
+        iterator: Записи-словари
+    """
+    if order_by is not None:
+        return _iter_ordered(table_data, where_clause, indexes, cache_key,
+                             offset, limit, stats, partitions, order_by)
+    stop = None if limit is None else offset + limit
+    columnar = isinstance(table_data, ColumnarTable)
+    if not where_clause:
+        return islice(iter(table_data), offset, stop)
+    
+    cached = query_cache.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        return islice(iter(cached), offset, stop)
+    
+    refs = _iter_refs(table_data, where_clause, indexes, stats, partitions)
+    if cache_key is None:
+        records = table_data.rows(refs) if columnar else refs
+    elif columnar:
+        records = _cached_stream(
+            refs, cache_key, table_data.row,
+            lambda positions: Selection(table_data, positions),
+        )
+    else:
+        records = _cached_stream(refs, cache_key, lambda r: r, lambda rs: rs)
+    return islice(records, offset, stop)
+
+def _iter_values(table_data, columns, where_clause, indexes, stats):
+    """Кортежи значений столбцов columns по строкам, удовлетворяющим условию"""
+    if isinstance(table_data, ColumnarTable):
+        cols = [table_data.column(name) for name in columns]
+        if where_clause:
+            positions = _iter_refs(table_data, where_clause, indexes, stats)
+            return (tuple([col[pos] for col in cols]) for pos in positions)
+        if metrics.enabled:
+            metrics.count_rows(scanned=len(table_data))
+        live = table_data.live_mask()
+        values = zip(*cols)  # проход по массивам столбцов, без словарей строк
+        return values if live is None else compress(values, live)
+    if where_clause:
+        records = _iter_refs(table_data, where_clause, indexes, stats)
+    else:
+        records = table_data
+        if metrics.enabled:
+            metrics.count_rows(scanned=len(table_data))
+    if len(columns) == 1:
+        column = columns[0]
+        return ((record[column],) for record in records)
+    return map(itemgetter(*columns), records)
+
+
+def _count_groups(table_data, functions, arguments, group_by, indexes):
+    """
+    Группы только с count(*) без условия: по размеру таблицы или по индексу
+    столбца группировки, без просмотра строк (None, если так нельзя).
+    """
+    if any(function != "count" for function in functions) or any(
+            column != PRIMARY_KEY for column in arguments):
+        return None
+    if not group_by:
+        return {(): [len(table_data)] * len(functions)}
+    index = (indexes or {}).get(group_by[0])
+    if len(group_by) > 1 or index is None or index.kind not in INDEX_KINDS:
+        return None
+    return {(value,): [len(refs)] * len(functions)
+            for value, refs in index.items() if refs}
+
+
+def iter_aggregate(table_data, items, group_by=(), where_clause=None,
+                   indexes=None, stats=None, offset=0, limit=None,
+                   partitions=None):
+    """
+    Выполняет select с агрегатными функциями и GROUP BY за один проход.
+    
+    Строки не материализуются: из каждой строки берутся только нужные
+    значения (для колоночной таблицы - прямо из массивов столбцов), а
+    группы собираются в хэш-таблицу (см. aggregates.accumulate). count(*)
+    без условия вычисляется по размеру таблицы или индексу столбца
+    группировки. Без поиска по индексу большая таблица обрабатывается по
+    разделам partitions параллельно, состояния групп объединяются.
+    
+    Args:
+        table_data (list | ColumnarTable): Данные таблицы
+        items (list): Элементы списка select (см. parser.parse_select_list),
+            проверенные по схеме (см. aggregates.check_aggregates)
+        group_by (list): Столбцы группировки
+        where_clause (tuple | dict, optional): Условие (см. parser.parse_where)
+        indexes (dict, optional): Индексы таблицы {'столбец': индекс}
+        stats (dict, optional): Статистика таблицы (см. planner.collect_stats)
+        offset (int): Сколько первых групп пропустить
+        limit (int, optional): Максимальное количество групп
+        partitions (Partitions, optional): Разделы таблицы (см.
+            partitions.Partitions)
+    
+    Returns:
+        iterator: По записи на группу {'count(*)': N, 'столбец': значение, ...}
+            в порядке появления групп
+    """
+    functions = [function for function, _ in items if function is not None]
+    # count(*) считает строки как count(ID): ID не бывает пустым
+    arguments = [column or PRIMARY_KEY for function, column in items
+                 if function is not None]
+    groups = None
+    if not where_clause:
+        groups = _count_groups(table_data, functions, arguments, group_by, indexes)
+    if groups is None:
+        columns = list(group_by) + arguments
+        predicate = compile_where(where_clause)
+        states = None
+        if _partitioned(partitions) and (predicate is None or _index_candidates(
+                table_data, predicate, indexes, stats) is None):
+            states = partitions.aggregate(predicate, columns, len(group_by),
+                                          functions)
+        if states is None:
+            values = _iter_values(table_data, columns, predicate, indexes, stats)
+            states = accumulate(values, len(group_by), functions)
+        groups = finalize(states, len(group_by), functions)
+    
+    positions = {column: i for i, column in enumerate(group_by)}
+    labels = [item_label(function, column) for function, column in items]
+    
+    def to_record(key, results):
+        results = iter(results)
+        return {
+            label: key[positions[column]] if function is None else next(results)
+            for label, (function, column) in zip(labels, items)
+        }
+    
+    stop = None if limit is None else offset + limit
+    records = (to_record(key, results) for key, results in groups.items())
+    return islice(records, offset, stop)
+
+def _join_matches(side, use_index):
+    """
+    Функция: значение столбца соединения -> подходящие записи таблицы side.
+
+    Пары ищутся по индексу таблицы или по хэш-таблице, которая строится
+    за один просмотр таблицы (только по строкам, удовлетворяющим ее условию).
+    """
+    data, predicate = side.data, side.predicate
+    if use_index:
+        index = side.index
+        rows = data.row if isinstance(data, ColumnarTable) else None
+        test = predicate.test if predicate is not None else None
+        
+        def matches(value):
+            records = index.lookup(value)
+            if rows is not None:
+                records = map(rows, records)
+            return records if test is None else filter(test, records)
+        return matches
+    
+    table = {}
+    column = side.column
+    for record in iter_select(data, predicate, side.indexes, stats=side.stats,
+                              partitions=side.partitions):
+        value = record.get(column)
+        if value is None:
+            continue
+        bucket = table.get(value)
+        if bucket is None:
+            table[value] = [record]
+        else:
+            bucket.append(record)
+    return lambda value: table.get(value, ())
+
+def iter_join(left, right, where_clause=None, offset=0, limit=None):
+    """
+    Выполняет select с join по равенству столбцов как хэш-соединение.
+    
+    Пары ищутся по индексу столбца соединения одной из таблиц, если он
+    есть, иначе по хэш-таблице, построенной по таблице с меньшей оценкой
+    количества строк (см. joins.choose_sides); другая таблица просматривается
+    потоком, и соединенные записи выдаются по мере нахождения. Время -
+    O(n + m), память - только на хэш-таблицу меньшей таблицы. Условия на
+    одну таблицу проверяются при ее просмотре (см. joins.split_condition).
+    
+    Args:
+        left (JoinSide): Таблица из from (см. joins.JoinSide)
+        right (JoinSide): Таблица из join
+        where_clause (tuple | Predicate, optional): Условие для соединенных
+            записей с именами столбцов 'таблица.столбец'
+        offset (int): Сколько первых записей пропустить
+        limit (int, optional): Максимальное количество записей
+    
+    Returns:
+        iterator: Записи {'таблица.столбец': значение, ...} в порядке
+            просматриваемой таблицы, пустые значения столбцов соединения
+            пар не образуют
+    """
+    probe, lookup, use_index = choose_sides(left, right)
+    predicate = compile_where(where_clause)
+    keys = [f"{side.table}.{name}" for side in (left, right) for name in side.names]
+    
+    def joined():
+        matches = _join_matches(lookup, use_index)
+        column = probe.column
+        probe_first = probe is left
+        first, second = left.names, right.names
+        for record in iter_select(probe.data, probe.predicate, probe.indexes,
+                                  stats=probe.stats, partitions=probe.partitions):
+            value = record.get(column)
+            if value is None:
+                continue
+            for match in matches(value):
+                pair = (record, match) if probe_first else (match, record)
+                yield dict(zip(keys, chain(map(pair[0].get, first),
+                                           map(pair[1].get, second))))
+    
+    records = joined()
+    if predicate is not None:
+        records = filter(predicate.test, records)
+    stop = None if limit is None else offset + limit
+    return islice(records, offset, stop)
+
+def iter_pages(records, columns, page_size):
+    """
+    Форматирует записи постранично, по page_size строк в PrettyTable.
+    
+    Args:
+        records (iterable): Записи-словари
+        columns (list): Список столбцов таблицы
+        page_size (int): Количество строк на странице
+    
+    Returns:
+        iterator: Строки с отформатированными страницами
+    """
+    names = [name for name, _ in parse_columns(columns)]
+    records = iter(records)
+    while True:
+        page = list(islice(records, page_size))
+        if not page:
+            return
+        table = PrettyTable()
+        table.field_names = names
+        table.add_rows([[record.get(name) for name in names] for record in page])
+        yield table.get_string()
+
+def _tsv_field(value):
+    text = str(value).lower() if isinstance(value, bool) else str(value)
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+def iter_tsv(records, columns):
+    """
+    Форматирует записи как TSV: строка заголовка и по строке на запись.
+    
+    Табуляции, переводы строк и обратные косые черты в значениях
+    экранируются, bool выводится как true/false.
+    """
+    names = [name for name, _ in parse_columns(columns)]
+    yield "\t".join(names)
+    for record in records:
+        yield "\t".join(_tsv_field(record.get(name)) for name in names)
 
 @handle_db_errors
 def format_table(data, columns):
@@ -200,88 +958,180 @@ def format_table(data, columns):
         return "Нет данных"
     
     table = PrettyTable()
-    table.field_names = [col.split(":")[0] for col in columns]
+    names = [name for name, _ in parse_columns(columns)]
+    table.field_names = names
     
     for record in data:
-        row = [record.get(col.split(":")[0]) for col in columns]
+        row = [record.get(name) for name in names]
         table.add_row(row)
     
     return table
 
-@handle_db_errors
-def update(table_data, set_clause, where_clause):
+def update_records(table_data, set_clause, where_clause, indexes=None,
+                   journal=None, stats=None, partitions=None):
     """
     Обновляет записи в таблице по условию.
     
     Args:
-        table_data (list): Данные таблицы
+        table_data (list | ColumnarTable): Данные таблицы
         set_clause (dict): Новые значения {'столбец': значение}
-        where_clause (dict): Условия для выбора записей {'столбец': значение}
+        where_clause (tuple | dict): Условие для выбора записей
+            (см. parser.parse_where) или словарь {'столбец': значение}
+        indexes (dict, optional): Индексы таблицы {'столбец': индекс}
+        journal (list, optional): Список, в который добавляется запись журнала
+        stats (dict, optional): Статистика таблицы (см. planner.collect_stats)
+        partitions (Partitions, optional): Разделы таблицы (см.
+            partitions.Partitions)
     
     Returns:
         tuple: (обновленные данные таблицы, количество измененных записей)
     """
-    updated_count = 0
+    # Индексы по изменяемым столбцам нужно перестроить для каждой записи
+    affected = {
+        col: index for col, index in (indexes or {}).items() if col in set_clause
+    }
+    matched = _find_records(table_data, where_clause, indexes, stats,
+                            partitions)
     
-    for record in table_data:
-        match = True
-        for col, val in where_clause.items():
-            if record.get(col) != val:
-                match = False
-                break
-        
-        if match:
+    if isinstance(table_data, ColumnarTable):
+        table_data.validate(set_clause)  # до изменения индексов
+        for col, index in affected.items():
+            for pos in matched:
+                index.remove(table_data.value(pos, col), pos)
+        table_data.update(matched, set_clause)
+        for col, index in affected.items():
+            for pos in matched:
+                index.add(set_clause[col], pos)
+        ids = [table_data.value(pos, "ID") for pos in matched]
+    else:
+        for record in matched:
+            remove_from_indexes(affected, record)
             for col, new_val in set_clause.items():
                 record[col] = new_val
-            updated_count += 1
+            add_to_indexes(affected, record)
+        ids = [record["ID"] for record in matched]
     
-    return table_data, updated_count
+    if journal is not None and matched:
+        journal.append({"op": "update", "ids": ids, "set": set_clause})
+    return table_data, len(matched)
 
 @handle_db_errors
-@confirm_action("удаление записи")
-def delete(table_data, where_clause):
+def update(table_data, set_clause, where_clause, indexes=None, journal=None):
+    """
+    Обновляет записи в таблице по условию (см. update_records).
+    
+    Returns:
+        tuple | str: (обновленные данные таблицы, количество измененных
+            записей) или сообщение об ошибке
+    """
+    return update_records(table_data, set_clause, where_clause, indexes, journal)
+
+def delete_records(table_data, where_clause, indexes=None, journal=None,
+                   stats=None, partitions=None):
     """
     Удаляет записи из таблицы по условию.
     
     Args:
-        table_data (list): Данные таблицы
-        where_clause (dict): Условия для выбора записей {'столбец': значение}
+        table_data (list | ColumnarTable): Данные таблицы
+        where_clause (tuple | dict): Условие для выбора записей
+            (см. parser.parse_where) или словарь {'столбец': значение};
+            без условия удаляются все записи
+        indexes (dict, optional): Индексы таблицы {'столбец': индекс}
+        journal (list, optional): Список, в который добавляется запись журнала
+        stats (dict, optional): Статистика таблицы (см. planner.collect_stats)
+        partitions (Partitions, optional): Разделы таблицы (см.
+            partitions.Partitions)
     
     Returns:
         tuple: (отфильтрованные данные таблицы, количество удаленных записей)
-    
-    Note:
-        Требует подтверждения пользователя перед выполнением
     """
     if not where_clause:
-        return [], len(table_data)
+        for index in (indexes or {}).values():
+            index.clear()
+        if journal is not None:
+            journal.append({"op": "delete", "ids": None})
+        count = len(table_data)
+        if isinstance(table_data, ColumnarTable):
+            table_data.clear()
+            return table_data, count
+        return [], count
     
-    filtered_data = []
-    deleted_count = 0
+    matched = _find_records(table_data, where_clause, indexes, stats,
+                            partitions)
+    if not matched:
+        return table_data, 0
     
-    for record in table_data:
-        match = True
-        for col, val in where_clause.items():
-            if record.get(col) != val:
-                match = False
-                break
-        
-        if not match:
-            filtered_data.append(record)
-        else:
-            deleted_count += 1
+    if isinstance(table_data, ColumnarTable):
+        ids = [table_data.value(pos, "ID") for pos in matched]
+        for pos in matched:
+            remove_from_indexes(indexes, table_data.row(pos), pos)
+        if table_data.delete(matched):
+            # Номера строк изменились после уплотнения - перестраиваем индексы
+            for col, index in (indexes or {}).items():
+                indexes[col] = build_index(col, index.kind, table_data)
+        if journal is not None:
+            journal.append({"op": "delete", "ids": ids})
+        return table_data, len(matched)
+    
+    for record in matched:
+        remove_from_indexes(indexes, record)
+    if journal is not None:
+        journal.append({"op": "delete", "ids": [r["ID"] for r in matched]})
     
-    return filtered_data, deleted_count
+    return _remove_records(table_data, matched), len(matched)
+
+def _remove_records(table_data, matched):
+    """
+    Удаляет найденные записи из списка записей таблицы.
+
+    Записи лежат в списке по возрастанию ID, поэтому немногие записи
+    (например, delete по ID) находятся бинарным поиском и удаляются на
+    месте: сдвиг хвоста списка - одна операция memmove, без перебора
+    таблицы в Python. Много записей удаляется пересборкой списка за
+    один проход.
+
+    Returns:
+        list: Записи таблицы без удаленных
+    """
+    if len(matched) <= POINT_DELETE_ROWS:
+        key = itemgetter(PRIMARY_KEY)
+        positions = [bisect_left(table_data, record[PRIMARY_KEY], key=key)
+                     for record in matched]
+        if all(pos < len(table_data) and table_data[pos] is record
+               for pos, record in zip(positions, matched)):
+            for pos in sorted(positions, reverse=True):
+                del table_data[pos]
+            return table_data
+    matched_ids = {id(record) for record in matched}
+    return [r for r in table_data if id(r) not in matched_ids]
+
+@handle_db_errors
+@confirm_action("удаление записи")
+def delete(table_data, where_clause, indexes=None, journal=None):
+    """
+    Удаляет записи из таблицы по условию (см. delete_records).
+    
+    Returns:
+        tuple | str: (отфильтрованные данные таблицы, количество удаленных
+            записей) или сообщение об отмене/ошибке
+    
+    Note:
+        Требует подтверждения пользователя перед выполнением
+    """
+    return delete_records(table_data, where_clause, indexes, journal)
 
 @handle_db_errors
-def info(metadata, table_name, table_data):
+def info(metadata, table_name, table_data, record_count=None):
     """
     Возвращает информацию о таблице.
     
     Args:
         metadata (dict): Метаданные всех таблиц
         table_name (str): Имя таблицы
-        table_data (list): Данные таблицы
+        table_data (list | ColumnarTable | None): Данные таблицы (None, если
+            таблица не загружена в память)
+        record_count (int, optional): Количество записей, если оно известно
+            без загрузки данных
     
     Returns:
         str: Форматированная информация о таблице
@@ -289,11 +1139,24 @@ def info(metadata, table_name, table_data):
     if table_name not in metadata:
         return f'Ошибка: Таблица "{table_name}" не существует.'
     
-    columns = metadata[table_name]
-    record_count = len(table_data)
+    columns = metadata[table_name]["columns"]
+    if record_count is None:
+        record_count = len(table_data)
     
     info_text = f"Таблица: {table_name}\n"
     info_text += f"Столбцы: {', '.join(columns)}\n"
+    indexes = metadata[table_name].get("indexes", {})
+    if indexes:
+        index_list = ", ".join(f"{col} ({kind})" for col, kind in indexes.items())
+        info_text += f"Индексы: {index_list}\n"
+    if metadata[table_name].get("format") == "binary":
+        info_text += "Формат файла: binary\n"
+    if isinstance(table_data, ColumnarTable):
+        info_text += "Хранение: columnar "
+        info_text += f"(данные в памяти: {table_data.nbytes()} байт)\n"
+    stats = metadata[table_name].get("stats")
+    if stats:
+        info_text += f"Статистика: собрана на {stats['rows']} записях\n"
     info_text += f"Количество записей: {record_count}"
     
     return info_text
\ No newline at end of file
@@ -1,20 +1,33 @@
-import shlex
+import sys
 
 import prompt
+from prettytable import PrettyTable
 
+from src.decorators import confirm_action, set_confirm_policy
+
+from .cache import query_cache
 from .core import (
+    create_index,
     create_table,
-    delete,
     drop_table,
-    format_table,
     info,
-    insert,
+    insert_many,
+    iter_pages,
+    iter_tsv,
     list_tables,
-    select,
-    update,
+    set_format,
+    set_storage,
 )
-from .parser import parse_set, parse_where
-from .utils import load_metadata, load_table_data, save_metadata, save_table_data
+from .errors import CommandError, DatabaseError
+from .locks import LockError
+from .metrics import metrics, profile_call
+from .planner import collect_stats
+from .plans import parse_command, plan_cache
+from .session import DEFAULT_FLUSH_INTERVAL, Session
+from .utils import export_table, iter_import_file
+
+# Количество строк на одной странице вывода select
+PAGE_SIZE = 50
 
 
 def print_help():
@@ -28,30 +41,97 @@ def print_help():
     print("Функции:")
     print("<command> insert into <имя_таблицы> values (<значение1>, <значение2>, ...) "  # noqa: E501
           "- создать запись.")
+    print("<command> insert into <имя_таблицы> values (...), (...), ... "
+          "- создать несколько записей.")
+    print("<command> import <имя_таблицы> <файл.csv|файл.jsonl|файл.json|файл.tbl> "  # noqa: E501
+          "- загрузить записи из файла.")
     print("<command> select from <имя_таблицы> where <столбец> = <значение> "  # noqa: E501
           "- прочитать записи по условию.")
+    print("    условие: сравнения =, !=, <, <=, >, >=, <столбец> in (...), "
+          "связки and/or и скобки.")
     print("<command> select from <имя_таблицы> - прочитать все записи.")
+    print("<command> select from <имя_таблицы> [where ...] [limit N] [offset N] "
+          "[format table|tsv] - постраничный или потоковый (TSV) вывод.")
+    print("<command> select from <имя_таблицы> [where ...] order by <столбец> "
+          "[asc|desc] [limit N] - записи в порядке столбца.")
+    print("<command> select count(*), sum(<столбец>), ..., <столбец> "
+          "from <имя_таблицы> [where ...] group by <столбец> - агрегаты "
+          "count/sum/min/max/avg по группам.")
+    print("<command> select from <таблица1> join <таблица2> on <таблица1>.<столбец> "  # noqa: E501
+          "= <таблица2>.<столбец> [where ...] - соединение таблиц.")
     print("<command> update <имя_таблицы> set <столбец1> = <новое_значение1> "  # noqa: E501
           "where <столбец_условия> = <значение_условия> - обновить запись.")
     print("<command> delete from <имя_таблицы> where <столбец> = <значение> "  # noqa: E501
           "- удалить запись.")
     print("<command> info <имя_таблицы> - вывести информацию о таблице.")
+    print("<command> create_index <имя_таблицы> <столбец> [hash|sorted] "
+          "- создать индекс по столбцу.")
+    print("<command> set_storage <имя_таблицы> rows|columnar "
+          "- выбрать способ хранения таблицы в памяти.")
+    print("<command> set_format <имя_таблицы> json|binary "
+          "- перевести файл таблицы в другой формат.")
+    print("<command> export <имя_таблицы> <файл.json|файл.tbl> "
+          "- выгрузить таблицу в файл.")
     print("\nОбщие команды:")
+    print("<command> begin - начать транзакцию")
+    print("<command> commit - зафиксировать транзакцию "
+          "или сохранить накопленные изменения на диск")
+    print("<command> rollback - отменить транзакцию")
+    print("<command> cache_stats - статистика кэша запросов и планов команд")
+    print("<command> stats [on|off|reset|export <файл.json>] "
+          "- метрики выполнения команд по фазам.")
+    print("<command> profile <команда> - выполнить команду под профилировщиком.")
+    print("<command> explain <select|update|delete ...> - показать способ "
+          "доступа к строкам, оценки и фактическое выполнение.")
+    print("<command> analyze <имя_таблицы> - собрать статистику таблицы "
+          "для планировщика.")
     print("<command> exit - выход из программы")
     print("<command> help - справочная информация\n")
 
 
-def run():
+def print_records(records, columns, output="table", interactive=True):
+    """
+    Выводит записи по мере их получения.
+    
+    В формате table записи выводятся страницами по PAGE_SIZE строк; в
+    интерактивном режиме (interactive и ввод с терминала) перед следующей
+    страницей запрашивается подтверждение. В формате tsv каждая запись
+    печатается сразу.
+    """
+    if output == "tsv":
+        for line in iter_tsv(records, columns):
+            print(line)
+        return
+    
+    interactive = interactive and sys.stdin.isatty()
+    printed = False
+    for page in iter_pages(records, columns, PAGE_SIZE):
+        if printed and interactive:
+            response = prompt.string("-- Далее: Enter, выход: q -- ")
+            if response.strip().lower() == "q":
+                break
+        print(page)
+        printed = True
+    if not printed:
+        print("Нет данных")
+
+
+def run(flush_interval=DEFAULT_FLUSH_INTERVAL, assume_yes=False):
     """
     Основной цикл выполнения программы базы данных.
     
     Обрабатывает пользовательский ввод, парсит команды и выполняет соответствующие
     операции с базой данных. Поддерживает интерактивный режим работы.
+    Таблицы загружаются один раз и остаются в памяти сессии между командами.
+    
+    Args:
+        flush_interval (float): Интервал (в секундах) сброса изменений на диск
+        assume_yes (bool): Подтверждать опасные операции без вопроса
     
     Команды:
-    - Управление таблицами: create_table, drop_table, list_tables
+    - Управление таблицами: create_table, drop_table, list_tables, create_index
     - CRUD операции: insert, select, update, delete, info
-    - Служебные команды: help, exit
+    - Служебные команды: commit, help, exit
     
     Raises:
         Exception: Обрабатывает ошибки через декораторы в core модуле
@@ -59,100 +139,468 @@ def run():
     print("***Операции с данными***")
     print_help()
     
+    session = Session(flush_interval)
+    if assume_yes:
+        set_confirm_policy(True)
+    try:
+        _loop(session)
+    finally:
+        set_confirm_policy(None)
+        _close(session)
+
+
+def _close(session):
+    """Завершает сессию, сообщая об отмене незафиксированной транзакции"""
+    if session.in_transaction:
+        print("Незафиксированная транзакция отменена.")
+    session.close()
+
+
+def parse_script(lines):
+    """
+    Разбирает все команды сценария до начала выполнения.
+    
+    Пустые строки и комментарии (строки, начинающиеся с #) пропускаются.
+    
+    Args:
+        lines (iterable): Строки сценария
+    
+    Returns:
+        list: Пары (номер строки, разобранная команда - см. parse_command)
+    
+    Raises:
+        ValueError: Если строку не удалось разобрать (с номером строки)
+    """
+    commands = []
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            commands.append((line_no, parse_command(line)))
+        except ValueError as e:
+            raise ValueError(f"строка {line_no}: {e}") from None
+    return commands
+
+
+def run_script(lines, assume_yes=False):
+    """
+    Выполняет сценарий команд без участия пользователя.
+    
+    Все команды разбираются заранее: при синтаксической ошибке сценарий
+    не выполняется вовсе. Таблицы загружаются один раз на весь сценарий,
+    а изменения сбрасываются на диск только командой commit и по окончании
+    сценария. На первой ошибке выполнения сценарий останавливается,
+    а изменения после последнего commit отменяются (см. Session.discard).
+    Опасные операции подтверждаются при assume_yes, иначе отклоняются.
+    
+    Args:
+        lines (iterable): Строки сценария
+        assume_yes (bool): Подтверждать опасные операции автоматически
+    
+    Returns:
+        int: Код завершения (0 - успех, 1 - ошибка)
+    """
+    try:
+        commands = parse_script(lines)
+    except ValueError as e:
+        print(f"Ошибка в сценарии: {e}")
+        return 1
+    
+    session = Session(flush_interval=float("inf"))
+    set_confirm_policy(assume_yes)
+    try:
+        for line_no, command in commands:
+            try:
+                if not execute(session, command, interactive=False, strict=True):
+                    break
+            except Exception as e:
+                print(_error_message(e))
+                print(f"Ошибка в сценарии: строка {line_no}, "
+                      "изменения после последнего commit отменены.")
+                session.discard()
+                return 1
+    finally:
+        set_confirm_policy(None)
+        _close(session)
+    return 0
+
+
+def _loop(session):
+    """Читает и выполняет команды до команды exit"""
     while True:
         command = prompt.string("Введите команду: ")
         if not command.strip():
             continue
-                
-        args = shlex.split(command)
-        if not args:
+        try:
+            parsed = parse_command(command)
+        except ValueError as e:
+            print(f"Некорректная команда: {e}. Попробуйте снова.")
             continue
-                
-        cmd = args[0]
-        metadata = load_metadata()
-            
-        if cmd == "exit":
+        if not execute(session, parsed):
             break
-        elif cmd == "help":
-            print_help()
-            
-        # CRUD операции
-        elif cmd == "insert" and args[1] == "into" and args[3] == "values":
-            table_name = args[2]
-            values = [v.strip() for v in 
-                     ' '.join(args[4:]).strip('()').split(',')]
-            table_data = load_table_data(table_name)
-            result, message = insert(metadata, table_name, values, table_data)
-            if "успешно" in message:
-                save_table_data(table_name, result)
-            print(message)
-            
-        elif cmd == "select" and args[1] == "from":
-            table_name = args[2]
-            table_data = load_table_data(table_name)
-            if len(args) > 3 and args[3] == "where":
-                where_str = ' '.join(args[4:])
-                where_clause = parse_where(where_str)
-                result = select(table_data, metadata[table_name], where_clause)
-            else:
-                result = select(table_data, metadata[table_name])
-            print(format_table(result, metadata[table_name]))
-            
-        elif cmd == "update":
-            table_name = args[1]
-            set_str = ' '.join(args[3:args.index("where")])
-            where_str = ' '.join(args[args.index("where")+1:])
-            table_data = load_table_data(table_name)
-            set_clause = parse_set(set_str)
-            where_clause = parse_where(where_str)
-            result, count = update(table_data, set_clause, where_clause)
-            if count > 0:
-                save_table_data(table_name, result)
-                print(f'Запись с ID={list(where_clause.values())[0]} '  # noqa: E501
-                      f'в таблице "{table_name}" успешно обновлена.')
-            else:
-                print("Записи для обновления не найдены.")
-            
-        elif cmd == "delete" and args[1] == "from":
-            table_name = args[2]
-            where_str = ' '.join(args[4:])
-            table_data = load_table_data(table_name)
-            where_clause = parse_where(where_str)
-            result, count = delete(table_data, where_clause)
-            if count > 0:
-                save_table_data(table_name, result)
-                print(f'Запись с ID={list(where_clause.values())[0]} '  # noqa: E501
-                      f'успешно удалена из таблицы "{table_name}".')
-            else:
-                print("Записи для удаления не найдены.")
-            
-        elif cmd == "info":
-            table_name = args[1]
-            table_data = load_table_data(table_name)
-            result = info(metadata, table_name, table_data)
-            print(result)
-            
-        # Существующие команды управления таблицами
-        elif cmd == "create_table":
-            if len(args) < 3:
-                print("Некорректное значение: недостаточно аргументов. "  # noqa: E501
-                      "Попробуйте снова.")
-                continue
-            result = create_table(metadata, args[1], args[2:])
-            print(result)
-            if "успешно" in result:
-                save_metadata(metadata)
-        elif cmd == "drop_table":
-            if len(args) < 2:
-                print("Некорректное значение: укажите имя таблицы. "  # noqa: E501
-                      "Попробуйте снова.")
-                continue
-            result = drop_table(metadata, args[1])
-            print(result)
-            if "успешно" in result:
-                save_metadata(metadata)
-        elif cmd == "list_tables":
-            result = list_tables(metadata)
-            print(result)
+        session.maybe_flush()
+
+
+@confirm_action("удаление записи")
+def delete(session, plan, params):
+    """Выполняет команду delete после подтверждения"""
+    return plan.run(session, params)
+
+
+def _execute_plan(session, plan, params, interactive):
+    """
+    Выполняет команду select, insert, update или delete по плану.
+
+    Raises:
+        TableNotFoundError: Если таблица не существует
+        ValueError: Если команда не подходит к схеме таблицы
+    """
+    table_name = plan.table
+    if plan.kind == "select":
+        records = plan.run(session, params)
+        columns = plan.result_columns(session.metadata)
+        if metrics.enabled:
+            metrics.measure("format", print_records, records, columns,
+                            plan.format, interactive)
+        else:
+            print_records(records, columns, plan.format, interactive)
+        return
+    if plan.kind == "delete":
+        result = delete(session, plan, params)
+    else:
+        result = plan.run(session, params)
+    
+    if isinstance(result, str):
+        print(result)  # операция отменена
+    elif plan.kind == "insert":
+        if len(result) == 1:
+            print(f'Запись с ID={result[0]} успешно добавлена в таблицу "{table_name}".')  # noqa: E501
+        else:
+            print(f'В таблицу "{table_name}" успешно добавлено записей: {len(result)}.')  # noqa: E501
+    elif plan.kind == "update":
+        record_id = plan.id_equality(params)
+        if not result:
+            print("Записи для обновления не найдены.")
+        elif record_id is not None:
+            print(f'Запись с ID={record_id} '
+                  f'в таблице "{table_name}" успешно обновлена.')
+        else:
+            print(f'В таблице "{table_name}" успешно обновлено '
+                  f'записей: {result}.')
+    else:
+        record_id = plan.id_equality(params)
+        if not result:
+            print("Записи для удаления не найдены.")
+        elif record_id is not None:
+            print(f'Запись с ID={record_id} '
+                  f'успешно удалена из таблицы "{table_name}".')
+        else:
+            print(f'Из таблицы "{table_name}" успешно удалено '
+                  f'записей: {result}.')
+
+
+def execute(session, parsed, interactive=True, strict=False):
+    """
+    Выполняет одну разобранную команду.
+    
+    Args:
+        session (Session): Сессия с загруженными таблицами
+        parsed (tuple): Разобранная команда (см. plans.parse_command):
+            (план, значения параметров) или (None, слова команды)
+        interactive (bool): Можно ли запрашивать у пользователя ввод
+            (например, подтверждение перехода к следующей странице вывода)
+        strict (bool): Выбрасывать ошибки команды, а не выводить их
+            (например, для ответа клиенту сервера)
+    
+    Returns:
+        bool: False, если команда завершает работу (exit), иначе True
+    
+    Raises:
+        DatabaseError: При strict - если команда не выполнена
+        ValueError: При strict - если значения не соответствуют схеме
+    """
+    if metrics.enabled:
+        plan, args = parsed
+        metrics.operation = plan.kind if plan is not None else args[0]
+        return metrics.measure_statement(_execute_parsed, session, parsed,
+                                         interactive, strict)
+    return _execute_parsed(session, parsed, interactive, strict)
+
+
+def _execute_parsed(session, parsed, interactive, strict=False):
+    plan, args = parsed
+    try:
+        if plan is not None:
+            _execute_plan(session, plan, args, interactive)
+            return True
+        if not args:
+            return True
+        return _execute(session, args, interactive, strict)
+    except LockError as e:
+        if not interactive:
+            raise  # сценарий прерывается
+        print(f"Ошибка: {e}. Повторите команду.")
+    except (DatabaseError, ValueError) as e:
+        if strict:
+            raise
+        print(_error_message(e))
+    return True
+
+
+def _error_message(error):
+    """Сообщение об ошибке команды для вывода"""
+    if isinstance(error, CommandError):
+        return str(error)
+    if isinstance(error, ValueError):
+        return f"Ошибка валидации: {error}"
+    return f"Ошибка: {error}."
+
+
+def _checked(result):
+    """
+    Возвращает сообщение функции core (см. decorators.handle_db_errors).
+
+    Raises:
+        CommandError: Если функция вернула сообщение об ошибке
+    """
+    if result.startswith(("Ошибка", "Произошла непредвиденная ошибка")):
+        raise CommandError(result)
+    return result
+
+
+def print_metrics():
+    """Выводит накопленные метрики: фазы команд и просмотренные строки"""
+    snapshot = metrics.snapshot()
+    if not snapshot:
+        state = "включен" if metrics.enabled else "выключен (stats on)"
+        print(f"Метрик пока нет. Сбор метрик {state}.")
+        return
+    table = PrettyTable()
+    table.field_names = ["команда", "фаза", "вызовов", "всего, мс",
+                         "среднее, мкс", "p50, мкс", "p99, мкс", "макс, мкс"]
+    for operation, entry in snapshot.items():
+        for phase, summary in entry["phases"].items():
+            table.add_row([
+                operation, phase, summary["count"],
+                f"{summary['total_ms']:.3f}", f"{summary['mean_us']:.1f}",
+                f"{summary['p50_us']:.1f}", f"{summary['p99_us']:.1f}",
+                f"{summary['max_us']:.1f}",
+            ])
+    table.align = "r"
+    table.align["команда"] = table.align["фаза"] = "l"
+    print(table)
+    for operation, entry in snapshot.items():
+        if "rows_scanned" in entry:
+            print(f"{operation}: просмотрено строк {entry['rows_scanned']}, "
+                  f"возвращено {entry['rows_returned']}")
+
+
+def _stats(args):
+    """Команда stats [on|off|reset|export <файл.json>]"""
+    action = args[0] if args else None
+    if action is None:
+        print_metrics()
+    elif action in ("on", "off"):
+        metrics.enable(action == "on")
+        print(f"Сбор метрик {'включен' if metrics.enabled else 'выключен'}.")
+    elif action == "reset":
+        metrics.reset()
+        print("Метрики очищены.")
+    elif action == "export" and len(args) > 1:
+        metrics.export(args[1])
+        print(f"Метрики сохранены в {args[1]}.")
+    else:
+        raise CommandError("Некорректное значение: stats [on|off|reset|export <файл>]. "
+                           "Попробуйте снова.")
+
+
+def print_explain(session, parsed):
+    """Выводит план команды (см. plans.StatementPlan.explain)"""
+    plan, params = parsed
+    result = plan.explain(session, params)
+    path = result["path"]
+    stats = "собрана" if result["stats"] else "не собрана (analyze)"
+    print(f'План: {plan.kind} из "{plan.table}", строк: {result["rows"]}, '
+          f"статистика {stats}")
+    print(f"Доступ: {path.describe()}, кандидатов ~{path.candidates:.0f}, "
+          f"стоимость ~{path.cost / 1e3:.1f} мкс")
+    for other in sorted(result["rejected"], key=lambda item: item.cost):
+        print(f"Отвергнуто: {other.describe()}, кандидатов "
+              f"~{other.candidates:.0f}, стоимость ~{other.cost / 1e3:.1f} мкс")
+    if result["partitions"] is not None:
+        scanned, total, workers = result["partitions"]
+        print(f"Разделы: просмотрено {scanned} из {total}, процессов: {workers}")
+    if result["order"] is not None:
+        print(f"Порядок: {result['order']}")
+    print(f"Оценка: записей ~{result['estimated_rows']:.0f}")
+    print(f"Факт: просмотрено {result['candidates']}, найдено "
+          f"{result['matched']}, время {result['elapsed_ns'] / 1e3:.1f} мкс")
+
+
+def _execute(session, args, interactive, strict=False):
+    cmd = args[0]
+    metadata = session.metadata
+        
+    if cmd == "exit":
+        return False
+    elif cmd == "help":
+        print_help()
+    elif cmd == "begin":
+        try:
+            session.begin()
+        except ValueError as e:
+            raise CommandError(f"Ошибка: {e}.") from None
+        print("Транзакция начата.")
+    elif cmd == "commit":
+        in_transaction = session.in_transaction
+        session.commit()
+        print("Транзакция зафиксирована." if in_transaction
+              else "Изменения сохранены.")
+    elif cmd == "rollback":
+        try:
+            session.rollback()
+        except ValueError as e:
+            raise CommandError(f"Ошибка: {e}.") from None
+        print("Транзакция отменена.")
+    elif cmd == "cache_stats":
+        stats = query_cache.stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total if total else 0.0
+        print(f"Попаданий: {stats['hits']}, промахов: {stats['misses']} "
+              f"(доля попаданий {ratio:.1%})")
+        print(f"Вытеснено: {stats['evictions']}, "
+              f"инвалидировано: {stats['invalidations']}")
+        print(f"Записей в кэше: {stats['entries']}, строк: {stats['rows']}")
+        plans = plan_cache.stats()
+        print(f"Планы команд: {plans['entries']} в кэше, попаданий: "
+              f"{plans['hits']}, разборов: {plans['misses']}, "
+              f"вытеснено: {plans['evictions']}")
+    elif cmd == "stats":
+        _stats(args[1:])
+    elif cmd == "profile":
+        keep, report = profile_call(execute, session, args[1], interactive,
+                                    strict)
+        print(report)
+        return keep
+    elif cmd == "explain":
+        print_explain(session, args[1])
+    elif cmd == "analyze":
+        if len(args) < 2:
+            raise CommandError("Некорректное значение: укажите имя таблицы. "
+                               "Попробуйте снова.")
+        table_name = args[1]
+        if table_name not in metadata:
+            raise CommandError(f'Ошибка: Таблица "{table_name}" не существует.')
+        session.lock_table(table_name)
+        stats = collect_stats(session.table(table_name).data,
+                              metadata[table_name]["columns"])
+        metadata[table_name]["stats"] = stats
+        session.save_metadata(table_name)
+        print(f'Статистика таблицы "{table_name}" собрана: '
+              f"строк {stats['rows']}.")
+        
+    # CRUD операции
+    elif cmd == "import":
+        if len(args) < 3:
+            raise CommandError("Некорректное значение: укажите таблицу и файл. "  # noqa: E501
+                               "Попробуйте снова.")
+        table_name, filepath = args[1], args[2]
+        if table_name not in metadata:
+            raise CommandError(f'Ошибка: Таблица "{table_name}" не существует.')
+        table = session.table(table_name, write=True)
+        journal = []
+        records = iter_import_file(filepath, metadata[table_name]["columns"])
+        result = insert_many(metadata, table_name, records, table.data,
+                             table.indexes, journal)
+        if isinstance(result, str):
+            raise CommandError(result)
+        session.record(table_name, result[0], journal, checkpoint=True)
+        session.flush()
+        print(result[1])
+        
+    elif cmd == "info":
+        table_name = args[1]
+        if table_name in metadata:
+            loaded = session.loaded(table_name)
+            result = info(metadata, table_name, loaded and loaded.data,
+                          session.row_count(table_name))
         else:
-            print(f"Функции {cmd} нет. Попробуйте снова.")
\ No newline at end of file
+            result = info(metadata, table_name, [])
+        print(_checked(result))
+        
+    # Существующие команды управления таблицами
+    elif cmd == "create_table":
+        if len(args) < 3:
+            raise CommandError("Некорректное значение: недостаточно аргументов. "  # noqa: E501
+                               "Попробуйте снова.")
+        session.lock_table(args[1])
+        result = _checked(create_table(metadata, args[1], args[2:]))
+        print(result)
+        if "успешно" in result:
+            session.save_metadata(args[1])
+    elif cmd == "drop_table":
+        if len(args) < 2:
+            raise CommandError("Некорректное значение: укажите имя таблицы. "  # noqa: E501
+                               "Попробуйте снова.")
+        session.lock_table(args[1])
+        result = _checked(drop_table(metadata, args[1]))
+        print(result)
+        if "успешно" in result:
+            session.save_metadata(args[1])
+            session.drop_table(args[1])
+    elif cmd == "create_index":
+        if len(args) < 3:
+            raise CommandError("Некорректное значение: укажите таблицу и столбец. "  # noqa: E501
+                               "Попробуйте снова.")
+        kind = args[3] if len(args) > 3 else "hash"
+        session.lock_table(args[1])
+        result = _checked(create_index(metadata, args[1], args[2], kind))
+        print(result)
+        if "успешно" in result:
+            session.save_metadata(args[1])
+            session.add_index(args[1], args[2])
+    elif cmd == "set_storage" and session.in_transaction:
+        raise CommandError("Ошибка: команда set_storage недоступна внутри транзакции.")
+    elif cmd == "set_storage":
+        if len(args) < 3:
+            raise CommandError("Некорректное значение: укажите таблицу и способ хранения. "  # noqa: E501
+                               "Попробуйте снова.")
+        session.lock_table(args[1])
+        result = _checked(set_storage(metadata, args[1], args[2]))
+        print(result)
+        if "успешно" in result:
+            session.save_metadata(args[1])
+            # Таблица будет перечитана в новом представлении
+            session.flush()
+            session.evict(args[1])
+    elif cmd == "set_format" and session.in_transaction:
+        raise CommandError("Ошибка: команда set_format недоступна внутри транзакции.")
+    elif cmd == "set_format":
+        if len(args) < 3:
+            raise CommandError("Некорректное значение: укажите таблицу и формат. "  # noqa: E501
+                               "Попробуйте снова.")
+        table_name = args[1]
+        session.lock_table(table_name)
+        old_format = session.file_format(table_name)
+        result = _checked(set_format(metadata, table_name, args[2]))
+        print(result)
+        if "успешно" in result:
+            session.save_metadata(table_name)
+            session.migrate(table_name, old_format)
+    elif cmd == "export":
+        if len(args) < 3:
+            raise CommandError("Некорректное значение: укажите таблицу и файл. "  # noqa: E501
+                               "Попробуйте снова.")
+        if args[1] not in metadata:
+            raise CommandError(f'Ошибка: Таблица "{args[1]}" не существует.')
+        export_table(session.table(args[1]).data, args[2],
+                     metadata[args[1]]["columns"])
+        print(f'Таблица "{args[1]}" выгружена в файл {args[2]}.')
+    elif cmd == "list_tables":
+        result = list_tables(metadata)
+        print(result)
+    else:
+        raise CommandError(f"Функции {cmd} нет. Попробуйте снова.")
+    
+    return True
\ No newline at end of file
@@ -0,0 +1,18 @@
+class DatabaseError(Exception):
+    """Базовое исключение базы данных"""
+
+
+class TableNotFoundError(DatabaseError):
+    """Таблица не существует"""
+
+
+class TableExistsError(DatabaseError):
+    """Таблица с таким именем уже существует"""
+
+
+class ValidationError(DatabaseError, ValueError):
+    """Команда или значения не соответствуют схеме таблицы"""
+
+
+class CommandError(DatabaseError):
+    """Команда не выполнена; текст исключения - сообщение для пользователя"""
@@ -0,0 +1,335 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+from operator import itemgetter
+
+INDEX_KINDS = ("hash", "sorted")
+
+# Первичный ключ: по нему всегда строится уникальный индекс ID -> строка
+PRIMARY_KEY = "ID"
+
+
+def sort_key(value):
+    """Ключ сортировки, устойчивый к значениям разных типов"""
+    return (type(value).__name__, value)
+
+
+def ref_key(ref):
+    """
+    Хэшируемый ключ ссылки на строку: номер строки (колоночное хранение)
+    или ID записи (строчное хранение).
+    """
+    return ref if isinstance(ref, int) else ref[PRIMARY_KEY]
+
+
+class HashIndex:
+    """
+    Хэш-индекс по одному столбцу для поиска по равенству.
+
+    Хранит отображение {значение: {ключ ссылки: ссылка}} (см. ref_key),
+    поэтому поиск, добавление и удаление выполняются за O(1) - в том числе
+    для столбца с немногими различными значениями (например, bool).
+    Ссылкой служит сама запись (строчное хранение) или номер строки
+    (колоночное хранение); ссылки со значением выдаются в порядке добавления.
+    """
+
+    kind = "hash"
+
+    def __init__(self, column):
+        self.column = column
+        self._buckets = {}
+
+    def add(self, value, ref):
+        """Добавляет ссылку на строку со значением value"""
+        self._buckets.setdefault(value, {})[ref_key(ref)] = ref
+
+    def remove(self, value, ref):
+        """Удаляет ссылку на строку со значением value"""
+        bucket = self._buckets.get(value)
+        if not bucket:
+            return
+        bucket.pop(ref_key(ref), None)
+        if not bucket:
+            del self._buckets[value]
+
+    def clear(self):
+        """Очищает индекс"""
+        self._buckets = {}
+
+    def lookup(self, value):
+        """Возвращает список ссылок на строки со значением value"""
+        return list(self._buckets.get(value, {}).values())
+
+    def items(self):
+        """Перебирает пары (значение, ссылки) по различным значениям"""
+        return ((value, bucket.values()) for value, bucket in self._buckets.items())
+
+
+class SortedIndex:
+    """
+    Упорядоченный индекс по одному столбцу для поиска по диапазону.
+
+    Хранит отсортированные ключи и параллельный список ссылок,
+    поиск выполняется бинарным поиском за O(log n + k).
+
+    Вставка в середину списка стоит O(n), поэтому изменения накапливаются:
+    add и remove выполняются за O(1), а при следующем поиске накопленные
+    ссылки сортируются и сливаются с индексом за O(n + m log m) (m -
+    количество изменений). Массовые вставка, изменение и удаление стоят
+    одного слияния, а не O(n) на каждую строку; чередование изменений
+    с поиском по-прежнему стоит O(n) на каждый поиск после изменения.
+    """
+
+    kind = "sorted"
+
+    def __init__(self, column):
+        self.column = column
+        self._keys = []
+        self._refs = []
+        self._added = {}  # ключ ссылки -> (ключ сортировки, ссылка)
+        self._removed = set()  # ключи ссылок, удаляемых из _refs
+
+    def add(self, value, ref):
+        """Добавляет ссылку на строку со значением value"""
+        self._added[ref_key(ref)] = (sort_key(value), ref)
+
+    def remove(self, value, ref):
+        """Удаляет ссылку на строку со значением value"""
+        key = ref_key(ref)
+        if self._added.pop(key, None) is None:
+            self._removed.add(key)
+
+    def _merge(self):
+        """Применяет накопленные изменения к отсортированным спискам"""
+        if not self._added and not self._removed:
+            return
+        pairs = zip(self._keys, self._refs)
+        if self._removed:
+            removed = self._removed
+            pairs = [pair for pair in pairs if ref_key(pair[1]) not in removed]
+        if self._added:
+            added = sorted(self._added.values(), key=itemgetter(0))
+            # При равных значениях прежние ссылки идут раньше новых
+            pairs = heapq.merge(pairs, added, key=itemgetter(0))
+        pairs = list(pairs)
+        self._keys = [key for key, _ in pairs]
+        self._refs = [ref for _, ref in pairs]
+        self._added = {}
+        self._removed = set()
+
+    def clear(self):
+        """Очищает индекс"""
+        self._keys = []
+        self._refs = []
+        self._added = {}
+        self._removed = set()
+
+    def lookup(self, value):
+        """Возвращает список ссылок на строки со значением value"""
+        self._merge()
+        key = sort_key(value)
+        start = bisect_left(self._keys, key)
+        end = bisect_right(self._keys, key)
+        return self._refs[start:end]
+
+    def items(self):
+        """Перебирает пары (значение, список ссылок) в порядке значений"""
+        self._merge()
+        for key, group in groupby(zip(self._keys, self._refs), key=itemgetter(0)):
+            yield key[1], [ref for _, ref in group]
+
+    def ordered(self, descending=False):
+        """
+        Перебирает ссылки на строки в порядке значений столбца (по убыванию
+        при descending); строки с равными значениями - в порядке добавления.
+        """
+        self._merge()
+        if not descending:
+            return iter(self._refs)
+        return self._descending()
+
+    def _descending(self):
+        keys, refs = self._keys, self._refs
+        end = len(keys)
+        while end:
+            start = bisect_left(keys, keys[end - 1], 0, end)
+            yield from refs[start:end]
+            end = start
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        """
+        Возвращает ссылки на строки со значениями в диапазоне [low, high].
+
+        Args:
+            low: Нижняя граница (None - без ограничения)
+            high: Верхняя граница (None - без ограничения)
+            include_low (bool): Включать ли нижнюю границу
+            include_high (bool): Включать ли верхнюю границу
+
+        Returns:
+            list: Ссылки в порядке возрастания значения столбца
+        """
+        self._merge()
+        if low is None and high is None:
+            return list(self._refs)
+        sample = low if low is not None else high
+        type_name = type(sample).__name__
+        if low is None:
+            start = bisect_left(self._keys, (type_name,))
+        elif include_low:
+            start = bisect_left(self._keys, sort_key(low))
+        else:
+            start = bisect_right(self._keys, sort_key(low))
+        if high is None:
+            end = bisect_left(self._keys, (type_name + "\x00",))
+        elif include_high:
+            end = bisect_right(self._keys, sort_key(high))
+        else:
+            end = bisect_left(self._keys, sort_key(high))
+        return self._refs[start:end]
+
+
+class UniqueIndex:
+    """
+    Индекс по столбцу с уникальными значениями (первичный ключ ID).
+
+    Хранит отображение {значение: ссылка}: для ID это отображение
+    ID -> номер строки (колоночное хранение) или ID -> запись, поэтому поиск,
+    добавление и удаление выполняются за O(1).
+
+    Для колоночной таблицы отображение строится при первом поиске: до этого
+    add/remove ничего не делают, так как таблица изменяется на месте и
+    отображение будет построено уже по ее текущему состоянию.
+    """
+
+    kind = "unique"
+
+    def __init__(self, column, table_data=None):
+        self.column = column
+        self._table = table_data
+        self._refs = None if table_data is not None else {}
+
+    def _map(self):
+        if self._refs is None:
+            self._build(self._table)
+        return self._refs
+
+    def add(self, value, ref):
+        """Добавляет ссылку на строку со значением value"""
+        if self._refs is not None:
+            self._refs[value] = ref
+
+    def remove(self, value, ref):
+        """Удаляет ссылку на строку со значением value"""
+        if self._refs is None:
+            return
+        item = self._refs.get(value)
+        if item is ref or (item is not None and item == ref):
+            del self._refs[value]
+
+    def clear(self):
+        """Очищает индекс"""
+        self._table = None
+        self._refs = {}
+
+    def _build(self, table_data):
+        self._refs = dict(iter_column(table_data, self.column))
+        self._table = None
+        return self
+
+    def lookup(self, value):
+        """Возвращает список из ссылки на строку со значением value (или [])"""
+        refs = self._map()
+        return [refs[value]] if value in refs else []
+
+
+_INDEX_CLASSES = {"hash": HashIndex, "sorted": SortedIndex, "unique": UniqueIndex}
+
+
+def iter_column(table_data, column):
+    """
+    Перебирает пары (значение, ссылка) столбца таблицы.
+
+    Для колоночной таблицы ссылкой служит номер строки, для списка записей -
+    сама запись.
+    """
+    if hasattr(table_data, "iter_column"):
+        return table_data.iter_column(column)
+    return ((record.get(column), record) for record in table_data)
+
+
+def build_index(column, kind, table_data):
+    """
+    Строит индекс заданного типа по данным таблицы.
+
+    Args:
+        column (str): Имя столбца
+        kind (str): Тип индекса ('hash', 'sorted' или 'unique')
+        table_data (list | ColumnarTable): Данные таблицы
+
+    Returns:
+        HashIndex | SortedIndex: Построенный индекс
+    """
+    if kind not in _INDEX_CLASSES:
+        raise ValueError(f'Неподдерживаемый тип индекса: "{kind}"')
+    if kind == "unique":
+        if hasattr(table_data, "iter_column"):
+            return UniqueIndex(column, table_data)  # строится при первом поиске
+        return UniqueIndex(column)._build(table_data)
+    index = _INDEX_CLASSES[kind](column)
+    if kind == "sorted":
+        pairs = sorted(
+            ((sort_key(value), ref)
+             for value, ref in iter_column(table_data, column)),
+            key=lambda pair: pair[0],
+        )
+        index._keys = [key for key, _ in pairs]
+        index._refs = [ref for _, ref in pairs]
+    else:
+        for value, ref in iter_column(table_data, column):
+            index.add(value, ref)
+    return index
+
+
+def build_indexes(metadata, table_name, table_data):
+    """
+    Строит все индексы, зарегистрированные для таблицы в метаданных,
+    и уникальный индекс по первичному ключу ID, если индекса по ID нет.
+
+    Args:
+        metadata (dict): Метаданные всех таблиц
+        table_name (str): Имя таблицы
+        table_data (list): Данные таблицы
+
+    Returns:
+        dict: {'столбец': индекс}
+    """
+    table_meta = metadata.get(table_name, {})
+    indexes = {
+        column: build_index(column, kind, table_data)
+        for column, kind in table_meta.get("indexes", {}).items()
+    }
+    if PRIMARY_KEY not in indexes:
+        indexes[PRIMARY_KEY] = build_index(PRIMARY_KEY, "unique", table_data)
+    return indexes
+
+
+def add_to_indexes(indexes, record, ref=None):
+    """
+    Добавляет запись во все индексы таблицы.
+
+    Args:
+        indexes (dict): Индексы таблицы {'столбец': индекс}
+        record (dict): Значения строки {'столбец': значение}
+        ref: Ссылка на строку (по умолчанию - сама запись)
+    """
+    ref = record if ref is None else ref
+    for column, index in (indexes or {}).items():
+        index.add(record.get(column), ref)
+
+
+def remove_from_indexes(indexes, record, ref=None):
+    """Удаляет запись из всех индексов таблицы (см. add_to_indexes)"""
+    ref = record if ref is None else ref
+    for column, index in (indexes or {}).items():
+        index.remove(record.get(column), ref)
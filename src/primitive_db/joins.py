@@ -0,0 +1,164 @@
+from .parser import parse_columns
+from .planner import selectivity
+
+
+def join_columns(left_table, left_columns, right_table, right_columns):
+    """
+    Столбцы записей соединения: сначала столбцы левой таблицы, затем правой,
+    с именами вида 'таблица.столбец'.
+
+    Returns:
+        list: ['таблица.имя:тип', ...]
+    """
+    return [f"{table}.{column}"
+            for table, columns in ((left_table, left_columns),
+                                   (right_table, right_columns))
+            for column in columns]
+
+
+def qualify_column(column, tables):
+    """
+    Приводит имя столбца к виду 'таблица.столбец'.
+
+    Столбец без имени таблицы относится к той таблице, в которой он есть.
+
+    Args:
+        column (str): Имя столбца с именем таблицы или без него
+        tables (list): Пары (имя таблицы, столбцы ['имя:тип', ...])
+
+    Raises:
+        ValueError: Если таблицы или столбца нет либо столбец без имени
+            таблицы есть в обеих таблицах
+    """
+    names = {table: {name for name, _ in parse_columns(columns)}
+             for table, columns in tables}
+    if "." in column:
+        table, name = column.split(".", 1)
+        if table not in names:
+            raise ValueError(f'Таблица "{table}" не участвует в соединении')
+        if name not in names[table]:
+            raise ValueError(f'Столбец "{column}" не существует')
+        return column
+    owners = [table for table, _ in tables if column in names[table]]
+    if not owners:
+        raise ValueError(f'Столбец "{column}" не существует')
+    if len(owners) > 1:
+        raise ValueError(
+            f'Столбец "{column}" есть в обеих таблицах, укажите таблицу: '
+            f"{owners[0]}.{column}"
+        )
+    return f"{owners[0]}.{column}"
+
+
+def qualify_condition(condition, tables):
+    """Приводит имена столбцов условия к виду 'таблица.столбец' (см. qualify_column)"""
+    op = condition[0]
+    if op in ("and", "or"):
+        return op, tuple(qualify_condition(item, tables) for item in condition[1])
+    return (op, qualify_column(condition[1], tables)) + condition[2:]
+
+
+def _tables(condition):
+    """Таблицы, столбцы которых входят в условие"""
+    if condition[0] in ("and", "or"):
+        return {table for item in condition[1] for table in _tables(item)}
+    return {condition[1].split(".", 1)[0]}
+
+
+def _unqualify(condition):
+    """Условие с именами столбцов без имени таблицы"""
+    op = condition[0]
+    if op in ("and", "or"):
+        return op, tuple(_unqualify(item) for item in condition[1])
+    return (op, condition[1].split(".", 1)[1]) + condition[2:]
+
+
+def _conjunction(items):
+    if not items:
+        return None
+    return items[0] if len(items) == 1 else ("and", tuple(items))
+
+
+def split_condition(condition, left_table, right_table):
+    """
+    Разделяет условие соединения на части для каждой таблицы.
+
+    Операнды AND, относящиеся к одной таблице, проверяются при просмотре
+    этой таблицы (с ее индексами и разделами) - до соединения; остальное
+    проверяется для соединенных записей.
+
+    Args:
+        condition (tuple | None): Условие с именами 'таблица.столбец'
+            (см. qualify_condition)
+
+    Returns:
+        tuple: (условие левой таблицы, условие правой таблицы, условие
+            соединенных записей); части - с обычными именами столбцов,
+            кроме последней, или None
+    """
+    if condition is None:
+        return None, None, None
+    nodes = condition[1] if condition[0] == "and" else (condition,)
+    parts = {left_table: [], right_table: [], None: []}
+    for node in nodes:
+        tables = _tables(node)
+        parts[tables.pop() if len(tables) == 1 else None].append(node)
+    return (
+        _conjunction([_unqualify(node) for node in parts[left_table]]),
+        _conjunction([_unqualify(node) for node in parts[right_table]]),
+        _conjunction(parts[None]),
+    )
+
+
+class JoinSide:
+    """
+    Таблица, участвующая в соединении.
+
+    columns - столбцы таблицы ['имя:тип', ...], column - столбец соединения,
+    predicate - скомпилированное условие, проверяемое при просмотре таблицы
+    (см. split_condition), или None.
+    """
+
+    def __init__(self, table, columns, column, data, indexes=None,
+                 predicate=None, stats=None, partitions=None):
+        self.table = table
+        self.names = [name for name, _ in parse_columns(columns)]
+        self.column = column
+        self.data = data
+        self.indexes = indexes or {}
+        self.predicate = predicate
+        self.stats = stats
+        self.partitions = partitions
+
+    @property
+    def index(self):
+        """Индекс по столбцу соединения или None"""
+        return self.indexes.get(self.column)
+
+    def estimate(self):
+        """Оценка количества строк таблицы, удовлетворяющих ее условию"""
+        rows = len(self.data)
+        if self.predicate is None:
+            return rows
+        return selectivity(self.predicate.condition, self.stats, rows) * rows
+
+
+def choose_sides(left, right):
+    """
+    Выбирает порядок соединения.
+
+    Готовый индекс по столбцу соединения заменяет хэш-таблицу: если он есть,
+    по нему ищутся пары для строк другой таблицы. Иначе хэш-таблица
+    строится по таблице с меньшей оценкой количества строк - память
+    пропорциональна ей, - а большая таблица просматривается потоком.
+
+    Returns:
+        tuple: (просматриваемая таблица, таблица для поиска пар,
+            использовать ли ее индекс)
+    """
+    smaller, larger = sorted((left, right), key=JoinSide.estimate)
+    if larger.index is not None:
+        return smaller, larger, True
+    if smaller.index is not None:
+        return larger, smaller, True
+    return larger, smaller, False
@@ -0,0 +1,75 @@
+import errno
+import os
+from contextlib import contextmanager
+
+from .errors import DatabaseError
+
+try:
+    import fcntl
+except ImportError:  # не POSIX: блокировки между процессами недоступны
+    fcntl = None
+
+
+class LockError(DatabaseError):
+    """Блокировку нельзя получить (например, из-за взаимной блокировки)"""
+
+
+class FileLock:
+    """
+    Блокировка между процессами на основе fcntl.lockf.
+
+    Блокировка ставится на первый байт файла блокировки: разделяемая
+    (shared) - для чтения, исключительная - для записи. Дескриптор файла
+    держится открытым все время жизни объекта, так как закрытие любого
+    дескриптора файла снимает все его блокировки в процессе.
+    Взаимная блокировка процессов обнаруживается ядром и приводит к LockError.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self.held = None  # None, 'shared' или 'exclusive'
+
+    def _fileno(self):
+        if self._fd is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    def acquire(self, exclusive=True):
+        """Ожидает и получает блокировку"""
+        if fcntl is not None:
+            mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.lockf(self._fileno(), mode, 1, 0)
+            except OSError as e:
+                if e.errno == errno.EDEADLK:
+                    raise LockError(
+                        f"взаимная блокировка при обращении к {self.path}"
+                    ) from None
+                raise
+        self.held = "exclusive" if exclusive else "shared"
+
+    def release(self):
+        """Снимает блокировку"""
+        if fcntl is not None and self._fd is not None and self.held:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+        self.held = None
+
+    @contextmanager
+    def locked(self, exclusive=True):
+        """Контекстный менеджер: блокировка на время выполнения блока"""
+        self.acquire(exclusive)
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def close(self):
+        """Снимает блокировку и закрывает файл блокировки"""
+        self.release()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1,9 +1,89 @@
 #!/usr/bin/env python3
-from .engine import run
+import argparse
+import sys
 
+from .client import DEFAULT_HOST, DEFAULT_PORT
+from .engine import run, run_script
+from .metrics import metrics
+from .partitions import set_workers
+from .server import serve
 
-def main():
-    run()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="database",
+        description="Примитивная база данных с интерактивным и пакетным режимом.",
+    )
+    parser.add_argument(
+        "mode", nargs="?", choices=["serve"],
+        help="serve - запустить сервер, принимающий команды через сокет",
+    )
+    parser.add_argument(
+        "--script", metavar="FILE",
+        help="выполнить команды из файла ('-' - из стандартного ввода)",
+    )
+    parser.add_argument(
+        "--yes", action="store_true",
+        help="подтверждать удаление таблиц и записей без вопроса",
+    )
+    parser.add_argument(
+        "--socket", metavar="PATH",
+        help="serve: слушать Unix-сокет PATH вместо TCP",
+    )
+    parser.add_argument(
+        "--host", default=DEFAULT_HOST,
+        help=f"serve: адрес TCP (по умолчанию {DEFAULT_HOST})",
+    )
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT,
+        help=f"serve: порт TCP (по умолчанию {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--flush-interval", type=float, default=0.0, metavar="SECONDS",
+        help="интерактивный режим и serve: сбрасывать изменения на диск не "
+             "реже, чем раз в SECONDS (по умолчанию после каждой команды)",
+    )
+    parser.add_argument(
+        "--metrics", action="store_true",
+        help="собирать метрики выполнения команд (команда stats)",
+    )
+    parser.add_argument(
+        "--metrics-file", metavar="FILE",
+        help="собирать метрики и сохранить их в JSON-файл при завершении",
+    )
+    parser.add_argument(
+        "--workers", type=int, metavar="N",
+        help="процессов для параллельного просмотра больших таблиц "
+             "(по умолчанию - по числу ядер, 1 - без параллельности)",
+    )
+    options = parser.parse_args(argv)
+    
+    set_workers(options.workers)
+    if options.metrics or options.metrics_file:
+        metrics.enable()
+    try:
+        _run(parser, options)
+    finally:
+        if options.metrics_file:
+            metrics.export(options.metrics_file)
+
+
+def _run(parser, options):
+    if options.mode == "serve":
+        serve(options.socket, options.host, options.port, options.yes,
+              options.flush_interval)
+        return
+    if options.script is None:
+        run(options.flush_interval, assume_yes=options.yes)
+        return
+    if options.script == "-":
+        sys.exit(run_script(sys.stdin, options.yes))
+    try:
+        with open(options.script, 'r') as f:
+            lines = f.readlines()
+    except OSError as e:
+        parser.error(f"не удалось прочитать сценарий: {e}")
+    sys.exit(run_script(lines, options.yes))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,268 @@
+import cProfile
+import io
+import json
+import pstats
+from time import perf_counter_ns
+
+# Фазы выполнения команды в порядке вывода
+PHASES = ("parse", "load", "filter", "execute", "format", "save", "total")
+
+# Количество строк отчета профилировщика (profile <команда>)
+PROFILE_LINES = 25
+
+# Значения до 2**_PRECISION_BITS хранятся точно, большие - с точностью
+# 1/2**(_PRECISION_BITS - 1) (12.5%)
+_PRECISION_BITS = 4
+
+
+def _bucket(value):
+    """Номер корзины гистограммы: монотонен по значению"""
+    shift = value.bit_length() - _PRECISION_BITS
+    if shift <= 0:
+        return value
+    return (shift << _PRECISION_BITS) + (value >> shift)
+
+
+def _bucket_value(bucket):
+    """Середина диапазона значений корзины"""
+    shift = bucket >> _PRECISION_BITS
+    if shift == 0:
+        return bucket
+    low = (bucket & ((1 << _PRECISION_BITS) - 1)) << shift
+    return low + (1 << (shift - 1))
+
+
+class Histogram:
+    """
+    Гистограмма длительностей в наносекундах с логарифмическими корзинами.
+
+    Память не зависит от количества значений, перцентили вычисляются
+    с относительной погрешностью не более 12.5%.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._buckets = {}
+
+    def add(self, value):
+        """Добавляет значение (наносекунды)"""
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        bucket = _bucket(value)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        """Приближенный перцентиль (fraction от 0 до 1)"""
+        if not self.count:
+            return 0
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(max(_bucket_value(bucket), self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """Сводка в микросекундах"""
+        return {
+            "count": self.count,
+            "total_ms": self.total / 1e6,
+            "mean_us": self.total / self.count / 1e3 if self.count else 0.0,
+            "p50_us": self.percentile(0.5) / 1e3,
+            "p90_us": self.percentile(0.9) / 1e3,
+            "p99_us": self.percentile(0.99) / 1e3,
+            "max_us": self.max / 1e3,
+        }
+
+
+class _TimedRows:
+    """
+    Итератор записей select, измеряющий время их поиска (фаза filter).
+
+    Время выдачи записей не входит во время внешней фазы (format), а
+    результат записывается один раз - когда выборка прочитана или брошена.
+    """
+
+    def __init__(self, metrics, records, elapsed):
+        self._metrics = metrics
+        self._records = iter(records)
+        self._operation = metrics.operation
+        self._elapsed = elapsed
+        self._count = 0
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = perf_counter_ns()
+        try:
+            record = next(self._records)
+        except StopIteration:
+            self._add(perf_counter_ns() - start)
+            self._finish()
+            raise
+        self._add(perf_counter_ns() - start)
+        self._count += 1
+        return record
+
+    def _add(self, elapsed):
+        self._elapsed += elapsed
+        self._metrics._nested += elapsed
+
+    def _finish(self):
+        if not self._done:
+            self._done = True
+            metrics = self._metrics
+            metrics.record("filter", self._elapsed, self._operation)
+            metrics.count_rows(returned=self._count, operation=self._operation)
+
+    def __del__(self):
+        self._finish()
+
+
+class Metrics:
+    """
+    Сбор метрик выполнения команд: гистограммы длительности фаз (PHASES)
+    по видам команд и количество просмотренных и возвращенных строк.
+
+    Сбор выключен по умолчанию; выключенный, он стоит одной проверки
+    флага enabled в каждой точке измерения. Время фазы не включает время
+    вложенных в нее фаз (например, format - без поиска записей), кроме
+    фазы total - полного времени выполнения команды.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.operation = "other"  # вид текущей команды
+        self._histograms = {}  # (команда, фаза) -> Histogram
+        self._rows = {}  # команда -> [просмотрено, возвращено]
+        self._nested = 0  # время фаз, вложенных в текущую
+
+    def enable(self, enabled=True):
+        """Включает или выключает сбор метрик"""
+        self.enabled = enabled
+
+    def reset(self):
+        """Очищает накопленные метрики"""
+        self._histograms.clear()
+        self._rows.clear()
+
+    def record(self, phase, elapsed, operation=None):
+        """Добавляет длительность фазы (наносекунды) в гистограмму"""
+        key = (operation or self.operation, phase)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.add(elapsed)
+
+    def count_rows(self, scanned=0, returned=0, operation=None):
+        """Добавляет количество просмотренных и возвращенных строк"""
+        counts = self._rows.setdefault(operation or self.operation, [0, 0])
+        counts[0] += scanned
+        counts[1] += returned
+
+    def scanning(self, records):
+        """Итератор, считающий просмотренные строки"""
+        counts = self._rows.setdefault(self.operation, [0, 0])
+        for record in records:
+            counts[0] += 1
+            yield record
+
+    def measure(self, phase, func, *args, **kwargs):
+        """Вызывает func и записывает время вызова как фазу phase"""
+        operation = self.operation
+        outer = self._nested
+        self._nested = 0
+        start = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter_ns() - start
+            self.record(phase, elapsed - self._nested, operation)
+            self._nested = outer + elapsed
+
+    def measure_statement(self, func, *args, **kwargs):
+        """Вызывает func и записывает полное время вызова как фазу total"""
+        operation = self.operation
+        outer = self._nested
+        self._nested = 0
+        start = perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter_ns() - start
+            self.record("total", elapsed, operation)
+            self._nested = outer + elapsed
+
+    def measure_rows(self, func, *args, **kwargs):
+        """
+        Вызывает func, возвращающую итератор записей, и измеряет фазу filter:
+        время вызова и время получения каждой записи.
+        """
+        outer = self._nested
+        self._nested = 0
+        start = perf_counter_ns()
+        try:
+            records = func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter_ns() - start
+            own = elapsed - self._nested
+            self._nested = outer + elapsed
+        return _TimedRows(self, records, own)
+
+    def snapshot(self):
+        """
+        Возвращает накопленные метрики.
+
+        Returns:
+            dict: {'команда': {'phases': {'фаза': сводка Histogram},
+                'rows_scanned': N, 'rows_returned': N}}
+        """
+        operations = {}
+        for (operation, phase), histogram in self._histograms.items():
+            entry = operations.setdefault(operation, {"phases": {}})
+            entry["phases"][phase] = histogram.summary()
+        for operation, (scanned, returned) in self._rows.items():
+            entry = operations.setdefault(operation, {"phases": {}})
+            entry["rows_scanned"] = scanned
+            entry["rows_returned"] = returned
+        for entry in operations.values():
+            entry["phases"] = dict(sorted(
+                entry["phases"].items(),
+                key=lambda item: PHASES.index(item[0])
+                if item[0] in PHASES else len(PHASES),
+            ))
+        return dict(sorted(operations.items()))
+
+    def export(self, filepath):
+        """Сохраняет метрики в JSON-файл"""
+        with open(filepath, "w") as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+
+def profile_call(func, *args, limit=PROFILE_LINES):
+    """
+    Выполняет func под профилировщиком cProfile.
+
+    Returns:
+        tuple: (результат func, отчет - функции по суммарному времени)
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args)
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return result, report.getvalue().strip()
+
+
+# Глобальный сборщик метрик
+metrics = Metrics()
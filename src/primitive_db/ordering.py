@@ -0,0 +1,99 @@
+import heapq
+import pickle
+import tempfile
+from itertools import islice
+
+from .indexes import sort_key
+
+# Сколько записей сортируется в памяти: большая выборка без LIMIT
+# сортируется частями, которые записываются во временные файлы
+SORT_BUFFER_ROWS = 100_000
+
+# Записей в одном блоке временного файла
+_SPILL_BLOCK = 1024
+
+
+def record_key(column):
+    """Ключ сортировки записей по столбцу (пустые значения - первыми)"""
+    return lambda record: sort_key(record.get(column))
+
+
+def top_k(records, column, k, descending=False):
+    """
+    Первые k записей в порядке столбца.
+
+    Отбор идет через ограниченную кучу (heapq): O(n log k) времени и O(k)
+    памяти, без сортировки всей выборки.
+    """
+    select = heapq.nlargest if descending else heapq.nsmallest
+    return select(k, records, key=record_key(column))
+
+
+def _spill(chunk):
+    """Записывает отсортированную часть во временный файл"""
+    f = tempfile.TemporaryFile()
+    for start in range(0, len(chunk), _SPILL_BLOCK):
+        pickle.dump(chunk[start:start + _SPILL_BLOCK], f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def _read_spill(f):
+    """Перебирает записи временного файла части"""
+    while True:
+        try:
+            block = pickle.load(f)
+        except EOFError:
+            return
+        yield from block
+
+
+def sort_records(records, column, descending=False, buffer_rows=SORT_BUFFER_ROWS):
+    """
+    Сортирует записи по столбцу с ограничением памяти.
+
+    Выборка до buffer_rows записей сортируется в памяти. Большая выборка
+    сортируется внешней сортировкой слиянием: части по buffer_rows записей
+    сортируются и записываются во временные файлы, которые затем сливаются
+    потоком (heapq.merge). Сортировка устойчивая: записи с равными
+    значениями идут в порядке выборки. Временные файлы удаляются, когда
+    выборка прочитана или брошена.
+
+    Returns:
+        iterator: Записи в порядке столбца
+    """
+    key = record_key(column)
+    records = iter(records)
+    files = []
+    try:
+        while True:
+            chunk = list(islice(records, buffer_rows))
+            chunk.sort(key=key, reverse=descending)
+            if not files and len(chunk) < buffer_rows:
+                yield from chunk  # выборка поместилась в память
+                return
+            if chunk:
+                files.append(_spill(chunk))
+            if len(chunk) < buffer_rows:
+                break
+        del chunk
+        yield from heapq.merge(*map(_read_spill, files), key=key,
+                               reverse=descending)
+    finally:
+        for f in files:
+            f.close()
+
+
+def order_records(records, column, descending=False, offset=0, limit=None):
+    """
+    Упорядочивает записи для ORDER BY с учетом OFFSET и LIMIT.
+
+    С LIMIT нужны только offset + limit первых записей - они отбираются
+    кучей (см. top_k), иначе выполняется сортировка (см. sort_records).
+
+    Returns:
+        iterator: Записи в порядке столбца
+    """
+    if limit is not None:
+        return iter(top_k(records, column, offset + limit, descending)[offset:])
+    return islice(sort_records(records, column, descending), offset, None)
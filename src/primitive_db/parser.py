@@ -1,17 +1,366 @@
+import re
+import shlex
+from functools import lru_cache
+
+_VALUES_TUPLE = re.compile(r"\(([^()]*)\)")
+
+# Слово командной строки: подряд идущие символы без пробелов и кавычек
+# и строки в кавычках (как в shlex: 'a"b c"d' - одно слово 'ab cd')
+_SHELL_WORD = re.compile(r"""(?:[^\s"']|"[^"]*"|'[^']*')+""")
+_SHELL_QUOTED = re.compile(r""""([^"]*)"|'([^']*)'""")
+
+
+# Литерал команды: строка в кавычках, целое число или параметр ?
+_LITERAL = re.compile(
+    r"""(?:"([^"]*)"|'([^']*)')|(?<![\w?:.-])(-?\d+)(?![\w.:])|(\?)"""
+)
+# Допустимые соседи литерала в кавычках (иначе он - часть слова)
+_LITERAL_BOUNDARY = " \t(),=<>!"
+
+# Значение параметра, которое задается при выполнении (явный ? в команде)
+PLACEHOLDER = object()
+
+
+class Param:
+    """Параметр разобранной команды: i-е значение из списка параметров"""
+
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __repr__(self):
+        return f"?{self.index}"
+
+
+def normalize_command(command):
+    """
+    Выносит значения из текста команды в список параметров.
+
+    Строки в кавычках и целые числа заменяются параметрами ?0, ?1, ...,
+    поэтому команды, отличающиеся только значениями, дают один и тот же
+    текст и могут использовать один разобранный план. Значение строки в
+    кавычках - всегда str, как есть ("" и "?1" - тоже строки). Явный ?
+    дает параметр со значением PLACEHOLDER.
+
+    Returns:
+        tuple: (нормализованный текст, список значений параметров)
+    """
+    if "\\" in command:
+        return command.strip(), []  # экранирование разбирает только shlex
+    params = []
+
+    def replace(match):
+        double, single, number, placeholder = match.groups()
+        if number is not None:
+            params.append(int(number))
+        elif placeholder is not None:
+            params.append(PLACEHOLDER)
+        else:
+            start, end = match.span()
+            if (start and command[start - 1] not in _LITERAL_BOUNDARY) or (
+                    end < len(command) and command[end] not in _LITERAL_BOUNDARY):
+                return match.group()
+            params.append(double if double is not None else single)
+        return f"?{len(params) - 1}"
+
+    return _LITERAL.sub(replace, command).strip(), params
+
+
+def _unquote(match):
+    double, single = match.groups()
+    return double if double is not None else single
+
+
+def split_command(command):
+    """
+    Разбивает строку команды на слова так же, как shlex.split.
+    
+    Строки без обратной косой черты разбираются регулярным выражением,
+    что во много раз быстрее shlex; остальные (и строки с незакрытой
+    кавычкой, для сообщения об ошибке) передаются в shlex.split.
+    
+    Raises:
+        ValueError: Если в строке есть незакрытая кавычка
+    """
+    unquoted = _SHELL_QUOTED.sub("", command)
+    if "\\" in command or '"' in unquoted or "'" in unquoted:
+        return shlex.split(command)
+    return [
+        _SHELL_QUOTED.sub(_unquote, word) if '"' in word or "'" in word else word
+        for word in _SHELL_WORD.findall(command)
+    ]
+
+
+# Лексемы условия WHERE: строка в кавычках, оператор/скобка/запятая или слово
+_WHERE_TOKEN = re.compile(
+    r'\s*(?:("[^"]*")|(<=|>=|!=|<>|==|=|<|>|\(|\)|,)|([^\s"=<>!(),]+))'
+)
+_OPERATOR_ALIASES = {"==": "=", "<>": "!="}
+_WHERE_KEYWORDS = ("and", "or", "in")
+_TOKEN_NAMES = {"word": "имя столбца", "symbol": "оператор", "value": "значение"}
+COMPARISON_OPERATORS = ("=", "!=", "<", "<=", ">", ">=")
+
+
+def _tokenize_where(where_str):
+    tokens = []
+    pos = 0
+    where_str = where_str.strip()
+    while pos < len(where_str):
+        match = _WHERE_TOKEN.match(where_str, pos)
+        if not match or match.end() == pos:
+            raise ValueError(
+                f"Некорректный формат условия WHERE: {where_str[pos:]}"
+            )
+        quoted, symbol, word = match.groups()
+        if quoted is not None:
+            tokens.append(("value", quoted))
+        elif symbol is not None:
+            tokens.append(("symbol", _OPERATOR_ALIASES.get(symbol, symbol)))
+        elif word.lower() in _WHERE_KEYWORDS:
+            tokens.append(("keyword", word.lower()))
+        else:
+            tokens.append(("word", word))
+        pos = match.end()
+    return tokens
+
+
+class _WhereParser:
+    """
+    Разбор условия WHERE методом рекурсивного спуска.
+
+    Грамматика (AND связывает сильнее OR):
+        условие  := слагаемое ('or' слагаемое)*
+        слагаемое := множитель ('and' множитель)*
+        множитель := '(' условие ')' | столбец оператор значение
+                   | столбец 'in' '(' значение (',' значение)* ')'
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, kind=None, text=None):
+        token_kind, token_text = self._peek()
+        if token_kind is None or (kind and token_kind != kind) or (
+                text and token_text != text):
+            expected = text or _TOKEN_NAMES.get(kind, "продолжение условия")
+            found = token_text if token_text is not None else "конец строки"
+            raise ValueError(
+                f"Некорректный формат условия WHERE: ожидается {expected}, "
+                f"получено {found}"
+            )
+        self.pos += 1
+        return token_text
+
+    def parse(self):
+        condition = self._or()
+        if self.pos != len(self.tokens):
+            raise ValueError(
+                f"Некорректный формат условия WHERE: лишнее {self._peek()[1]}"
+            )
+        return condition
+
+    def _or(self):
+        items = [self._and()]
+        while self._peek() == ("keyword", "or"):
+            self.pos += 1
+            items.append(self._and())
+        return items[0] if len(items) == 1 else ("or", tuple(items))
+
+    def _and(self):
+        items = [self._factor()]
+        while self._peek() == ("keyword", "and"):
+            self.pos += 1
+            items.append(self._factor())
+        return items[0] if len(items) == 1 else ("and", tuple(items))
+
+    def _factor(self):
+        if self._peek() == ("symbol", "("):
+            self.pos += 1
+            condition = self._or()
+            self._take("symbol", ")")
+            return condition
+        column = self._take("word")
+        if self._peek() == ("keyword", "in"):
+            self.pos += 1
+            self._take("symbol", "(")
+            values = [self._value()]
+            while self._peek() == ("symbol", ","):
+                self.pos += 1
+                values.append(self._value())
+            self._take("symbol", ")")
+            return ("in", column, tuple(values))
+        operator = self._take("symbol")
+        if operator not in COMPARISON_OPERATORS:
+            raise ValueError(f"Неподдерживаемый оператор сравнения: {operator}")
+        return (operator, column, self._value())
+
+    def _value(self):
+        kind, text = self._peek()
+        if kind == "value":
+            self.pos += 1
+            return parse_value(text)
+        # Значение без кавычек может состоять из нескольких слов
+        words = []
+        while kind == "word":
+            words.append(text)
+            self.pos += 1
+            kind, text = self._peek()
+        if not words:
+            self._take("value")
+        return parse_value(' '.join(words))
+
 
 def parse_where(where_str):
-    """Парсит условие WHERE в словарь {'column': value}"""
-    if not where_str:
+    """
+    Парсит условие WHERE в дерево условия.
+    
+    Поддерживаются операторы =, !=, <, <=, >, >=, списки IN (...),
+    связки AND/OR и скобки. Узлы дерева - кортежи:
+    (оператор, столбец, значение), ('in', столбец, (значения)),
+    ('and', (узлы)) и ('or', (узлы)).
+    
+    Returns:
+        tuple | None: Дерево условия или None, если условия нет
+    """
+    if not where_str or not where_str.strip():
         return None
+    return _WhereParser(_tokenize_where(where_str)).parse()
+
+SELECT_OPTIONS = ("join", "limit", "offset", "format", "group", "order")
+OUTPUT_FORMATS = ("table", "tsv")
+
+# Агрегатные функции списка select
+AGGREGATE_FUNCTIONS = ("count", "sum", "min", "max", "avg")
+
+# Элемент списка select: функция(столбец | *) или имя столбца
+_SELECT_ITEM = re.compile(r"^(?:(\w+)\s*\(\s*(\*|[^\s()]+)\s*\)|([^\s()*]+))$")
+
+def parse_select_list(select_str):
+    """
+    Парсит список select между select и from: count(*), sum(score), age.
     
-    parts = where_str.split('=')
-    if len(parts) != 2:
-        raise ValueError("Некорректный формат условия WHERE")
+    Returns:
+        list: Пары (функция, столбец); для count(*) столбец - None, для
+            столбца без функции (группировки) функция - None
     
-    column = parts[0].strip()
-    value = parse_value(parts[1].strip())
+    Raises:
+        ValueError: Если элемент списка некорректен
+    """
+    items = []
+    for part in select_str.split(','):
+        match = _SELECT_ITEM.match(part.strip())
+        if not match:
+            raise ValueError(f"Некорректный элемент списка select: {part.strip()}")
+        function, argument, column = match.groups()
+        if column is not None:
+            items.append((None, column))
+            continue
+        function = function.lower()
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Неизвестная агрегатная функция: {function}")
+        if argument == "*" and function != "count":
+            raise ValueError(f"{function}(*) не поддерживается, укажите столбец")
+        items.append((function, None if argument == "*" else argument))
+    return items
+
+# Условие соединения: таблица.столбец = таблица.столбец
+_JOIN_CONDITION = re.compile(r"^\s*(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)\s*$")
+
+def parse_join_condition(on_str):
+    """
+    Парсит условие соединения после ON: users.ID = orders.user_id.
     
-    return {column: value}
+    Returns:
+        tuple: Пары (таблица, столбец) левой и правой частей равенства
+    
+    Raises:
+        ValueError: Если условие не является равенством столбцов двух таблиц
+    """
+    match = _JOIN_CONDITION.match(on_str)
+    if not match:
+        raise ValueError(
+            "JOIN ожидает условие ON <таблица>.<столбец> = <таблица>.<столбец>"
+        )
+    left_table, left_column, right_table, right_column = match.groups()
+    return (left_table, left_column), (right_table, right_column)
+
+def _take_option_words(tokens, i):
+    """Слова от позиции i до следующей части запроса select"""
+    words = []
+    while i < len(tokens) and tokens[i].lower() not in ("where", *SELECT_OPTIONS):
+        words.append(tokens[i])
+        i += 1
+    return words, i
+
+def parse_select_options(tokens):
+    """
+    Разбирает хвост команды select: [join таблица on условие] [where ...]
+    [group by столбец, ...] [order by столбец [asc|desc]] [limit N]
+    [offset N] [format F].
+    
+    Args:
+        tokens (list): Токены команды после имени таблицы
+    
+    Returns:
+        tuple: (строка условия WHERE или None,
+                {'limit': int | None, 'offset': int, 'format': str,
+                 'group_by': [столбцы], 'join': (таблица, строка условия ON)
+                 или None, 'order_by': (столбец, по убыванию) или None})
+    """
+    options = {"limit": None, "offset": 0, "format": "table", "group_by": [],
+               "join": None, "order_by": None}
+    where_tokens = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i].lower()
+        if token == "where":
+            where_tokens, i = _take_option_words(tokens, i + 1)
+            continue
+        if token == "group":
+            if i + 1 >= len(tokens) or tokens[i + 1].lower() != "by":
+                raise ValueError("ожидается GROUP BY <столбец>")
+            words, i = _take_option_words(tokens, i + 2)
+            columns = [name.strip() for name in ' '.join(words).split(',')]
+            if not all(columns):
+                raise ValueError("GROUP BY ожидает список столбцов")
+            options["group_by"] = columns
+            continue
+        if token == "order":
+            if i + 1 >= len(tokens) or tokens[i + 1].lower() != "by":
+                raise ValueError("ожидается ORDER BY <столбец> [asc|desc]")
+            words, i = _take_option_words(tokens, i + 2)
+            directions = [word.lower() for word in words[1:]]
+            if len(words) not in (1, 2) or directions not in ([], ["asc"], ["desc"]):
+                raise ValueError("ORDER BY ожидает один столбец и asc или desc")
+            options["order_by"] = (words[0], directions == ["desc"])
+            continue
+        if token == "join":
+            if i + 2 >= len(tokens) or tokens[i + 2].lower() != "on":
+                raise ValueError("ожидается JOIN <таблица> ON <условие>")
+            table = tokens[i + 1]
+            words, i = _take_option_words(tokens, i + 3)
+            options["join"] = (table, ' '.join(words))
+            continue
+        if token not in SELECT_OPTIONS or i + 1 >= len(tokens):
+            raise ValueError(f"Некорректная часть запроса: {tokens[i]}")
+        value = tokens[i + 1]
+        if token == "format":
+            if value.lower() not in OUTPUT_FORMATS:
+                raise ValueError(f"Неподдерживаемый формат вывода: {value}")
+            options["format"] = value.lower()
+        else:
+            number = parse_value(value)
+            if not (isinstance(number, Param) or value.isdigit()):
+                raise ValueError(f"{token.upper()} ожидает неотрицательное число")
+            options[token] = number
+        i += 2
+    where_str = ' '.join(where_tokens) if where_tokens else None
+    return where_str, options
 
 def parse_set(set_str):
     """Парсит условие SET в словарь {'column': new_value}"""
@@ -24,13 +373,58 @@ def parse_set(set_str):
     
     return {column: value}
 
+def parse_values_list(values_str):
+    """
+    Парсит список значений VALUES в список строк значений.
+    
+    Поддерживает как одну запись "(v1, v2)", так и несколько
+    "(v1, v2), (v3, v4)". Если скобок нет, вся строка считается одной записью.
+    """
+    tuples = _VALUES_TUPLE.findall(values_str)
+    if not tuples:
+        tuples = [values_str.strip('()')]
+    return [[v.strip() for v in values.split(',')] for values in tuples]
+
+def parse_records(values_rows, names):
+    """
+    Превращает строки значений в записи {'столбец': значение}.
+    
+    Args:
+        values_rows (list): Результат parse_values_list
+        names (list): Имена столбцов (без ID) в порядке значений
+    
+    Returns:
+        iterator: Записи с разобранными значениями
+    """
+    for line_no, values in enumerate(values_rows, start=1):
+        if len(values) != len(names):
+            raise ValueError(
+                f"запись {line_no}: ожидается {len(names)} значений, "
+                f"получено {len(values)}"
+            )
+        yield {name: parse_value(value) for name, value in zip(names, values)}
+
 def parse_value(value_str):
     """Парсит значение с учетом типа"""
     if value_str.startswith('"') and value_str.endswith('"'):
         return value_str[1:-1]  # строка
     elif value_str.lower() in ('true', 'false'):
         return value_str.lower() == 'true'  # bool
-    elif value_str.isdigit() or (value_str[0] == '-' and value_str[1:].isdigit()):
+    elif value_str.isdigit() or (value_str[:1] == '-' and value_str[1:].isdigit()):
         return int(value_str)  # int
+    elif value_str[:1] == "?" and value_str[1:].isdigit():
+        return Param(int(value_str[1:]))  # параметр (см. normalize_command)
     else:
-        return value_str  # оставляем как есть
\ No newline at end of file
+        return value_str  # оставляем как есть
+
+@lru_cache(maxsize=128)
+def _parse_columns(columns):
+    return tuple(tuple(col.split(":")) for col in columns)
+
+def parse_columns(columns):
+    """
+    Разбирает описания столбцов ['имя:тип', ...] в кортеж пар (имя, тип).
+    
+    Результат кэшируется, поэтому повторный разбор одной схемы бесплатен.
+    """
+    return _parse_columns(tuple(columns))
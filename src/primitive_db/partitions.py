@@ -0,0 +1,293 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, compress
+from operator import itemgetter
+
+from .aggregates import accumulate, merge
+from .columnar import ColumnarTable, IntColumn
+from .metrics import metrics
+
+# Количество строк в разделе таблицы
+PARTITION_ROWS = 65_536
+
+# Минимум строк в непропущенных разделах для параллельного просмотра: на
+# меньших объемах запуск процессов дороже выигрыша
+PARALLEL_MIN_ROWS = 250_000
+
+# Процессы пула наследуют данные таблицы при fork, без сериализации; без
+# fork (Windows) разделы просматриваются в текущем процессе
+_FORK = "fork" in multiprocessing.get_all_start_methods()
+
+_workers = os.cpu_count() or 1
+
+# Задание процесса пула (см. _inherit)
+_task = None
+
+
+def set_workers(workers):
+    """
+    Задает количество процессов для параллельного просмотра таблиц.
+
+    Args:
+        workers (int | None): Количество процессов (1 - без параллельности,
+            None - по числу ядер)
+    """
+    global _workers
+    _workers = max(1, workers or os.cpu_count() or 1)
+
+
+def get_workers():
+    """Количество процессов для параллельного просмотра (1, если fork нет)"""
+    return _workers if _FORK else 1
+
+
+def _may_match(node, zones):
+    """
+    Может ли условие выполняться для строк раздела с зонами min/max.
+
+    Проверка консервативная: False - только если по зонам ни одна строка
+    раздела условию не удовлетворяет.
+    """
+    op = node[0]
+    if op == "and":
+        return all(_may_match(item, zones) for item in node[1])
+    if op == "or":
+        return any(_may_match(item, zones) for item in node[1])
+    column, value = node[1], node[2]
+    if op == "!=" or column not in zones:
+        return True  # != выполняется и для пустых значений
+    zone = zones[column]
+    if zone is None:
+        return False  # в разделе нет значений столбца
+    low, high = zone
+    if op == "=":
+        return low <= value <= high
+    if op == "in":
+        return any(low <= item <= high for item in value)
+    if op == "<":
+        return low < value
+    if op == "<=":
+        return low <= value
+    if op == ">":
+        return high > value
+    return high >= value
+
+
+def _leaf_columns(node):
+    if node[0] in ("and", "or"):
+        return {column for item in node[1] for column in _leaf_columns(item)}
+    return {node[1]}
+
+
+def _zone(values):
+    """(min, max) непустых значений или None"""
+    values = [value for value in values if value is not None]
+    return (min(values), max(values)) if values else None
+
+
+class Partitions:
+    """
+    Разбиение таблицы на разделы по PARTITION_ROWS строк.
+
+    Для каждого раздела по мере надобности строятся зоны - минимум и
+    максимум значений столбцов из условий, - по которым разделы, заведомо
+    не содержащие подходящих строк, пропускаются без просмотра. Зоны
+    действительны, пока таблица не изменилась: сессия создает новое
+    разбиение при каждом изменении (см. session.TableState.partitions).
+
+    Просмотр непропущенных разделов распределяется по процессам
+    (ProcessPoolExecutor), результаты объединяются в порядке разделов.
+    """
+
+    def __init__(self, table_data, size=PARTITION_ROWS):
+        self.table_data = table_data
+        self.size = size
+        self._zones = {}  # столбец -> [зона раздела]
+        self._selects = 0
+        if isinstance(table_data, ColumnarTable):
+            slots = table_data.slot_count()
+        else:
+            slots = len(table_data)
+        self.bounds = [(start, min(start + size, slots))
+                       for start in range(0, slots, size)]
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def _column_zones(self, column):
+        zones = self._zones.get(column)
+        if zones is None:
+            data = self.table_data
+            if isinstance(data, ColumnarTable):
+                col = data.column(column)
+                if isinstance(col, IntColumn):
+                    buffer = col.buffer()
+                    zones = [_zone(buffer[start:stop])
+                             for start, stop in self.bounds]
+                else:
+                    zones = [_zone(map(col.__getitem__, range(start, stop)))
+                             for start, stop in self.bounds]
+            else:
+                zones = [_zone(record.get(column) for record in data[start:stop])
+                         for start, stop in self.bounds]
+            self._zones[column] = zones
+        return zones
+
+    def select(self, condition=None):
+        """
+        Номера разделов, которые нужно просмотреть для условия.
+
+        Зоны столбца строятся (один проход по нему) со второго просмотра
+        неизмененной таблицы: если таблица меняется после каждого
+        просмотра, зоны не окупаются.
+        """
+        self._selects += 1
+        if condition is None:
+            return list(range(len(self.bounds)))
+        columns = _leaf_columns(condition)
+        if self._selects < 2:
+            columns = {column for column in columns if column in self._zones}
+        zones = {column: self._column_zones(column) for column in columns}
+        return [
+            i for i in range(len(self.bounds))
+            if _may_match(condition,
+                          {column: zones[column][i] for column in columns})
+        ]
+
+    def rows_in(self, selected):
+        """Количество строк (с удаленными) в разделах selected"""
+        return sum(self.bounds[i][1] - self.bounds[i][0] for i in selected)
+
+    def workers(self, selected):
+        """Количество процессов для просмотра разделов selected"""
+        if self.rows_in(selected) < PARALLEL_MIN_ROWS:
+            return 1
+        return min(get_workers(), len(selected))
+
+    def _map(self, kind, selected, workers, *args):
+        """
+        Выполняет задание для каждого раздела из selected и возвращает
+        итератор результатов в порядке разделов.
+        """
+        if metrics.enabled:
+            metrics.count_rows(scanned=self.rows_in(selected))
+        bounds = [self.bounds[i] for i in selected]
+        task = (kind, self.table_data, args)
+        if workers < 2:
+            return (_run(task, start, stop, local=True) for start, stop in bounds)
+        # Пул создается на каждый просмотр: процессы, запущенные через fork,
+        # видят текущее состояние таблицы; аргументы initializer при fork
+        # не сериализуются
+        pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("fork"),
+            initializer=_inherit, initargs=(task,),
+        )
+        starts, stops = zip(*bounds)
+        return _results(pool, pool.map(_run_inherited, starts, stops))
+
+    def scan(self, predicate):
+        """
+        Перебирает ссылки на строки, удовлетворяющие условию, по разделам.
+
+        Returns:
+            iterator | None: Записи (для колоночной таблицы - номера строк)
+                в порядке таблицы или None, если разделы не помогают (ни
+                один не пропущен, а параллельный просмотр не нужен) -
+                тогда выгоднее обычный просмотр
+        """
+        selected = self.select(predicate.condition)
+        workers = self.workers(selected)
+        if workers < 2 and len(selected) == len(self.bounds):
+            return None
+        refs = chain.from_iterable(self._map("scan", selected, workers, predicate))
+        if workers < 2 or isinstance(self.table_data, ColumnarTable):
+            return refs
+        return map(self.table_data.__getitem__, refs)  # номера строк -> записи
+
+    def aggregate(self, predicate, columns, group_width, functions):
+        """
+        Накапливает агрегаты по разделам (см. aggregates.accumulate)
+        и объединяет состояния групп в порядке разделов.
+
+        Returns:
+            dict | None: Состояния групп или None, если разделы не помогают
+                (см. scan)
+        """
+        condition = predicate.condition if predicate is not None else None
+        selected = self.select(condition)
+        workers = self.workers(selected)
+        if workers < 2 and len(selected) == len(self.bounds):
+            return None
+        groups = {}
+        for partial in self._map("aggregate", selected, workers, predicate,
+                                 columns, group_width, functions):
+            merge(groups, partial, functions)
+        return groups
+
+
+def _results(pool, results):
+    """Результаты пула по разделам; пул завершается и при брошенной выборке"""
+    try:
+        yield from results
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _inherit(task):
+    """Запоминает задание в процессе пула при его запуске"""
+    global _task
+    _task = task
+
+
+def _run_inherited(start, stop):
+    """Выполняет унаследованное задание для раздела в процессе пула"""
+    return _run(_task, start, stop)
+
+
+def _positions(table_data, predicate, start, stop):
+    """Номера подходящих строк раздела [start, stop)"""
+    if isinstance(table_data, ColumnarTable):
+        live = table_data.live_mask()
+        positions = range(start, stop)
+        if live is not None:
+            positions = compress(positions, live[start:stop])
+        if predicate is None:
+            return positions
+        return filter(predicate.position_test(table_data), positions)
+    positions = range(start, stop)
+    if predicate is None:
+        return positions
+    return compress(positions, map(predicate.test, table_data[start:stop]))
+
+
+def _records(table_data, predicate, start, stop):
+    """Подходящие записи раздела [start, stop) таблицы-списка"""
+    records = table_data[start:stop]
+    return records if predicate is None else filter(predicate.test, records)
+
+
+def _run(task, start, stop, local=False):
+    """
+    Выполняет задание для раздела [start, stop).
+
+    В процессе пула (local=False) результат просмотра - номера строк, а не
+    записи: записи пришлось бы сериализовать, и они были бы копиями.
+    """
+    kind, table_data, args = task
+    columnar = isinstance(table_data, ColumnarTable)
+    if kind == "scan":
+        if local and not columnar:
+            return _records(table_data, args[0], start, stop)
+        return list(_positions(table_data, args[0], start, stop))
+    predicate, columns, group_width, functions = args
+    if columnar:
+        cols = [table_data.column(name) for name in columns]
+        positions = _positions(table_data, predicate, start, stop)
+        rows = (tuple([col[pos] for col in cols]) for pos in positions)
+    else:
+        records = _records(table_data, predicate, start, stop)
+        get = itemgetter(*columns)
+        rows = (((get(record),) for record in records) if len(columns) == 1
+                else map(get, records))
+    return accumulate(rows, group_width, functions)
@@ -0,0 +1,225 @@
+from .indexes import PRIMARY_KEY, iter_column
+from .parser import parse_columns
+from .predicates import RANGE_OPERATORS, range_bounds
+
+# Оценочная стоимость операций в наносекундах (порядок величин для CPython)
+ROW_TEST_NS = 100  # проверка условия для строки при полном просмотре
+CANDIDATE_NS = 200  # получение строки-кандидата из индекса и ее проверка
+LOOKUP_NS = 1000  # одно обращение к индексу
+
+# Избирательность условий, если статистика не собрана (доля строк)
+DEFAULT_EQUALITY = 0.005
+DEFAULT_RANGE = 1 / 3
+
+
+def collect_stats(table_data, columns):
+    """
+    Собирает статистику таблицы для планировщика.
+
+    Args:
+        table_data (list | ColumnarTable): Данные таблицы
+        columns (list): Столбцы таблицы ['имя:тип', ...]
+
+    Returns:
+        dict: {'rows': N, 'columns': {'столбец': {'distinct': N,
+            'min': значение, 'max': значение}}} (min/max - для int и str)
+    """
+    stats = {"rows": len(table_data), "columns": {}}
+    for name, col_type in parse_columns(columns):
+        values = {value for value, _ in iter_column(table_data, name)}
+        values.discard(None)
+        entry = {"distinct": len(values)}
+        if values and col_type in ("int", "str"):
+            entry["min"] = min(values)
+            entry["max"] = max(values)
+        stats["columns"][name] = entry
+    return stats
+
+
+def _column_stats(column, stats, rows):
+    """Статистика столбца с числом различных значений на текущий размер"""
+    entry = dict((stats or {}).get("columns", {}).get(column) or {})
+    if column == PRIMARY_KEY or (
+            stats and entry and entry.get("distinct") == stats.get("rows")):
+        entry["distinct"] = rows  # уникальный столбец остается уникальным
+    elif "distinct" in entry:
+        entry["distinct"] = min(entry["distinct"], rows)
+    return entry
+
+
+def _equality(column, value, stats, rows):
+    entry = _column_stats(column, stats, rows)
+    if "min" in entry and not entry["min"] <= value <= entry["max"]:
+        return 0.0
+    if entry.get("distinct"):
+        return 1 / entry["distinct"]
+    if stats and "distinct" in entry:
+        return 0.0  # в столбце нет значений
+    return DEFAULT_EQUALITY
+
+
+def _range(column, nodes, stats, rows):
+    entry = _column_stats(column, stats, rows)
+    low, high, _, _ = range_bounds(nodes)
+    if not isinstance(entry.get("min"), int) or isinstance(entry["min"], bool):
+        return DEFAULT_RANGE if low is None or high is None else DEFAULT_RANGE ** 2
+    col_min, col_max = entry["min"], entry["max"]
+    low = col_min if low is None else max(low, col_min)
+    high = col_max if high is None else min(high, col_max)
+    if high < low:
+        return 0.0
+    return (high - low + 1) / (col_max - col_min + 1)
+
+
+def selectivity(node, stats=None, rows=0):
+    """
+    Оценивает долю строк, удовлетворяющих условию.
+
+    Args:
+        node (tuple): Условие (см. parser.parse_where) со значениями
+        stats (dict, optional): Статистика таблицы (см. collect_stats);
+            без нее используются оценки по умолчанию
+        rows (int): Текущее количество строк таблицы
+
+    Returns:
+        float: Доля строк от 0 до 1
+    """
+    op = node[0]
+    if op == "and":
+        result = 1.0
+        ranges = {}
+        for item in node[1]:
+            if item[0] in RANGE_OPERATORS:
+                ranges.setdefault(item[1], []).append(item)
+            else:
+                result *= selectivity(item, stats, rows)
+        for column, nodes in ranges.items():
+            result *= _range(column, nodes, stats, rows)
+        return result
+    if op == "or":
+        missed = 1.0
+        for item in node[1]:
+            missed *= 1 - selectivity(item, stats, rows)
+        return 1 - missed
+    column, value = node[1], node[2]
+    if op == "=":
+        return _equality(column, value, stats, rows)
+    if op == "!=":
+        return 1 - _equality(column, value, stats, rows)
+    if op == "in":
+        return min(1.0, sum(_equality(column, item, stats, rows)
+                            for item in set(value)))
+    return _range(column, [node], stats, rows)
+
+
+class AccessPath:
+    """
+    Способ доступа к строкам таблицы.
+
+    kind: 'scan' (полный просмотр), 'id' (поиск по первичному ключу) или
+    'index' (кандидаты по индексам); node - часть условия, по которой
+    ищутся кандидаты (см. predicates.Predicate.candidates), candidates -
+    оценка количества строк-кандидатов, cost - оценка времени, нс.
+    """
+
+    def __init__(self, kind, candidates, cost, node=None, indexes=()):
+        self.kind = kind
+        self.candidates = candidates
+        self.cost = cost
+        self.node = node
+        self.indexes = indexes  # пары (столбец, тип индекса)
+
+    def describe(self):
+        """Описание способа доступа для explain"""
+        if self.kind == "scan":
+            return "полный просмотр"
+        if self.kind == "id":
+            return f"поиск по {PRIMARY_KEY}"
+        used = ", ".join(f"{kind} по {column}" for column, kind in self.indexes)
+        prefix = "объединение индексов" if len(self.indexes) > 1 else "индекс"
+        return f"{prefix} {used}"
+
+
+def _index_path(node, indexes, stats, rows):
+    """Путь через индексы для части условия или None, если индексы не подходят"""
+    op = node[0]
+    if op == "or":
+        parts = [_index_path(item, indexes, stats, rows) for item in node[1]]
+        if None in parts:
+            return None
+        return AccessPath(
+            "index", sum(part.candidates for part in parts),
+            sum(part.cost for part in parts),
+            ("or", tuple(part.node for part in parts)),
+            tuple(pair for part in parts for pair in part.indexes),
+        )
+    if op == "and":
+        # Вложенное AND (внутри OR): лучший из путей его операндов
+        paths = access_paths(node, indexes, stats, rows)[1:]
+        return min(paths, key=lambda path: path.cost, default=None)
+    column = node[1]
+    index = indexes.get(column)
+    if index is None or op == "!=":
+        return None
+    if op in RANGE_OPERATORS and index.kind != "sorted":
+        return None
+    candidates = selectivity(node, stats, rows) * rows
+    lookups = len(set(node[2])) if op == "in" else 1
+    cost = lookups * LOOKUP_NS + candidates * CANDIDATE_NS
+    if column == PRIMARY_KEY and op == "=":
+        return AccessPath("id", candidates, cost, node)
+    return AccessPath("index", candidates, cost, node, ((column, index.kind),))
+
+
+def access_paths(condition, indexes, stats=None, rows=0):
+    """
+    Перечисляет возможные способы доступа для условия.
+
+    Для AND рассматривается каждый операнд, допускающий поиск по индексу
+    (сравнения одного столбца - как один диапазон), остальные операнды
+    проверяются для найденных кандидатов.
+
+    Returns:
+        list: AccessPath, первым идет полный просмотр
+    """
+    paths = [AccessPath("scan", rows, rows * ROW_TEST_NS)]
+    if not indexes:
+        return paths
+    nodes = condition[1] if condition[0] == "and" else (condition,)
+    ranges = {}
+    for node in nodes:
+        if node[0] in RANGE_OPERATORS:
+            ranges.setdefault(node[1], []).append(node)
+            continue
+        path = _index_path(node, indexes, stats, rows)
+        if path is not None:
+            paths.append(path)
+    for group in ranges.values():
+        node = group[0] if len(group) == 1 else ("and", tuple(group))
+        if len(group) > 1:
+            # Диапазон из нескольких сравнений одного столбца
+            column = group[0][1]
+            index = indexes.get(column)
+            if index is None or index.kind != "sorted":
+                continue
+            candidates = selectivity(node, stats, rows) * rows
+            paths.append(AccessPath("index", candidates,
+                                    LOOKUP_NS + candidates * CANDIDATE_NS, node,
+                                    ((column, index.kind),)))
+            continue
+        path = _index_path(node, indexes, stats, rows)
+        if path is not None:
+            paths.append(path)
+    return paths
+
+
+def choose_path(condition, indexes, stats=None, rows=0):
+    """
+    Выбирает самый дешевый способ доступа (см. access_paths).
+
+    Равенство по ID выбирается сразу, без оценки остальных путей.
+    """
+    if condition[0] == "=" and condition[1] == PRIMARY_KEY and indexes:
+        return AccessPath("id", 1, LOOKUP_NS, condition)
+    paths = access_paths(condition, indexes, stats, rows)
+    return min(paths, key=lambda path: path.cost)
@@ -0,0 +1,558 @@
+from collections import OrderedDict
+from time import perf_counter_ns
+
+from .aggregates import check_aggregates
+from .cache import make_cache_key
+from .core import (
+    delete_records,
+    insert_records,
+    iter_aggregate,
+    iter_join,
+    iter_select,
+    order_index,
+    require_table,
+    update_records,
+    validate_values,
+)
+from .errors import ValidationError
+from .indexes import PRIMARY_KEY
+from .joins import (
+    JoinSide,
+    join_columns,
+    qualify_column,
+    qualify_condition,
+    split_condition,
+)
+from .metrics import metrics
+from .ordering import order_records
+from .parser import (
+    PLACEHOLDER,
+    Param,
+    normalize_command,
+    parse_columns,
+    parse_join_condition,
+    parse_select_list,
+    parse_select_options,
+    parse_set,
+    parse_value,
+    parse_values_list,
+    parse_where,
+    split_command,
+)
+from .planner import (
+    ROW_TEST_NS,
+    AccessPath,
+    access_paths,
+    choose_path,
+    selectivity,
+)
+from .predicates import bind_value, compile_where
+
+# Команды, для которых строится план с параметрами
+PLANNED_COMMANDS = ("select", "insert", "update", "delete")
+
+# Количество разобранных команд в кэше планов
+DEFAULT_MAX_PLANS = 512
+
+
+def validated(func, *args):
+    """Вызывает func, приводя ValueError к ValidationError"""
+    try:
+        return func(*args)
+    except ValidationError:
+        raise
+    except ValueError as e:
+        raise ValidationError(str(e)) from None
+
+
+def _bind_record(template, params):
+    """Подставляет значения параметров в запись"""
+    return {name: bind_value(value, params) for name, value in template.items()}
+
+
+class StatementPlan:
+    """
+    Разобранная команда select, insert, update или delete.
+
+    Текст команды с параметрами вместо значений (см. parser.normalize_command)
+    разбирается один раз. При первом выполнении план проверяется по схеме
+    таблицы и компилируется (условие WHERE - в Predicate); повторно это
+    делается, только если схема изменилась. Выполнение сводится к подстановке
+    значений параметров.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        args = split_command(text)
+        kind = args[0]
+        self.kind = kind
+        self.where = None
+        self.join = None
+        if kind == "select" and "from" in args[1:-1]:
+            split = args.index("from")
+            self.table = args[split + 1]
+            # Список select (агрегатные функции и столбцы группировки)
+            self.items = parse_select_list(' '.join(args[1:split])) if split > 1 else []
+            where_str, options = parse_select_options(args[split + 2:])
+            self.where = parse_where(where_str)
+            self.offset, self.limit = options["offset"], options["limit"]
+            self.format = options["format"]
+            self.group_by = options["group_by"]
+            self.order_by = options["order_by"]
+            if options["join"] is not None:
+                self.join = self._parse_join(*options["join"])
+        elif (kind == "insert" and len(args) > 4 and args[1] == "into"
+                and args[3] == "values"):
+            self.table = args[2]
+            self.rows = [list(map(parse_value, row))
+                         for row in parse_values_list(' '.join(args[4:]))]
+        elif kind == "update" and len(args) > 3 and args[2] == "set":
+            if "where" not in args:
+                raise ValueError("укажите условие WHERE")
+            self.table = args[1]
+            split = args.index("where")
+            self.values = parse_set(' '.join(args[3:split]))
+            self.where = parse_where(' '.join(args[split + 1:]))
+        elif kind == "delete" and len(args) > 2 and args[1] == "from":
+            self.table = args[2]
+            self.where = parse_where(' '.join(args[4:]))
+        else:
+            raise ValueError(f"неполная команда {kind}")
+        self._schema = None
+
+    def _parse_join(self, table, on_str):
+        """
+        Разбирает join: (таблица, столбец соединения таблицы из from,
+        столбец соединения таблицы из join).
+        """
+        if self.items or self.group_by:
+            raise ValueError("агрегаты и GROUP BY не поддерживаются вместе с JOIN")
+        if table == self.table:
+            raise ValueError("соединение таблицы с самой собой не поддерживается")
+        first, second = parse_join_condition(on_str)
+        columns = dict((first, second))
+        if len(columns) != 2 or set(columns) != {self.table, table}:
+            raise ValueError(
+                f"условие ON должно связывать столбцы таблиц {self.table} и {table}"
+            )
+        return table, columns[self.table], columns[table]
+
+    def _prepare_join(self, columns, other):
+        """Проверяет select с join по схемам обеих таблиц и компилирует условия"""
+        table, left_column, right_column = self.join
+        types = []
+        for name, schema, column in ((self.table, columns, left_column),
+                                     (table, other, right_column)):
+            col_types = dict(parse_columns(schema))
+            if column not in col_types:
+                raise ValidationError(f'Столбец "{name}.{column}" не существует')
+            types.append(col_types[column])
+        if types[0] != types[1]:
+            raise ValidationError(
+                f"столбцы соединения имеют разные типы: {types[0]} и {types[1]}"
+            )
+        self._columns = join_columns(self.table, columns, table, other)
+        tables = [(self.table, columns), (table, other)]
+        where = None
+        if self.where is not None:
+            where = validated(qualify_condition, self.where, tables)
+        self._order = None
+        if self.order_by is not None:
+            column, descending = self.order_by
+            self._order = (validated(qualify_column, column, tables), descending)
+        left, right, residual = split_condition(where, self.table, table)
+        self._join_predicates = (
+            validated(compile_where, left, columns),
+            validated(compile_where, right, other),
+            validated(compile_where, residual, self._columns),
+        )
+        self._predicate = None
+        self._parametrized = Param in {type(value) for value in self._constants()}
+        self._schema = (columns, other)
+
+    def _prepare(self, columns):
+        """Проверяет план по схеме таблицы и компилирует условие"""
+        if self.kind == "insert":
+            names = [name for name, _ in parse_columns(columns)[1:]]
+            records = []
+            for line_no, row in enumerate(self.rows, start=1):
+                if len(row) != len(names):
+                    raise ValidationError(
+                        f"запись {line_no}: ожидается {len(names)} значений, "
+                        f"получено {len(row)}"
+                    )
+                record = dict(zip(names, row))
+                validate_values(columns, record)
+                records.append(record)
+            self._records = records
+        else:
+            self._predicate = validated(compile_where, self.where, columns)
+        if self.kind == "select":
+            self._columns = columns
+            if self.items or self.group_by:
+                self._columns = validated(check_aggregates, columns, self.items,
+                                          self.group_by)
+            self._order = None
+            if self.order_by is not None:
+                column = self.order_by[0]
+                if column not in {name for name, _ in parse_columns(self._columns)}:
+                    raise ValidationError(
+                        f'Столбец ORDER BY "{column}" не существует в результате'
+                    )
+                self._order = self.order_by
+        if self.kind == "update":
+            validate_values(columns, self.values)
+        self._parametrized = Param in {type(value) for value in self._constants()}
+        self._schema = columns
+
+    def _constants(self):
+        """Значения, записанные в плане (кроме условия WHERE)"""
+        if self.kind == "insert":
+            return [value for row in self.rows for value in row]
+        if self.kind == "update":
+            return list(self.values.values())
+        if self.kind == "select":
+            return [self.offset, self.limit]
+        return []
+
+    def prepare(self, metadata):
+        """
+        Проверяет план по текущей схеме таблицы, если она изменилась.
+
+        Returns:
+            list: Столбцы таблицы ['имя:тип', ...]
+
+        Raises:
+            TableNotFoundError: Если таблица не существует
+            ValidationError: Если команда не подходит к схеме
+        """
+        columns = require_table(metadata, self.table)["columns"]
+        if self.join is not None:
+            other = require_table(metadata, self.join[0])["columns"]
+            if self._schema is None or (columns, other) != self._schema:
+                self._prepare_join(columns, other)
+        elif columns is not self._schema and columns != self._schema:
+            self._prepare(columns)
+        return columns
+
+    @property
+    def aggregated(self):
+        """Есть ли в select агрегатные функции или GROUP BY"""
+        return self.kind == "select" and bool(self.items or self.group_by)
+
+    def result_columns(self, metadata):
+        """
+        Столбцы записей, которые возвращает select.
+
+        Returns:
+            list: ['имя:тип', ...] - столбцы таблицы или, для агрегатов,
+                столбцы результата (см. aggregates.check_aggregates), для
+                join - столбцы обеих таблиц (см. joins.join_columns)
+        """
+        self.prepare(metadata)
+        return self._columns
+
+    def id_equality(self, params=()):
+        """Возвращает ID, если условие - одно равенство по ID, иначе None"""
+        where = self.where
+        if where and where[0] == "=" and where[1] == PRIMARY_KEY:
+            return bind_value(where[2], params)
+        return None
+
+    def run(self, session, params=()):
+        """
+        Выполняет план со значениями параметров.
+
+        При включенном сборе метрик время select учитывается как фаза filter
+        (вместе с получением записей), остальных команд - как фаза execute.
+
+        Args:
+            session (Session): Сессия с загруженными таблицами
+            params (list): Значения параметров (см. parser.normalize_command)
+
+        Returns:
+            iterator | range | int: Записи для select, ID новых записей для
+                insert, количество записей для update и delete
+
+        Raises:
+            TableNotFoundError: Если таблица не существует
+            ValidationError: Если значения не соответствуют схеме
+        """
+        if not metrics.enabled:
+            return self._run(session, params)
+        metrics.operation = self.kind
+        if self.kind == "select":
+            return metrics.measure_rows(self._run, session, params)
+        result = metrics.measure("execute", self._run, session, params)
+        if self.kind != "insert":
+            metrics.count_rows(returned=result)
+        return result
+
+    def explain(self, session, params=()):
+        """
+        Показывает, как будет выполнена команда, и проверяет оценки.
+
+        Выбор способа доступа (см. planner.choose_path) сравнивается
+        с фактическим выполнением поиска записей; update и delete
+        при этом ничего не изменяют.
+
+        Args:
+            session (Session): Сессия с загруженными таблицами
+            params (list): Значения параметров (см. parser.normalize_command)
+
+        Returns:
+            dict: {'rows': строк в таблице, 'stats': собрана ли статистика,
+                'path': выбранный AccessPath, 'rejected': остальные пути,
+                'estimated_rows': оценка числа найденных записей,
+                'candidates': просмотрено строк, 'matched': найдено записей,
+                'elapsed_ns': время поиска, 'partitions': (просмотрено
+                разделов, всего разделов, процессов) при просмотре по
+                разделам или None, 'order': способ упорядочивания для
+                ORDER BY или None}
+
+        Raises:
+            TableNotFoundError: Если таблица не существует
+            ValidationError: Если команда не подходит к схеме или это insert
+        """
+        if self.kind == "insert":
+            raise ValidationError("explain поддерживает select, update и delete")
+        if self.join is not None:
+            raise ValidationError("explain не поддерживает JOIN")
+        if PLACEHOLDER in params:
+            raise ValidationError("не заданы значения параметров ?")
+        columns = self.prepare(session.metadata)
+        predicate = self._predicate
+        if predicate is not None and predicate.parametrized:
+            predicate = validated(predicate.bind, params, columns)
+        state = session.table(self.table)
+        stats = session.metadata[self.table].get("stats")
+        rows = len(state.data)
+        if predicate is None:
+            path = AccessPath("scan", rows, rows * ROW_TEST_NS)
+            rejected, estimated = [], rows
+        else:
+            condition = predicate.condition
+            path = choose_path(condition, state.indexes, stats, rows)
+            rejected = [
+                other for other in access_paths(condition, state.indexes,
+                                                stats, rows)
+                if (other.kind, other.node) != (path.kind, path.node)
+            ]
+            estimated = selectivity(condition, stats, rows) * rows
+
+        start = perf_counter_ns()
+        matched = sum(1 for _ in iter_select(state.data, predicate,
+                                             state.indexes, stats=stats,
+                                             partitions=state.partitions))
+        elapsed = perf_counter_ns() - start
+        candidates = rows
+        scanned = None
+        if path.node is not None:
+            candidates = len(predicate.candidates(state.indexes, path.node))
+        elif predicate is not None and len(state.partitions) > 1:
+            partitions = state.partitions
+            selected = partitions.select(predicate.condition)
+            workers = partitions.workers(selected)
+            if len(selected) < len(partitions) or workers > 1:
+                scanned = (len(selected), len(partitions), workers)
+                candidates = min(rows, partitions.rows_in(selected))
+        order = None
+        if self.kind == "select" and self._order is not None:
+            column, descending = self._order
+            index = None
+            if not self.aggregated:
+                index = order_index(state.data, predicate, state.indexes, column,
+                                    stats)
+            if index is not None and index.kind == "sorted":
+                order = f"обход индекса sorted по {column}"
+            elif index is not None:
+                order = f"обход таблицы в порядке {PRIMARY_KEY}"
+            elif self.limit is not None:
+                order = "отбор top-k кучей"
+            else:
+                order = "сортировка (внешняя при большой выборке)"
+            if descending:
+                order += ", по убыванию"
+        return {
+            "rows": rows, "stats": stats is not None, "path": path,
+            "rejected": rejected, "estimated_rows": estimated,
+            "candidates": candidates, "matched": matched, "elapsed_ns": elapsed,
+            "partitions": scanned, "order": order,
+        }
+
+    def _run(self, session, params):
+        if PLACEHOLDER in params:
+            raise ValidationError("не заданы значения параметров ?")
+        columns = self.prepare(session.metadata)
+        kind = self.kind
+
+        if kind == "insert":
+            records = self._records
+            if self._parametrized:
+                records = [_bind_record(record, params) for record in records]
+            state = session.table(self.table, write=True)
+            journal = []
+            ids = insert_records(session.metadata, self.table, records,
+                                 state.data, state.indexes, journal)
+            if ids:
+                session.record(self.table, state.data, journal)
+            return ids
+
+        predicate = self._predicate
+        if predicate is not None and predicate.parametrized:
+            predicate = validated(predicate.bind, params, columns)
+        stats = session.metadata[self.table].get("stats")
+        if kind == "select":
+            state = session.table(self.table)
+            offset, limit = self.offset, self.limit
+            if self._parametrized:
+                offset = bind_value(offset, params)
+                limit = bind_value(limit, params)
+                for value in (offset, limit):
+                    if value is not None and (type(value) is not int
+                                              or value < 0):
+                        raise ValidationError(
+                            "LIMIT и OFFSET ожидают неотрицательное число"
+                        )
+            if self.join is not None or self.aggregated:
+                # С ORDER BY OFFSET и LIMIT применяются после упорядочивания
+                ordered = self._order is not None
+                first, count = (0, None) if ordered else (offset, limit)
+                if self.join is not None:
+                    records = self._run_join(session, params, first, count)
+                else:
+                    records = iter_aggregate(state.data, self.items,
+                                             self.group_by, predicate,
+                                             state.indexes, stats, first, count,
+                                             state.partitions)
+                if ordered:
+                    return order_records(records, *self._order, offset, limit)
+                return records
+            cache_key = None
+            if predicate is not None:
+                cache_key = make_cache_key(self.table, state.version, predicate)
+            return iter_select(state.data, predicate, state.indexes, cache_key,
+                               offset, limit, stats, state.partitions,
+                               self._order)
+
+        state = session.table(self.table, write=True)
+        journal = []
+        if kind == "update":
+            values = self.values
+            if self._parametrized:
+                values = _bind_record(values, params)
+                validate_values(columns, values)
+            data, count = update_records(state.data, values, predicate,
+                                         state.indexes, journal, stats,
+                                         state.partitions)
+        else:
+            data, count = delete_records(state.data, predicate, state.indexes,
+                                         journal, stats, state.partitions)
+        if count:
+            session.record(self.table, data, journal)
+        return count
+
+    def _run_join(self, session, params, offset, limit):
+        """Выполняет select с join (см. core.iter_join)"""
+        table, left_column, right_column = self.join
+        left_predicate, right_predicate, predicate = self._join_predicates
+        sides = []
+        for name, columns, column, side_predicate in (
+                (self.table, self._schema[0], left_column, left_predicate),
+                (table, self._schema[1], right_column, right_predicate)):
+            if side_predicate is not None and side_predicate.parametrized:
+                side_predicate = validated(side_predicate.bind, params, columns)
+            state = session.table(name)
+            sides.append(JoinSide(name, columns, column, state.data,
+                                  state.indexes, side_predicate,
+                                  session.metadata[name].get("stats"),
+                                  state.partitions))
+        if predicate is not None and predicate.parametrized:
+            predicate = validated(predicate.bind, params, self._columns)
+        return iter_join(*sides, predicate, offset, limit)
+
+
+class PlanCache:
+    """
+    Кэш разобранных команд (StatementPlan) по нормализованному тексту с
+    вытеснением давно неиспользуемых (LRU).
+
+    Команды, различающиеся только значениями, имеют один нормализованный
+    текст и поэтому один план.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_PLANS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text):
+        """Возвращает план команды, разбирая ее при отсутствии в кэше"""
+        plan = self._entries.get(text)
+        if plan is not None:
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return plan
+        self.misses += 1
+        plan = StatementPlan(text)
+        self._entries[text] = plan
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return plan
+
+    def clear(self):
+        """Полностью очищает кэш"""
+        self._entries.clear()
+
+    def stats(self):
+        """Возвращает счетчики кэша в виде словаря"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+
+# Глобальный кэш планов
+plan_cache = PlanCache()
+
+
+def parse_command(command):
+    """
+    Разбирает строку команды.
+
+    Команды select, insert, update и delete нормализуются, и их план
+    берется из кэша планов; остальные команды разбиваются на слова.
+    Для profile <команда> и explain <команда> вторым элементом списка
+    слов идет разобранная команда.
+
+    Returns:
+        tuple: (StatementPlan, значения параметров) или (None, слова команды)
+
+    Raises:
+        ValueError: Если команду не удалось разобрать
+    """
+    words = command.split(None, 1)
+    if not metrics.enabled:
+        return _parse_command(command, words)
+    metrics.operation = words[0] if words else "other"
+    return metrics.measure("parse", _parse_command, command, words)
+
+
+def _parse_command(command, words):
+    if words and words[0] == "profile":
+        if len(words) < 2:
+            raise ValueError("укажите команду для профилирования")
+        return None, ["profile", parse_command(words[1])]
+    if words and words[0] == "explain":
+        if len(words) < 2 or words[1].split(None, 1)[0] not in PLANNED_COMMANDS:
+            raise ValueError("укажите команду select, update или delete")
+        return None, ["explain", parse_command(words[1])]
+    if words and words[0] in PLANNED_COMMANDS:
+        text, params = normalize_command(command)
+        return plan_cache.get(text), params
+    return None, split_command(command)
@@ -0,0 +1,381 @@
+from functools import reduce
+from itertools import chain, repeat
+from operator import and_, eq, ge, gt, le, lt, ne, or_
+
+from .parser import Param, parse_columns
+
+# Операторы сравнения условия WHERE и соответствующие функции
+COMPARISONS = {"=": eq, "!=": ne, "<": lt, "<=": le, ">": gt, ">=": ge}
+_PY_OPERATORS = {"=": "==", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+RANGE_OPERATORS = ("<", "<=", ">", ">=")
+
+_PY_TYPES = {"int": int, "str": str, "bool": bool}
+
+
+def to_condition(where_clause):
+    """
+    Приводит условие к дереву (см. parser.parse_where).
+
+    Словарь {'столбец': значение} означает AND равенств.
+    """
+    if isinstance(where_clause, Predicate):
+        return where_clause.condition
+    if isinstance(where_clause, dict):
+        items = tuple(("=", col, val) for col, val in where_clause.items())
+        return items[0] if len(items) == 1 else ("and", items)
+    return where_clause
+
+
+def condition_key(where_clause):
+    """
+    Нормализованный хэшируемый ключ условия для кэширования.
+
+    Порядок операндов AND/OR и значений IN не важен, а тип значения
+    учитывается, чтобы True и 1 не давали одинаковый ключ.
+    """
+    if isinstance(where_clause, Predicate):
+        return where_clause.key
+    condition = to_condition(where_clause)
+    op = condition[0]
+    if op in ("and", "or"):
+        return op, tuple(sorted(map(condition_key, condition[1]), key=repr))
+    if op == "in":
+        values = sorted(((type(v).__name__, v) for v in condition[2]), key=repr)
+        return op, condition[1], tuple(values)
+    return op, condition[1], type(condition[2]).__name__, condition[2]
+
+
+def _leaves(condition):
+    if condition[0] in ("and", "or"):
+        for item in condition[1]:
+            yield from _leaves(item)
+    else:
+        yield condition
+
+
+def check_condition(condition, columns):
+    """
+    Проверяет условие по схеме таблицы.
+
+    Raises:
+        ValueError: Если столбца нет или тип значения не совпадает с типом
+            столбца (bool и int не взаимозаменяемы)
+    """
+    types = dict(parse_columns(columns))
+    for op, column, operand in _leaves(condition):
+        if column not in types:
+            raise ValueError(f'Столбец "{column}" не существует')
+        py_type = _PY_TYPES[types[column]]
+        for value in operand if op == "in" else (operand,):
+            if type(value) is not py_type and not isinstance(value, Param):
+                raise ValueError(
+                    f'Столбец "{column}" имеет тип {types[column]}, '
+                    f"получено значение {value!r}"
+                )
+
+
+def bind_value(value, params):
+    """Подставляет значения параметров в константу условия"""
+    if isinstance(value, Param):
+        return params[value.index]
+    if isinstance(value, (tuple, frozenset)) and any(
+            isinstance(item, Param) for item in value):
+        return type(value)(bind_value(item, params) for item in value)
+    return value
+
+
+def _bind(condition, params):
+    """Подставляет значения параметров в дерево условия"""
+    op = condition[0]
+    if op in ("and", "or"):
+        return op, tuple(_bind(item, params) for item in condition[1])
+    return op, condition[1], bind_value(condition[2], params)
+
+
+def _compile_factory(condition, access):
+    """
+    Компилирует условие в фабрику функций r -> bool.
+
+    Условие превращается в одно лямбда-выражение вида
+    `r[c0] == v0 and (r[c1] < v1 or r[c2] in v2)`; access(столбец, const)
+    возвращает выражение чтения столбца. Имена столбцов и значения передаются
+    как замыкания, поэтому пользовательский текст в исходный код не попадает.
+
+    Returns:
+        tuple: (фабрика, константы); фабрика(*константы) - функция условия.
+            Константы можно заменить (например, значениями параметров)
+            и получить новую функцию без повторной компиляции.
+    """
+    consts = []
+
+    def const(value):
+        consts.append(value)
+        return f"_{len(consts) - 1}"
+
+    def generate(node):
+        op = node[0]
+        if op in ("and", "or"):
+            return "(" + f" {op} ".join(map(generate, node[1])) + ")"
+        column = access(node[1], const)
+        if op == "in":
+            return f"{column} in {const(frozenset(node[2]))}"
+        return f"{column} {_PY_OPERATORS[op]} {const(node[2])}"
+
+    body = generate(condition)
+    params = ", ".join(f"_{i}" for i in range(len(consts)))
+    namespace = {}
+    exec(f"def _factory({params}):\n    return lambda r: {body}\n", namespace)
+    return namespace["_factory"], consts
+
+
+def _compile(condition, access):
+    """Компилирует условие в одну функцию r -> bool (см. _compile_factory)"""
+    factory, consts = _compile_factory(condition, access)
+    return factory(*consts)
+
+
+def _record_access(column, const):
+    return f"r[{const(column)}]"
+
+
+class _MissingColumn:
+    """Столбец, которого нет в таблице: в каждой строке значение None"""
+
+    def __getitem__(self, pos):
+        return None
+
+
+def _compile_positions(condition, table):
+    """Компилирует условие в функцию номер строки -> bool для колоночной таблицы"""
+    def access(column, const):
+        try:
+            col = table.column(column)
+        except KeyError:
+            col = _MissingColumn()
+        return f"{const(col)}[r]"
+    return _compile(condition, access)
+
+
+def _column_mask(table, node):
+    op, column, operand = node
+    try:
+        col = table.column(column)
+    except KeyError:
+        return repeat(False, table.slot_count())
+    if op == "in":
+        return col.isin_mask(frozenset(operand))
+    return col.mask(COMPARISONS[op], operand)
+
+
+def _mask(table, node):
+    op = node[0]
+    if op in ("and", "or"):
+        combine = and_ if op == "and" else or_
+        masks = [_mask(table, item) for item in node[1]]
+        return reduce(lambda left, right: map(combine, left, right), masks)
+    return _column_mask(table, node)
+
+
+def _index_priority(node):
+    """Порядок выбора индекса в AND: сначала равенство, затем IN и диапазоны"""
+    return {"=": 0, "in": 1}.get(node[0], 2)
+
+
+def range_bounds(nodes):
+    """Сводит сравнения одного столбца в границы (low, high, inc_low, inc_high)"""
+    low = high = None
+    include_low = include_high = True
+    for op, _, value in nodes:
+        if op in (">", ">=") and (low is None or value >= low):
+            if value != low or op == ">":
+                include_low = op == ">="
+            low = value
+        elif op in ("<", "<=") and (high is None or value <= high):
+            if value != high or op == "<":
+                include_high = op == "<="
+            high = value
+    return low, high, include_low, include_high
+
+
+def _union(parts):
+    """Объединяет списки ссылок без повторов (запись или номер строки)"""
+    seen = set()
+    result = []
+    for ref in chain.from_iterable(parts):
+        key = ref if isinstance(ref, int) else id(ref)
+        if key not in seen:
+            seen.add(key)
+            result.append(ref)
+    return result
+
+
+def _candidates(node, indexes):
+    """Возвращает ссылки-кандидаты по индексам или None (нужен полный просмотр)"""
+    op = node[0]
+    if op == "or":
+        parts = []
+        for item in node[1]:
+            refs = _candidates(item, indexes)
+            if refs is None:
+                return None
+            parts.append(refs)
+        return _union(parts)
+    if op == "and":
+        items = sorted(node[1], key=_index_priority)
+        for item in items:
+            if item[0] in ("=", "in", "or", "and"):
+                refs = _candidates(item, indexes)
+                if refs is not None:
+                    return refs
+        # Сравнения одного столбца с упорядоченным индексом - один диапазон
+        ranges = {}
+        for item in items:
+            if item[0] in RANGE_OPERATORS:
+                ranges.setdefault(item[1], []).append(item)
+        for column, nodes in ranges.items():
+            index = indexes.get(column)
+            if index is not None and index.kind == "sorted":
+                return index.range(*range_bounds(nodes))
+        return None
+    index = indexes.get(node[1])
+    if index is None:
+        return None
+    if op == "=":
+        return index.lookup(node[2])
+    if op == "in":
+        return list(chain.from_iterable(map(index.lookup, set(node[2]))))
+    if op in RANGE_OPERATORS and index.kind == "sorted":
+        return index.range(*range_bounds([node]))
+    return None
+
+
+class Predicate:
+    """
+    Скомпилированное условие WHERE.
+
+    Условие разбирается и компилируется один раз:
+    test - функция record -> bool (один вызов на строку),
+    mask - поток флагов по строкам колоночной таблицы, вычисляемый
+    сравнением целых столбцов, candidates - ссылки, найденные по индексам.
+
+    Условие с параметрами (parser.Param) перед выполнением связывается
+    со значениями через bind - без повторной компиляции.
+    """
+
+    def __init__(self, condition):
+        self.condition = condition
+        self.parametrized = any(
+            isinstance(value, Param)
+            for op, _, operand in _leaves(condition)
+            for value in (operand if op == "in" else (operand,))
+        )
+        self._factory, self._consts = _compile_factory(condition,
+                                                       _record_access)
+        if self.parametrized:
+            self.key = None
+            self.test = None
+        else:
+            self.key = condition_key(condition)
+            self.test = self._factory(*self._consts)
+
+    def bind(self, params, columns=None):
+        """
+        Возвращает условие со значениями параметров.
+
+        Args:
+            params (list): Значения параметров (индекс - Param.index)
+            columns (list, optional): Столбцы таблицы для проверки типов
+
+        Raises:
+            ValueError: Если тип значения не совпадает с типом столбца
+        """
+        if not self.parametrized:
+            return self
+        bound = object.__new__(Predicate)
+        bound.condition = _bind(self.condition, params)
+        if columns is not None:
+            check_condition(bound.condition, columns)
+        bound.parametrized = False
+        bound._factory = self._factory
+        bound._consts = [bind_value(value, params) for value in self._consts]
+        bound.key = condition_key(bound.condition)
+        bound.test = self._factory(*bound._consts)
+        return bound
+
+    def mask(self, table):
+        """Возвращает итератор флагов совпадения для каждой строки таблицы"""
+        return _mask(table, self.condition)
+
+    def position_test(self, table):
+        """Возвращает функцию номер строки -> bool для колоночной таблицы"""
+        return _compile_positions(self.condition, table)
+
+    def scan_plan(self, table):
+        """
+        План просмотра колоночной таблицы: (маска, проверка остатка или None).
+
+        Если в AND есть равенство или IN (обычно самые избирательные
+        операнды), маской вычисляется только оно, а остальные операнды
+        проверяются для отобранных строк. Иначе маски всех операндов
+        объединяются поэлементно.
+        """
+        if self.condition[0] != "and":
+            return self.mask(table), None
+        first, *rest = sorted(self.condition[1], key=_index_priority)
+        if first[0] not in ("=", "in"):
+            return self.mask(table), None
+        residual = rest[0] if len(rest) == 1 else ("and", tuple(rest))
+        return _mask(table, first), _compile_positions(residual, table)
+
+    def candidates(self, indexes, node=None):
+        """
+        Находит ссылки на строки-кандидаты по индексам таблицы.
+
+        Используются равенства, списки IN и (для упорядоченных индексов)
+        диапазоны. Кандидаты нужно дополнительно проверить через test.
+
+        Args:
+            indexes (dict): Индексы таблицы {'столбец': индекс}
+            node (tuple, optional): Часть условия, по которой искать
+                (выбирается планировщиком, см. planner.choose_path);
+                по умолчанию - все условие
+
+        Returns:
+            list | None: Ссылки или None, если индексы не помогают
+        """
+        if not indexes:
+            return None
+        return _candidates(self.condition if node is None else node, indexes)
+
+    def equality(self):
+        """Возвращает (столбец, значение), если условие - одно равенство"""
+        if self.condition[0] == "=":
+            return self.condition[1], self.condition[2]
+        return None
+
+
+def compile_where(where_clause, columns=None):
+    """
+    Компилирует условие WHERE.
+
+    Args:
+        where_clause (tuple | dict | Predicate): Дерево условия
+            (см. parser.parse_where) или словарь {'столбец': значение}
+        columns (list, optional): Столбцы таблицы; если заданы, условие
+            проверяется по схеме
+
+    Returns:
+        Predicate | None: Скомпилированное условие (None, если условия нет)
+
+    Raises:
+        ValueError: Если условие не соответствует схеме таблицы
+    """
+    if not where_clause:
+        return None
+    if isinstance(where_clause, Predicate):
+        predicate = where_clause
+    else:
+        predicate = Predicate(to_condition(where_clause))
+    if columns is not None:
+        check_condition(predicate.condition, columns)
+    return predicate
@@ -0,0 +1,197 @@
+import asyncio
+import io
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from src.decorators import set_confirm_policy
+
+from .client import DEFAULT_HOST, DEFAULT_PORT
+from .engine import execute
+from .parser import parse_columns
+from .plans import parse_command
+from .session import DEFAULT_FLUSH_INTERVAL, Session
+
+# Максимальная длина строки запроса (например, insert со многими записями)
+MAX_REQUEST_SIZE = 16 * 1024 * 1024
+
+
+def encode_message(message):
+    """Кодирует сообщение протокола: одна строка JSON, завершенная \\n"""
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class Server:
+    """
+    Сервер базы данных: таблицы и индексы постоянно находятся в памяти.
+
+    Клиенты подключаются через Unix- или TCP-сокет и отправляют команды
+    обычного языка команд. Протокол построчный: запрос - JSON-объект
+    {"command": "select from users where age > 30"}, ответ -
+    {"ok": true, "columns": [...], "rows": [[...], ...]} для select,
+    {"ok": true, "message": "..."} для остальных команд или
+    {"ok": false, "error": "..."} при ошибке.
+
+    Команды выполняются по одной в единственном рабочем потоке (см.
+    submit): сессия берет блокирующие блокировки fcntl и сбрасывает
+    изменения с fsync, и в цикле событий это останавливало бы обслуживание
+    всех клиентов. Один поток сохраняет порядок выполнения команд, поэтому
+    сессия не требует синхронизации. Транзакция принадлежит соединению,
+    которое ее начало: команды других клиентов ждут ее commit/rollback, а при
+    разрыве соединения транзакция отменяется.
+
+    Изменения сбрасываются на диск не реже чем раз в session.flush_interval
+    секунд - и после команд, и в фоне, если команд больше не поступает.
+    """
+
+    def __init__(self, session=None):
+        self.session = session or Session()
+        self._lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def _call(self, func, *args):
+        """Выполняет обращение к сессии в рабочем потоке сервера"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def submit(self, command):
+        """Выполняет команду, не блокируя цикл событий (см. run_command)"""
+        return await self._call(self.run_command, command)
+
+    def run_command(self, command):
+        """
+        Выполняет одну команду и возвращает ответ протокола.
+
+        Ошибки команды (DatabaseError, ValueError) возвращаются как
+        {"ok": false, "error": ...}, а не как выведенное сообщение.
+
+        Returns:
+            tuple: (ответ, продолжать ли обслуживание соединения)
+        """
+        session = self.session
+        try:
+            parsed = parse_command(command)
+            plan, params = parsed
+            if plan is None and not params:
+                raise ValueError("пустая команда")
+            if plan is not None and plan.kind == "select":
+                records = plan.run(session, params)
+                names = [name for name, _ in
+                         parse_columns(plan.result_columns(session.metadata))]
+                rows = [[record.get(name) for name in names]
+                        for record in records]
+                return {"ok": True, "columns": names, "rows": rows}, True
+            output = io.StringIO()
+            with redirect_stdout(output):
+                keep = execute(session, parsed, interactive=False, strict=True)
+            session.maybe_flush()
+            return {"ok": True, "message": output.getvalue().strip()}, keep
+        except Exception as e:
+            return {"ok": False, "error": str(e)}, True
+
+    async def handle_client(self, reader, writer):
+        """Обслуживает одно соединение до его закрытия или команды exit"""
+        owner = False  # соединение удерживает сессию (открыта транзакция)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    command = json.loads(line)["command"]
+                except (ValueError, KeyError, TypeError):
+                    writer.write(encode_message(
+                        {"ok": False, "error": "некорректный запрос"}))
+                    await writer.drain()
+                    continue
+                if not owner:
+                    await self._lock.acquire()
+                try:
+                    response, keep = await self.submit(command)
+                finally:
+                    owner = self.session.in_transaction
+                    if not owner:
+                        self._lock.release()
+                writer.write(encode_message(response))
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, ValueError):
+            pass  # разрыв соединения или слишком длинный запрос
+        finally:
+            if owner:
+                await self._call(self.session.rollback)
+                self._lock.release()
+            writer.close()
+
+    async def _flush_periodically(self):
+        """Сбрасывает накопленные изменения, когда команд нет"""
+        while True:
+            await asyncio.sleep(self.session.flush_interval)
+            async with self._lock:
+                await self._call(self.session.maybe_flush)
+
+    async def serve(self, socket_path=None, host=DEFAULT_HOST,
+                    port=DEFAULT_PORT):
+        """
+        Принимает соединения до получения SIGINT/SIGTERM.
+
+        Args:
+            socket_path (str, optional): Путь Unix-сокета; если не задан,
+                сервер слушает TCP host:port
+            host (str): Адрес TCP
+            port (int): Порт TCP
+        """
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)  # сокет, оставшийся после сбоя
+            server = await asyncio.start_unix_server(
+                self.handle_client, socket_path, limit=MAX_REQUEST_SIZE)
+            address = socket_path
+        else:
+            server = await asyncio.start_server(
+                self.handle_client, host, port, limit=MAX_REQUEST_SIZE)
+            address = f"{host}:{port}"
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        print(f"Сервер базы данных слушает {address}", flush=True)
+        flusher = None
+        if self.session.flush_interval > 0:
+            flusher = asyncio.create_task(self._flush_periodically())
+        async with server:
+            await stop.wait()
+        if flusher is not None:
+            flusher.cancel()
+        self._executor.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def serve(socket_path=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+          assume_yes=False, flush_interval=DEFAULT_FLUSH_INTERVAL):
+    """
+    Запускает сервер базы данных.
+
+    Опасные операции подтверждаются при assume_yes, иначе отклоняются.
+    При остановке незафиксированная транзакция отменяется, изменения
+    сохраняются на диск.
+
+    Args:
+        flush_interval (float): Интервал сброса изменений на диск; 0 -
+            после каждой команды (запись с fsync на каждую команду)
+    """
+    session = Session(flush_interval)
+    set_confirm_policy(assume_yes)
+    try:
+        asyncio.run(Server(session).serve(socket_path, host, port))
+    finally:
+        set_confirm_policy(None)
+        if session.in_transaction:
+            session.rollback()
+        session.close()
+        print("Сервер остановлен.")
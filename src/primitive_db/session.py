@@ -0,0 +1,508 @@
+import time
+from itertools import count
+
+from src.decorators import timed
+
+from .binary import read_header
+from .cache import query_cache
+from .columnar import ColumnarTable
+from .indexes import build_index, build_indexes
+from .locks import FileLock
+from .partitions import Partitions
+from .utils import (
+    append_wal,
+    commit_files,
+    file_signature,
+    has_wal,
+    load_metadata,
+    load_table_data,
+    prepare_metadata,
+    prepare_table_commit,
+    recover_commit,
+    remove_table_file,
+    remove_table_files,
+    save_metadata,
+    save_table_data,
+    table_files,
+    table_path,
+    table_signature,
+)
+
+# 0 - изменения сбрасываются на диск после каждой команды
+DEFAULT_FLUSH_INTERVAL = 0.0
+
+# Глобальный счетчик версий: перечитанная таблица получает новую версию
+_versions = count(1)
+
+
+class TableState:
+    """Таблица, загруженная в память сессии"""
+
+    def __init__(self, data, indexes, signature):
+        self.data = data
+        self.indexes = indexes
+        self.signature = signature
+        self.version = next(_versions)
+        self.pending = []  # записи журнала, еще не сброшенные на диск
+        self.needs_checkpoint = False
+        self._partitions = None
+
+    def touch(self):
+        """Отмечает изменение данных таблицы новой версией"""
+        self.version = next(_versions)
+        self._partitions = None
+
+    @property
+    def partitions(self):
+        """Разбиение данных на разделы с зонами min/max (до изменения таблицы)"""
+        if self._partitions is None or self._partitions.table_data is not self.data:
+            self._partitions = Partitions(self.data)
+        return self._partitions
+
+    @property
+    def dirty(self):
+        return bool(self.pending) or self.needs_checkpoint
+
+
+class Session:
+    """
+    Сессия работы с базой данных.
+
+    Загружает метаданные и таблицы лениво, один раз, и держит их в памяти
+    между командами. Изменения накапливаются и сбрасываются на диск
+    при flush() (команда commit, выход или истечение flush_interval).
+    Изменения файлов другими процессами обнаруживаются по mtime/размеру:
+    перечитываются только изменившиеся таблицы.
+
+    Несколько процессов могут работать с одним каталогом данных:
+    - перед изменением таблицы берется ее блокировка записи (data/<т>.lock),
+      которая держится до сброса изменений на диск (или до commit/rollback);
+      получив ее, сессия перечитывает таблицу, если та изменилась;
+    - общая блокировка ввода-вывода (<метаданные>.lock) берется разделяемой
+      на время чтения файлов и исключительной - только на время их записи,
+      поэтому читатели не видят частично записанных файлов;
+    - при сохранении метаданных файл перечитывается, и в нем заменяются
+      только описания таблиц, измененных этой сессией.
+
+    Внутри транзакции (begin) изменения не сбрасываются на диск до commit,
+    который записывает все затронутые таблицы и метаданные атомарно;
+    rollback возвращает состояние на момент begin.
+    """
+
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 metadata_path="db_meta.json"):
+        self.flush_interval = flush_interval
+        self.metadata_path = metadata_path
+        self._metadata = None
+        self._metadata_signature = None
+        self._changed = set()  # таблицы с несохраненными изменениями метаданных
+        self._tables = {}
+        self._write_locks = {}  # таблица -> FileLock, удерживаемая сессией
+        self._dropped = set()  # таблицы, удаленные в транзакции
+        self._io_lock = FileLock(f"{metadata_path}.lock")
+        self._last_flush = time.monotonic()
+        self.in_transaction = False
+        # Завершаем фиксацию транзакции, если она была прервана сбоем
+        with self._io_lock.locked():
+            recover_commit()
+
+    @property
+    def metadata(self):
+        """Метаданные всех таблиц (перечитываются, только если файл изменился)"""
+        signature = file_signature(self.metadata_path)
+        if self._metadata is None or signature != self._metadata_signature:
+            self._refresh_metadata(load_metadata(self.metadata_path))
+            self._metadata_signature = signature
+        return self._metadata
+
+    def _merge_metadata(self, disk_metadata):
+        """Накладывает на метаданные с диска описания, измененные сессией"""
+        for table_name in self._changed:
+            if table_name in self._metadata:
+                disk_metadata[table_name] = self._metadata[table_name]
+            else:
+                disk_metadata.pop(table_name, None)
+        return disk_metadata
+
+    def _refresh_metadata(self, disk_metadata):
+        """
+        Принимает новые метаданные с диска.
+
+        Загруженные таблицы, описание которых изменилось, выгружаются
+        (изменились столбцы, способ хранения или формат) или получают новые
+        индексы; остальные таблицы остаются в памяти без изменений.
+        Словарь метаданных обновляется на месте, поэтому ссылки на него
+        остаются действительными.
+        """
+        if self._metadata is None:
+            self._metadata = disk_metadata
+            return
+        old_metadata = dict(self._metadata)
+        disk_metadata = self._merge_metadata(disk_metadata)
+        self._metadata.clear()
+        self._metadata.update(disk_metadata)
+        for table_name in list(self._tables):
+            old_meta = old_metadata.get(table_name)
+            new_meta = disk_metadata.get(table_name)
+            if old_meta == new_meta:
+                continue
+            state = self._tables[table_name]
+            if new_meta is None or any(
+                    old_meta is None or old_meta.get(key) != new_meta.get(key)
+                    for key in ("columns", "storage", "format")):
+                if not state.dirty:
+                    self.evict(table_name)
+            elif old_meta.get("indexes") != new_meta.get("indexes"):
+                state.indexes = build_indexes(disk_metadata, table_name,
+                                              state.data)
+
+    def _write_metadata(self):
+        """Сохраняет изменения метаданных (вызывается под блокировкой записи)"""
+        merged = self._merge_metadata(load_metadata(self.metadata_path))
+        save_metadata(merged, self.metadata_path)
+        self._refresh_metadata(merged)
+        self._changed.clear()
+        self._metadata_signature = file_signature(self.metadata_path)
+
+    def save_metadata(self, table_name):
+        """
+        Сохраняет изменение описания таблицы в метаданных на диск
+        (в транзакции - при commit).
+
+        Args:
+            table_name (str): Таблица, описание которой изменилось
+        """
+        self._changed.add(table_name)
+        if self.in_transaction:
+            return
+        with self._io_lock.locked():
+            self._write_metadata()
+
+    def lock_table(self, table_name):
+        """
+        Берет блокировку записи таблицы до сброса изменений на диск.
+
+        Если таблицу тем временем изменил другой процесс, ее данные
+        и описание в метаданных перечитываются.
+
+        Raises:
+            LockError: При взаимной блокировке с другим процессом
+        """
+        if table_name in self._write_locks:
+            return
+        lock = FileLock(f"data/{table_name}.lock")
+        lock.acquire()
+        self._write_locks[table_name] = lock
+        self.metadata  # перечитываем метаданные, если они изменились
+
+    def _release_locks(self):
+        """Снимает блокировки записи таблиц без несохраненных изменений"""
+        for table_name in list(self._write_locks):
+            state = self._tables.get(table_name)
+            if (state is None or not state.dirty) and (
+                    table_name not in self._changed):
+                self._write_locks.pop(table_name).close()
+
+    def table(self, table_name, write=False):
+        """
+        Возвращает таблицу из памяти, загружая ее при первом обращении.
+
+        Если файлы таблицы изменились на диске, а несохраненных изменений нет,
+        таблица перечитывается.
+
+        Args:
+            table_name (str): Имя таблицы
+            write (bool): Таблица будет изменена - сначала берется ее
+                блокировка записи (см. lock_table)
+        """
+        if write:
+            self.lock_table(table_name)
+        state = self._tables.get(table_name)
+        if state is not None:
+            if state.dirty or table_signature(table_name) == state.signature:
+                return state
+        query_cache.invalidate(table_name)
+        state = self._load(table_name)
+        self._tables[table_name] = state
+        return state
+
+    @timed("load")
+    def _load(self, table_name):
+        """Читает таблицу с диска и строит ее индексы"""
+        table_meta = self.metadata.get(table_name, {})
+        with self._io_lock.locked(exclusive=False):
+            signature = table_signature(table_name)
+            data = load_table_data(table_name, self.file_format(table_name),
+                                   table_meta.get("columns"))
+        if (table_meta.get("storage") == "columnar"
+                and not isinstance(data, ColumnarTable)):
+            data = ColumnarTable.from_records(table_meta["columns"], data)
+        indexes = build_indexes(self.metadata, table_name, data)
+        return TableState(data, indexes, signature)
+
+    def file_format(self, table_name):
+        """Формат основного файла таблицы на диске ('json' или 'binary')"""
+        return self.metadata.get(table_name, {}).get("format", "json")
+
+    def loaded(self, table_name):
+        """Возвращает таблицу, если она уже загружена в память, иначе None"""
+        return self._tables.get(table_name)
+
+    def row_count(self, table_name):
+        """
+        Возвращает количество строк таблицы.
+
+        Для бинарной таблицы без журнала изменений количество читается
+        из заголовка файла, без загрузки данных.
+        """
+        state = self._tables.get(table_name)
+        if state is None and self.file_format(table_name) == "binary":
+            filepath = table_path(table_name, "binary")
+            with self._io_lock.locked(exclusive=False):
+                if not has_wal(table_name):
+                    try:
+                        return read_header(filepath)["rows"]
+                    except FileNotFoundError:
+                        return 0
+        return len(self.table(table_name).data)
+
+    def migrate(self, table_name, old_format):
+        """
+        Переписывает основной файл таблицы в формате из метаданных.
+
+        Args:
+            table_name (str): Имя таблицы
+            old_format (str): Формат, в котором таблица хранилась до этого
+        """
+        self.lock_table(table_name)
+        self.flush()
+        new_format = self.file_format(table_name)
+        state = self._tables.get(table_name)
+        if state is None:
+            with self._io_lock.locked(exclusive=False):
+                data = load_table_data(table_name, old_format,
+                                       self.metadata[table_name]["columns"])
+        else:
+            data = state.data
+        if new_format == "binary" and not isinstance(data, ColumnarTable):
+            data = ColumnarTable.from_records(
+                self.metadata[table_name]["columns"], data
+            )
+        with self._io_lock.locked():
+            save_table_data(table_name, data, new_format)
+            if old_format != new_format:
+                remove_table_file(table_name, old_format)
+        self.evict(table_name)
+        self._release_locks()
+
+    def add_index(self, table_name, column):
+        """Строит только что зарегистрированный индекс для загруженной таблицы"""
+        state = self._tables.get(table_name)
+        if state is not None:
+            kind = self.metadata[table_name]["indexes"][column]
+            state.indexes[column] = build_index(column, kind, state.data)
+
+    def record(self, table_name, data, journal, checkpoint=False):
+        """
+        Фиксирует изменение таблицы в памяти.
+
+        Args:
+            table_name (str): Имя таблицы
+            data (list): Новые данные таблицы
+            journal (list): Записи журнала, описывающие изменение
+            checkpoint (bool): Записать при сбросе сразу основной файл таблицы
+                вместо журнала (для массовой загрузки)
+        """
+        state = self.table(table_name)
+        state.data = data
+        if checkpoint:
+            state.pending = []
+            state.needs_checkpoint = True
+        else:
+            state.pending.extend(journal)
+        if any(entry["op"].startswith("insert") for entry in journal):
+            # Изменился счетчик next_id в метаданных
+            self._changed.add(table_name)
+        state.touch()
+        query_cache.invalidate(table_name)
+
+    def evict(self, table_name):
+        """Выгружает таблицу из памяти без сохранения"""
+        self._tables.pop(table_name, None)
+        query_cache.invalidate(table_name)
+
+    def drop_table(self, table_name):
+        """
+        Удаляет с диска файлы таблицы, уже удаленной из метаданных
+        (см. save_metadata), и выгружает ее из памяти.
+
+        Файлы удаляются под блокировкой записи таблицы, иначе таблица
+        с тем же именем, созданная заново, получила бы прежние записи.
+        В транзакции файлы удаляются при commit.
+        """
+        self.lock_table(table_name)
+        self.evict(table_name)
+        if self.in_transaction:
+            self._dropped.add(table_name)
+            return
+        with self._io_lock.locked():
+            remove_table_files(table_name)
+
+    def flush(self):
+        """
+        Сбрасывает все накопленные изменения таблиц на диск.
+
+        Внутри транзакции ничего не делает: изменения будут записаны при commit.
+        """
+        if self.in_transaction:
+            return
+        dirty = [name for name, state in self._tables.items() if state.dirty]
+        if dirty or self._changed:
+            self._write_changes(dirty)
+        self._release_locks()
+        self._last_flush = time.monotonic()
+
+    @timed("save")
+    def _write_changes(self, dirty):
+        """Записывает метаданные и журналы (или файлы) измененных таблиц"""
+        with self._io_lock.locked():
+            # Метаданные (счетчики ID) пишутся раньше данных: после сбоя
+            # счетчик может опережать данные, но не отставать от них
+            if self._changed:
+                self._write_metadata()
+            for table_name in dirty:
+                state = self._tables[table_name]
+                if state.needs_checkpoint:
+                    save_table_data(table_name, state.data,
+                                    self.file_format(table_name))
+                else:
+                    append_wal(table_name, state.pending, state.data,
+                               self.file_format(table_name))
+                state.pending = []
+                state.needs_checkpoint = False
+                state.signature = table_signature(table_name)
+
+    def maybe_flush(self):
+        """Сбрасывает изменения, если истек интервал flush_interval"""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def begin(self):
+        """
+        Начинает транзакцию.
+
+        Накопленные изменения сначала сбрасываются на диск, поэтому файлы
+        на диске служат снимком состояния для rollback.
+
+        Raises:
+            ValueError: Если транзакция уже начата
+        """
+        if self.in_transaction:
+            raise ValueError("Транзакция уже начата")
+        self.flush()
+        self.in_transaction = True
+
+    def commit(self):
+        """
+        Фиксирует транзакцию (вне транзакции - то же, что flush).
+
+        Для каждой измененной таблицы во временный файл записывается либо
+        журнал, дополненный изменениями транзакции, либо (при свертке)
+        основной файл целиком; туда же пишутся метаданные. Затем все файлы
+        заменяются одной фиксацией с маркером (см. utils.commit_files), так
+        что после сбоя видны либо все изменения транзакции, либо ни одного.
+        """
+        if not self.in_transaction:
+            self.flush()
+            return
+        self._commit_transaction()
+        self.in_transaction = False
+        self._release_locks()
+        self._last_flush = time.monotonic()
+
+    @timed("save")
+    def _commit_transaction(self):
+        """Записывает и атомарно фиксирует изменения транзакции"""
+        renames = []
+        removals = []
+        changed = [name for name, state in self._tables.items() if state.dirty]
+        for table_name in changed:
+            state = self._tables[table_name]
+            rename, removal = prepare_table_commit(
+                table_name, state.data, state.pending,
+                self.file_format(table_name), state.needs_checkpoint,
+            )
+            renames.append(rename)
+            if removal is not None:
+                removals.append(removal)
+        for table_name in self._dropped - set(changed):
+            removals.extend(table_files(table_name))
+        with self._io_lock.locked():
+            if self._changed:
+                merged = self._merge_metadata(load_metadata(self.metadata_path))
+                renames.append(prepare_metadata(merged, self.metadata_path))
+            if renames or removals:
+                commit_files(renames, removals)
+            self._dropped.clear()
+            if self._changed:
+                self._refresh_metadata(merged)
+                self._changed.clear()
+                self._metadata_signature = file_signature(self.metadata_path)
+            for table_name in changed:
+                state = self._tables[table_name]
+                state.pending = []
+                state.needs_checkpoint = False
+                state.signature = table_signature(table_name)
+
+    def rollback(self):
+        """
+        Отменяет транзакцию: измененные таблицы и метаданные будут
+        перечитаны с диска.
+
+        Raises:
+            ValueError: Если транзакция не начата
+        """
+        if not self.in_transaction:
+            raise ValueError("Транзакция не начата")
+        self.in_transaction = False
+        self._discard_changes()
+
+    def discard(self):
+        """
+        Отменяет изменения, еще не сброшенные на диск (в транзакции - то же,
+        что rollback): измененные таблицы и метаданные будут перечитаны
+        с диска.
+        """
+        if self.in_transaction:
+            self.rollback()
+        else:
+            self._discard_changes()
+
+    def _discard_changes(self):
+        for table_name in [name for name, state in self._tables.items()
+                           if state.dirty]:
+            self.evict(table_name)
+        self._changed.clear()
+        self._dropped.clear()
+        # Метаданные перечитываются с диска, индексы таблиц перестраиваются
+        self._metadata.clear()
+        self._metadata.update(load_metadata(self.metadata_path))
+        self._metadata_signature = file_signature(self.metadata_path)
+        for table_name, state in self._tables.items():
+            state.indexes = build_indexes(self._metadata, table_name,
+                                          state.data)
+        self._release_locks()
+
+    def close(self):
+        """
+        Сохраняет изменения перед завершением работы.
+
+        Незавершенная транзакция отменяется.
+        """
+        if self.in_transaction:
+            self.rollback()
+        self.flush()
+        for lock in self._write_locks.values():
+            lock.close()
+        self._write_locks.clear()
+        self._io_lock.close()
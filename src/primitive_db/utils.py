@@ -1,30 +1,489 @@
+import csv
 import json
 import os
 
+from .binary import BinaryTableFile, write_table, write_table_file
+from .columnar import ColumnarTable
+from .parser import parse_columns
+
+# Расширения основного файла таблицы для каждого формата хранения на диске
+FILE_FORMATS = {"json": "json", "binary": "tbl"}
+
+# Размер журнала, после которого он сворачивается в основной файл таблицы
+WAL_CHECKPOINT_BYTES = 1024 * 1024
+
+# Маркер фиксации транзакции: пока он существует, перечисленные в нем
+# временные файлы считаются зафиксированными и должны заменить основные
+COMMIT_MARKER = "data/transaction.commit"
+
 
 def load_metadata(filepath="db_meta.json"):
     try:
         with open(filepath, 'r') as f:
-            return json.load(f)
+            metadata = json.load(f)
     except FileNotFoundError:
         return {}
+    # Старый формат: {'таблица': ['ID:int', ...]}
+    for table_name, table_meta in metadata.items():
+        if isinstance(table_meta, list):
+            metadata[table_name] = {"columns": table_meta, "indexes": {}}
+    return metadata
 
-def save_metadata(data, filepath="db_meta.json"):
+def _write_metadata_file(data, filepath):
     with open(filepath, 'w') as f:
         json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+
+def save_metadata(data, filepath="db_meta.json"):
+    """Атомарно сохраняет метаданные (временный файл и замена)"""
+    tmp_path = f"{filepath}.tmp"
+    _write_metadata_file(data, tmp_path)
+    os.replace(tmp_path, filepath)
+
+def _write_json_file(filepath, data):
+    if not isinstance(data, (list, dict)):
+        data = list(data)  # колоночная таблица материализуется в записи
+    with open(filepath, 'w') as f:
+        # json.dumps без отступов использует C-кодировщик (json.dump - нет)
+        f.write(json.dumps(data, separators=(",", ":")))
+        f.flush()
+        os.fsync(f.fileno())
+
+def _atomic_write_json(filepath, data):
+    """Записывает JSON во временный файл и атомарно заменяет им исходный"""
+    tmp_path = f"{filepath}.tmp"
+    _write_json_file(tmp_path, data)
+    os.replace(tmp_path, filepath)
+
+def _fsync_dir(path):
+    """Сбрасывает на диск каталог, чтобы переименования файлов пережили сбой"""
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _wal_path(table_name):
+    return f"data/{table_name}.wal"
+
+def table_path(table_name, file_format="json"):
+    """Путь к основному файлу таблицы в заданном формате"""
+    return f"data/{table_name}.{FILE_FORMATS[file_format]}"
+
+def has_wal(table_name):
+    """Проверяет, есть ли у таблицы несвернутые записи журнала"""
+    return os.path.exists(_wal_path(table_name))
 
-def load_table_data(table_name):
-    """Загружает данные таблицы из JSON файла"""
+def _read_wal(table_name):
+    """
+    Читает записи журнала упреждающей записи.
+    
+    Строка журнала может быть оборвана при сбое - такие строки игнорируются.
+    """
+    try:
+        with open(_wal_path(table_name), 'r') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return entries
+
+def _replay_wal_columnar(entries, table):
+    """
+    Применяет записи журнала к колоночной таблице.
+
+    Вставки записей, ID которых уже есть в таблице, пропускаются: после
+    сбоя между заменой основного файла и удалением журнала (см.
+    save_table_data) журнал уже отражен в файле, и повторное применение
+    не должно дублировать строки.
+    """
+    positions = {record_id: pos for record_id, pos in table.iter_column("ID")}
+    for entry in entries:
+        op = entry["op"]
+        if op == "insert":
+            row = entry["row"]
+            if row["ID"] not in positions:
+                positions[row["ID"]] = table.append(row)
+        elif op == "insert_many":
+            rows = [row for row in entry["rows"] if row["ID"] not in positions]
+            refs = table.extend(rows)
+            positions.update((row["ID"], pos) for row, pos in zip(rows, refs))
+        elif op == "update":
+            matched = [positions[i] for i in entry["ids"] if i in positions]
+            table.update(matched, entry["set"])
+        elif op == "delete":
+            if entry["ids"] is None:
+                table.clear()
+                positions = {}
+                continue
+            matched = [positions.pop(i) for i in entry["ids"] if i in positions]
+            if table.delete(matched):
+                positions = dict(table.iter_column("ID"))
+    return table
+
+def _replay_wal(table_name, data):
+    """Применяет записи журнала упреждающей записи к данным таблицы"""
+    entries = _read_wal(table_name)
+    if not entries:
+        return data
+    if isinstance(data, ColumnarTable):
+        return _replay_wal_columnar(entries, data)
+    
+    rows = {record["ID"]: record for record in data}
+    for entry in entries:
+        op = entry["op"]
+        if op == "insert":
+            row = entry["row"]
+            rows[row["ID"]] = row
+        elif op == "insert_many":
+            rows.update((row["ID"], row) for row in entry["rows"])
+        elif op == "update":
+            for record_id in entry["ids"]:
+                if record_id in rows:
+                    rows[record_id].update(entry["set"])
+        elif op == "delete":
+            if entry["ids"] is None:
+                rows.clear()
+            else:
+                for record_id in entry["ids"]:
+                    rows.pop(record_id, None)
+    return list(rows.values())
+
+def load_table_data(table_name, file_format="json", columns=None):
+    """
+    Загружает данные таблицы из основного файла и журнала изменений.
+    
+    Args:
+        table_name (str): Имя таблицы
+        file_format (str): Формат основного файла: 'json' или 'binary'
+        columns (list, optional): Столбцы таблицы - нужны, чтобы создать
+            пустую колоночную таблицу, если бинарного файла еще нет
+    
+    Returns:
+        list | ColumnarTable: Список записей (json) или колоночная таблица
+            со столбцами, отображенными из файла в память (binary)
+    """
+    if file_format == "binary":
+        filepath = table_path(table_name, file_format)
+        if os.path.exists(filepath):
+            data = BinaryTableFile(filepath).to_table()
+        else:
+            data = ColumnarTable(columns)
+        return _replay_wal(table_name, data)
+    
     filepath = f"data/{table_name}.json"
     try:
         with open(filepath, 'r') as f:
-            return json.load(f)
+            data = json.load(f)
     except FileNotFoundError:
-        return []
+        data = []
+    return _replay_wal(table_name, data)
+
+def save_table_data(table_name, data, file_format="json"):
+    """
+    Сохраняет данные таблицы в основной файл (контрольная точка).
+    
+    Файл перезаписывается атомарно, после чего журнал изменений очищается,
+    так как все его записи уже отражены в основном файле. Каталог data
+    сбрасывается на диск после замены и после удаления журнала; если сбой
+    случится между ними, журнал применяется к новому файлу повторно - это
+    безопасно (см. _replay_wal_columnar).
+    Для формата 'binary' данные должны быть колоночной таблицей.
+    """
+    tmp_path, filepath = prepare_table_file(table_name, data, file_format)
+    os.replace(tmp_path, filepath)
+    _fsync_dir("data")
+    try:
+        os.remove(_wal_path(table_name))
+    except FileNotFoundError:
+        return
+    _fsync_dir("data")
+
+def remove_table_file(table_name, file_format="json"):
+    """Удаляет основной файл таблицы в заданном формате"""
+    try:
+        os.remove(table_path(table_name, file_format))
+    except FileNotFoundError:
+        pass
+
+def table_files(table_name):
+    """Файлы таблицы на диске: основные файлы всех форматов и журнал"""
+    return [table_path(table_name, file_format) for file_format in FILE_FORMATS] + [
+        _wal_path(table_name)
+    ]
 
-def save_table_data(table_name, data):
-    """Сохраняет данные таблицы в JSON файл"""
+def remove_table_files(table_name):
+    """Удаляет все файлы таблицы (основные файлы и журнал)"""
+    for filepath in table_files(table_name):
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+    if os.path.isdir("data"):
+        _fsync_dir("data")
+
+def export_table(data, filepath, columns):
+    """
+    Выгружает данные таблицы в файл.
+    
+    Формат определяется расширением: .tbl - бинарный, иначе JSON.
+    """
+    if filepath.endswith(".tbl"):
+        if not isinstance(data, ColumnarTable):
+            data = ColumnarTable.from_records(columns, data)
+        write_table(filepath, data)
+    else:
+        _atomic_write_json(filepath, data)
+
+def _csv_converter(col_type):
+    """Возвращает функцию преобразования текста CSV в значение типа столбца"""
+    if col_type == "int":
+        return int
+    if col_type == "bool":
+        def to_bool(text):
+            lowered = text.strip().lower()
+            if lowered not in ("true", "false"):
+                raise ValueError(f"ожидается true/false, получено {text!r}")
+            return lowered == "true"
+        return to_bool
+    return str
+
+def _iter_csv(filepath, columns):
+    converters = {
+        name: _csv_converter(col_type) for name, col_type in parse_columns(columns)
+    }
+    with open(filepath, 'r', newline='') as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            row.pop("ID", None)
+            try:
+                yield {
+                    name: converters[name](value) if name in converters else value
+                    for name, value in row.items()
+                }
+            except ValueError as e:
+                raise ValueError(f"{filepath}, строка {line_no}: {e}") from None
+
+def _iter_jsonl(filepath):
+    with open(filepath, 'r') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                record.pop("ID", None)
+                yield record
+
+def _iter_json(filepath):
+    with open(filepath, 'r') as f:
+        records = json.load(f)
+    for record in records:
+        record.pop("ID", None)
+        yield record
+
+def _iter_tbl(filepath):
+    for record in BinaryTableFile(filepath).to_table():
+        record.pop("ID", None)
+        yield record
+
+def iter_import_file(filepath, columns):
+    """
+    Потоково читает записи для импорта из файла.
+    
+    Формат определяется расширением: .csv (первая строка - имена столбцов,
+    значения приводятся к типам схемы), .jsonl (JSON-объект на строку),
+    .json (массив объектов) или .tbl (бинарный файл таблицы).
+    Столбец ID из файла игнорируется - ID назначаются заново.
+    
+    Args:
+        filepath (str): Путь к файлу
+        columns (list): Столбцы таблицы в формате ['имя:тип', ...]
+    
+    Returns:
+        iterator: Записи {'столбец': значение} без ID
+    """
+    if filepath.endswith(".csv"):
+        yield from _iter_csv(filepath, columns)
+    elif filepath.endswith(".jsonl"):
+        yield from _iter_jsonl(filepath)
+    elif filepath.endswith(".json"):
+        yield from _iter_json(filepath)
+    elif filepath.endswith(".tbl"):
+        yield from _iter_tbl(filepath)
+    else:
+        raise ValueError(f"Неподдерживаемый формат файла: {filepath}")
+
+def _wal_payload(entries):
+    return "".join(
+        json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries
+    ).encode()
+
+def append_wal(table_name, entries, data=None, file_format="json"):
+    """
+    Дописывает изменения таблицы в журнал упреждающей записи.
+    
+    Args:
+        table_name (str): Имя таблицы
+        entries (list): Записи журнала (по одной на операцию)
+        data (list, optional): Текущие данные таблицы; если журнал превысил
+            WAL_CHECKPOINT_BYTES, по ним создается контрольная точка
+        file_format (str): Формат основного файла таблицы
+    """
+    if not entries:
+        return
     os.makedirs("data", exist_ok=True)
-    filepath = f"data/{table_name}.json"
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
\ No newline at end of file
+    wal_path = _wal_path(table_name)
+    payload = _wal_payload(entries)
+    with open(wal_path, 'a+b') as f:
+        # Отделяем оборванную при сбое строку, чтобы не испортить новую запись
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                payload = b"\n" + payload
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    if data is not None and os.path.getsize(wal_path) >= WAL_CHECKPOINT_BYTES:
+        save_table_data(table_name, data, file_format)
+
+def file_signature(filepath):
+    """Возвращает (mtime_ns, размер) файла или None, если файла нет"""
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def table_signature(table_name):
+    """Дешевый отпечаток состояния таблицы на диске (основной файл и журнал)"""
+    return tuple(
+        file_signature(table_path(table_name, file_format))
+        for file_format in FILE_FORMATS
+    ) + (file_signature(_wal_path(table_name)),)
+
+def prepare_table_file(table_name, data, file_format="json"):
+    """
+    Записывает новое содержимое основного файла таблицы во временный файл.
+    
+    Returns:
+        tuple: (временный файл, основной файл)
+    """
+    os.makedirs("data", exist_ok=True)
+    filepath = table_path(table_name, file_format)
+    tmp_path = f"{filepath}.tmp"
+    if file_format == "binary":
+        write_table_file(tmp_path, data)
+    else:
+        _write_json_file(tmp_path, data)
+    return tmp_path, filepath
+
+def prepare_wal(table_name, entries):
+    """
+    Записывает во временный файл журнал таблицы, дополненный записями entries.
+    
+    Returns:
+        tuple: (временный файл, файл журнала)
+    """
+    os.makedirs("data", exist_ok=True)
+    wal_path = _wal_path(table_name)
+    try:
+        with open(wal_path, 'rb') as f:
+            existing = f.read()
+    except FileNotFoundError:
+        existing = b""
+    if existing and not existing.endswith(b"\n"):
+        existing += b"\n"  # отделяем оборванную при сбое строку
+    tmp_path = f"{wal_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(existing)
+        f.write(_wal_payload(entries))
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path, wal_path
+
+def prepare_table_commit(table_name, data, entries, file_format="json",
+                         checkpoint=False):
+    """
+    Готовит во временных файлах фиксацию изменений таблицы.
+    
+    Обычно это журнал, дополненный записями entries; если журнал превысил
+    бы WAL_CHECKPOINT_BYTES или checkpoint=True, вместо него целиком
+    записывается основной файл таблицы, а журнал подлежит удалению.
+    
+    Returns:
+        tuple: ((временный файл, основной файл), файл для удаления или None)
+    """
+    if not checkpoint:
+        tmp_path, wal_path = prepare_wal(table_name, entries)
+        if os.path.getsize(tmp_path) < WAL_CHECKPOINT_BYTES:
+            return (tmp_path, wal_path), None
+        os.remove(tmp_path)
+    return prepare_table_file(table_name, data, file_format), _wal_path(table_name)
+
+def prepare_metadata(data, filepath="db_meta.json"):
+    """
+    Записывает метаданные во временный файл.
+    
+    Returns:
+        tuple: (временный файл, файл метаданных)
+    """
+    tmp_path = f"{filepath}.tmp"
+    _write_metadata_file(data, tmp_path)
+    return tmp_path, filepath
+
+def _apply_commit(marker):
+    for tmp_path, filepath in marker["renames"]:
+        # После сбоя часть файлов могла быть уже переименована
+        if os.path.exists(tmp_path):
+            os.replace(tmp_path, filepath)
+    for filepath in marker["remove"]:
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+    paths = [path for _, path in marker["renames"]] + marker["remove"]
+    for directory in {os.path.dirname(path) for path in paths}:
+        _fsync_dir(directory)
+    os.remove(COMMIT_MARKER)
+
+def commit_files(renames, removals=()):
+    """
+    Атомарно фиксирует изменения нескольких файлов.
+    
+    Временные файлы уже записаны и сброшены на диск. Сначала на диск
+    записывается маркер фиксации со списком замен - это точка фиксации:
+    после сбоя recover_commit() доводит замены до конца. Затем временные
+    файлы заменяют основные, удаляются файлы removals (журналы таблиц,
+    свернутых в основной файл), и маркер удаляется.
+    
+    Args:
+        renames (list): Пары (временный файл, основной файл)
+        removals (iterable): Файлы, удаляемые после замены
+    """
+    os.makedirs("data", exist_ok=True)
+    marker = {"renames": [list(pair) for pair in renames],
+              "remove": list(removals)}
+    _atomic_write_json(COMMIT_MARKER, marker)
+    _fsync_dir("data")
+    _apply_commit(marker)
+
+def recover_commit():
+    """
+    Завершает фиксацию транзакции, прерванную сбоем.
+    
+    Если маркера фиксации нет, временные файлы незавершенной транзакции
+    просто игнорируются (будут перезаписаны).
+    
+    Returns:
+        bool: True, если была восстановлена прерванная фиксация
+    """
+    try:
+        with open(COMMIT_MARKER, 'r') as f:
+            marker = json.load(f)
+    except FileNotFoundError:
+        return False
+    _apply_commit(marker)
+    return True
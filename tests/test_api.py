@@ -0,0 +1,35 @@
+import pytest
+
+from src.primitive_db.api import Database
+from src.primitive_db.errors import ValidationError
+
+TOO_BIG = 2**63
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = Database()
+    table = db.create_table("t", {"n": int})
+    db.session.metadata["t"]["storage"] = "columnar"
+    table.insert(n=1)
+    table.create_index("n")
+    return table
+
+
+def test_insert_out_of_range_int_raises_validation_error(table):
+    with pytest.raises(ValidationError, match="64-битный int"):
+        table.insert_many([{"n": 2}, {"n": TOO_BIG}])
+    assert list(table.select()) == [{"ID": 1, "n": 1}]
+
+
+def test_update_out_of_range_int_keeps_index(table):
+    with pytest.raises(ValidationError, match="64-битный int"):
+        table.update({"n": TOO_BIG}, "n = 1")
+    assert list(table.select("n = 1")) == [{"ID": 1, "n": 1}]
+
+
+def test_statement_out_of_range_int_raises_validation_error(table):
+    with pytest.raises(ValidationError, match="64-битный int"):
+        table._db.execute("insert into t values (?)", TOO_BIG)
+    assert table.count() == 1
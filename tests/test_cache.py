@@ -0,0 +1,38 @@
+import pytest
+
+from src.primitive_db import core
+from src.primitive_db.cache import query_cache
+from src.primitive_db.core import iter_select
+
+RECORDS = [{"ID": i, "n": i % 3} for i in range(1, 11)]
+WHERE = (">", "ID", 0)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    query_cache.clear()
+    yield
+    query_cache.clear()
+
+
+def test_select_result_is_cached():
+    key = ("t", 1, "all")
+    assert len(list(iter_select(RECORDS, WHERE, cache_key=key))) == 10
+    assert query_cache.get(key) == RECORDS
+
+
+def test_result_over_max_rows_is_not_collected(monkeypatch):
+    monkeypatch.setattr(query_cache, "max_rows", 4)
+    key = ("t", 1, "all")
+    assert len(list(iter_select(RECORDS, WHERE, cache_key=key))) == 10
+    assert query_cache.get(key) is None
+    assert query_cache.stats()["rows"] == 0
+
+
+def test_stream_over_max_rows_skips_cache_write(monkeypatch):
+    monkeypatch.setattr(query_cache, "max_rows", 4)
+    results = []
+    stream = core._cached_stream(iter(range(10)), "k", lambda r: r,
+                                 results.append)
+    assert list(stream) == list(range(10))
+    assert results == []
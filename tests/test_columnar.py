@@ -0,0 +1,71 @@
+import pytest
+
+from src.primitive_db import core
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.core import insert_records, iter_select
+from src.primitive_db.indexes import build_index
+from src.primitive_db.planner import choose_path
+
+COLUMNS = ["ID:int", "name:str", "n:int", "flag:bool"]
+
+
+def _table():
+    metadata = {"t": {"columns": COLUMNS, "storage": "columnar"}}
+    table = ColumnarTable(COLUMNS)
+    insert_records(metadata, "t", [{"name": "a", "n": 1, "flag": True}], table)
+    return metadata, table
+
+
+def test_insert_out_of_range_int_leaves_table_unchanged():
+    metadata, table = _table()
+    with pytest.raises(ValueError, match="64-битный int"):
+        insert_records(metadata, "t",
+                       [{"name": "b", "n": 99999999999999999999999,
+                         "flag": False}], table)
+    lengths = {name: len(table.column(name)) for name in ("ID", "name", "n")}
+    assert lengths == {"ID": 1, "name": 1, "n": 1}
+    assert len(table) == 1
+    assert metadata["t"]["next_id"] == 2
+
+
+def test_rollback_truncates_columns(monkeypatch):
+    monkeypatch.setattr(core, "BATCH_SIZE", 1)  # первая пачка уже записана
+    metadata, table = _table()
+    records = [{"name": "b", "n": 2, "flag": False},
+               {"name": "c", "n": 2**63, "flag": True}]
+    with pytest.raises(ValueError):
+        insert_records(metadata, "t", records, table)
+    assert [len(table.column(name)) for name, _ in table.schema] == [1] * 4
+    insert_records(metadata, "t", [{"name": "d", "n": 4, "flag": False}], table)
+    assert list(iter_select(table)) == [
+        {"ID": 1, "name": "a", "n": 1, "flag": True},
+        {"ID": 2, "name": "d", "n": 4, "flag": False},
+    ]
+
+
+def test_truncate_after_partial_batch():
+    table = ColumnarTable(COLUMNS)
+    table.extend([{"ID": i, "name": str(i), "n": i, "flag": i % 2 == 0}
+                  for i in range(1, 12)])
+    table.delete([2])
+    table.truncate(9)
+    assert len(table) == 8
+    assert [len(table.column(name)) for name, _ in table.schema] == [9] * 4
+    table.extend([{"ID": 12, "name": "12", "n": 12, "flag": True}])
+    assert table.row(9) == {"ID": 12, "name": "12", "n": 12, "flag": True}
+    assert [row["flag"] for row in table] == [
+        False, True, True, False, True, False, True, False, True,
+    ]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_index_select_keeps_table_order(columnar):
+    metadata = {"t": {"columns": COLUMNS}}
+    table = ColumnarTable(COLUMNS) if columnar else []
+    records = [{"name": "a", "n": i % 10, "flag": True} for i in range(1, 101)]
+    insert_records(metadata, "t", records, table)
+    indexes = {"n": build_index("n", "sorted", table)}
+    where = ("in", "n", (2, 1))
+    assert choose_path(where, indexes, None, len(table)).node is not None
+    rows = iter_select(table, where, indexes, offset=1, limit=3)
+    assert [row["ID"] for row in rows] == [2, 11, 12]
@@ -0,0 +1,41 @@
+import pytest
+
+from src.primitive_db import core
+from src.primitive_db.core import delete_records
+from src.primitive_db.indexes import build_indexes
+
+METADATA = {"t": {"indexes": {"n": "hash"}}}
+
+
+def _table(count=20):
+    data = [{"ID": i, "n": i % 3} for i in range(1, count + 1)]
+    return data, build_indexes(METADATA, "t", data)
+
+
+def test_point_delete_removes_in_place():
+    data, indexes = _table()
+    journal = []
+    result, count = delete_records(data, ("=", "ID", 5), indexes, journal)
+    assert count == 1 and result is data
+    assert [record["ID"] for record in data] == [i for i in range(1, 21) if i != 5]
+    assert indexes["ID"].lookup(5) == []
+    assert 5 not in [record["ID"] for record in indexes["n"].lookup(2)]
+    assert journal == [{"op": "delete", "ids": [5]}]
+
+
+@pytest.mark.parametrize("threshold", [0, 64])
+def test_delete_many(monkeypatch, threshold):
+    monkeypatch.setattr(core, "POINT_DELETE_ROWS", threshold)
+    data, indexes = _table()
+    result, count = delete_records(data, ("=", "n", 0), indexes)
+    assert count == 6
+    assert [record["ID"] for record in result] == [
+        i for i in range(1, 21) if i % 3]
+
+
+def test_point_delete_out_of_id_order():
+    data, indexes = _table(5)
+    data.reverse()
+    result, count = delete_records(data, ("=", "ID", 2), indexes)
+    assert count == 1
+    assert [record["ID"] for record in result] == [5, 4, 3, 1]
@@ -0,0 +1,41 @@
+import pytest
+
+from src.primitive_db.api import Database
+from src.primitive_db.engine import run_script
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _values():
+    db = Database()
+    try:
+        return [record["n"] for record in db.table("t").select()]
+    finally:
+        db.close()
+
+
+def test_script_stops_on_error_and_discards_uncommitted(capsys):
+    code = run_script([
+        "create_table t n:int",
+        "insert into t values (1)",
+        "commit",
+        "insert into t values (2)",
+        'insert into t values ("x")',
+        "insert into t values (3)",
+    ])
+    assert code == 1
+    assert "строка 5" in capsys.readouterr().out
+    assert _values() == [1]
+
+
+def test_script_unknown_table_fails():
+    assert run_script(["select from missing"]) == 1
+
+
+def test_script_success_saves_changes():
+    assert run_script(["create_table t n:int", "insert into t values (1)"]) == 0
+    assert _values() == [1]
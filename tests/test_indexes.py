@@ -0,0 +1,51 @@
+from src.primitive_db.indexes import HashIndex, SortedIndex, build_index
+
+RECORDS = [{"ID": i, "flag": i % 2 == 0, "n": i % 4} for i in range(1, 9)]
+
+
+def _ids(refs):
+    return [ref["ID"] for ref in refs]
+
+
+def test_hash_index_removes_by_record_id():
+    index = build_index("flag", "hash", RECORDS)
+    index.remove(True, dict(RECORDS[1]))  # копия записи с ID=2
+    index.remove(True, RECORDS[3])
+    assert _ids(index.lookup(True)) == [6, 8]
+    for record in RECORDS[::2]:
+        index.remove(False, record)
+    assert index.lookup(False) == []
+    assert [value for value, _ in index.items()] == [True]
+
+
+def test_hash_index_with_row_positions():
+    index = HashIndex("n")
+    for pos in range(6):
+        index.add(pos % 2, pos)
+    index.remove(0, 2)
+    assert index.lookup(0) == [0, 4]
+
+
+def test_sorted_index_applies_pending_changes_on_lookup():
+    index = build_index("n", "sorted", RECORDS)
+    index.remove(1, RECORDS[0])
+    index.add(5, RECORDS[0])  # ID=1: n 1 -> 5
+    added = {"ID": 9, "n": 2}
+    index.add(2, added)
+    assert _ids(index.lookup(1)) == [5]
+    assert _ids(index.lookup(2)) == [2, 6, 9]  # новые - после прежних
+    assert _ids(index.range(low=3)) == [3, 7, 1]
+    assert _ids(index.ordered(descending=True))[:2] == [1, 3]
+
+
+def test_sorted_index_remove_after_pending_add():
+    index = SortedIndex("n")
+    index.add(1, 0)
+    index.add(2, 1)
+    index.remove(2, 1)
+    index.add(3, 1)
+    assert list(index.ordered()) == [0, 1]
+    assert index.lookup(2) == []
+    index.remove(3, 1)
+    index.remove(1, 0)
+    assert list(index.ordered()) == []
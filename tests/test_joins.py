@@ -0,0 +1,67 @@
+from collections import Counter
+
+import pytest
+
+from src.primitive_db.api import Database
+
+LEFT = [{"k": k, "x": i} for i, k in enumerate([1, 1, 2, 3, 5])]
+RIGHT = [{"k": k, "y": i} for i, k in enumerate([1, 2, 2, 4, 1])]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = Database()
+    db.create_table("a", {"k": int, "x": int}).insert_many(LEFT)
+    db.create_table("b", {"k": int, "y": int}).insert_many(RIGHT)
+    yield db
+    db.close()
+
+
+def _pairs(records):
+    return Counter((record["a.x"], record["b.y"]) for record in records)
+
+
+def _expected(condition=lambda left, right: True):
+    return Counter((left["x"], right["y"]) for left in LEFT for right in RIGHT
+                   if left["k"] == right["k"] and condition(left, right))
+
+
+@pytest.mark.parametrize("indexed", [None, "a", "b"])
+def test_join_duplicate_keys(db, indexed):
+    if indexed:
+        db.table(indexed).create_index("k")
+    records = list(db.execute("select from a join b on a.k = b.k"))
+    assert _pairs(records) == _expected()
+    assert len(records) == 6  # 1: 2 x 2, 2: 1 x 2, 3 и 5 без пары
+    assert set(records[0]) == {"a.ID", "a.k", "a.x", "b.ID", "b.k", "b.y"}
+
+
+def test_join_with_conditions(db):
+    records = db.execute("select from a join b on a.k = b.k "
+                         "where x < 2 and (b.y > 3 or a.k = 2)")
+    assert _pairs(records) == _expected(
+        lambda left, right: left["x"] < 2 and (right["y"] > 3 or left["k"] == 2))
+
+
+def test_join_limit_offset(db):
+    records = list(db.execute("select from a join b on a.k = b.k limit 2 offset 1"))
+    assert len(records) == 2
+
+
+@pytest.mark.parametrize("empty", ["a", "b"])
+def test_join_with_empty_side(db, empty):
+    db.table(empty).delete()
+    assert list(db.execute("select from a join b on a.k = b.k")) == []
+
+
+def test_join_filtered_to_empty(db):
+    assert list(db.execute("select from a join b on a.k = b.k where b.y > 10")) == []
+
+
+def test_join_skips_empty_join_values(db):
+    db.create_table("c", {"k": int, "z": int})
+    db.session.table("c", write=True).data.append({"ID": 1, "k": None, "z": 0})
+    db.table("c").insert(k=1, z=1)
+    records = list(db.execute("select from a join c on a.k = c.k"))
+    assert sorted(record["c.z"] for record in records) == [1, 1]
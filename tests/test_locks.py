@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+
+import pytest
+
+from src.primitive_db.api import Database
+from src.primitive_db.locks import FileLock, LockError
+
+fork = multiprocessing.get_context("fork")
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = Database()
+    db.create_table("t", {"n": int})
+    db.close()
+    return tmp_path
+
+
+def _insert_rows(worker, count):
+    db = Database()
+    table = db.table("t")
+    for i in range(count):
+        table.insert(n=worker * 1000 + i)
+    db.close()
+
+
+def test_concurrent_writers_keep_all_rows():
+    workers = [fork.Process(target=_insert_rows, args=(worker, 25))
+               for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(60)
+        assert process.exitcode == 0
+
+    db = Database()
+    records = list(db.table("t").select())
+    assert len(records) == 100
+    assert sorted(record["ID"] for record in records) == list(range(1, 101))
+    assert {record["n"] for record in records} == {
+        worker * 1000 + i for worker in range(4) for i in range(25)
+    }
+    db.close()
+
+
+def test_reader_sees_changes_of_other_process():
+    db = Database()
+    assert db.table("t").count() == 0
+    process = fork.Process(target=_insert_rows, args=(1, 3))
+    process.start()
+    process.join(60)
+    assert [record["n"] for record in db.table("t").select()] == [1000, 1001, 1002]
+    db.close()
+
+
+def _lock_pair(first, second, locked, proceed, results):
+    lock = FileLock(first)
+    lock.acquire()
+    locked.set()
+    proceed.wait(10)
+    other = FileLock(second)
+    try:
+        other.acquire()
+        results.put("ok")
+        other.close()
+    except LockError:
+        results.put("deadlock")
+    lock.close()
+
+
+def test_deadlock_raises_lock_error():
+    os.makedirs("data", exist_ok=True)
+    results = fork.Queue()
+    proceed = fork.Event()
+    events = [fork.Event(), fork.Event()]
+    processes = [
+        fork.Process(target=_lock_pair,
+                     args=("data/a.lock", "data/b.lock", events[0], proceed,
+                           results)),
+        fork.Process(target=_lock_pair,
+                     args=("data/b.lock", "data/a.lock", events[1], proceed,
+                           results)),
+    ]
+    for process in processes:
+        process.start()
+    for event in events:
+        assert event.wait(10)
+    proceed.set()
+    for process in processes:
+        process.join(30)
+    assert sorted(results.get(timeout=5) for _ in processes) == ["deadlock", "ok"]
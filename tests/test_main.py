@@ -0,0 +1,16 @@
+import pytest
+
+from src.primitive_db import main as cli
+
+
+@pytest.mark.parametrize("argv, expected", [
+    ([], 0.0),
+    (["--flush-interval", "2.5"], 2.5),
+])
+def test_repl_flush_interval_option(monkeypatch, argv, expected):
+    calls = []
+    monkeypatch.setattr(cli, "run",
+                        lambda flush_interval, assume_yes: calls.append(
+                            (flush_interval, assume_yes)))
+    cli.main(argv + ["--yes"])
+    assert calls == [(expected, True)]
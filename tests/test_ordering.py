@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from src.primitive_db import ordering
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.core import iter_select
+from src.primitive_db.indexes import build_index
+from src.primitive_db.ordering import order_records, sort_records, top_k
+
+COLUMNS = ["ID:int", "n:int"]
+
+_random = random.Random(23)
+RECORDS = [{"ID": i, "n": _random.randrange(10)} for i in range(1, 101)]
+
+
+def _expected(descending=False, records=RECORDS):
+    """Устойчивая сортировка: равные значения - в порядке таблицы"""
+    return sorted(records, key=lambda record: record["n"], reverse=descending)
+
+
+def _ids(records):
+    return [record["ID"] for record in records]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_top_k(descending):
+    expected = _expected(descending)[:7]
+    assert _ids(top_k(RECORDS, "n", 7, descending)) == _ids(expected)
+
+
+def test_empty_values_first():
+    records = [{"ID": 1, "n": 2}, {"ID": 2, "n": None}, {"ID": 3, "n": 1}]
+    assert _ids(sort_records(records, "n")) == [2, 3, 1]
+    assert _ids(top_k(records, "n", 1)) == [2]
+
+
+@pytest.fixture
+def spills(monkeypatch):
+    """Временные файлы, созданные внешней сортировкой"""
+    files = []
+    real_spill = ordering._spill
+
+    def spill(chunk):
+        files.append(real_spill(chunk))
+        return files[-1]
+
+    monkeypatch.setattr(ordering, "_spill", spill)
+    return files
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_external_sort_spills_and_merges(spills, descending):
+    result = list(sort_records(RECORDS, "n", descending, buffer_rows=8))
+    assert _ids(result) == _ids(_expected(descending))
+    assert len(spills) == 13
+    assert all(f.closed for f in spills)
+
+
+def test_abandoned_external_sort_closes_files(spills):
+    records = sort_records(RECORDS, "n", buffer_rows=8)
+    next(records)
+    records.close()
+    assert spills and all(f.closed for f in spills)
+
+
+def test_small_sort_does_not_spill(monkeypatch):
+    monkeypatch.setattr(ordering, "_spill", None)
+    assert _ids(sort_records(RECORDS, "n")) == _ids(_expected())
+
+
+def test_order_records_offset_limit():
+    expected = _ids(_expected(True))
+    assert _ids(order_records(RECORDS, "n", True, offset=5, limit=10)) == expected[5:15]
+    assert _ids(order_records(RECORDS, "n", True, offset=95)) == expected[95:]
+
+
+def _table(columnar):
+    records = [dict(record) for record in RECORDS]
+    data = ColumnarTable.from_records(COLUMNS, records) if columnar else records
+    return data, {"n": build_index("n", "sorted", data),
+                  "ID": build_index("ID", "unique", data)}
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [None, 5])
+def test_order_by_index_walk_matches_sort(columnar, descending, limit):
+    data, indexes = _table(columnar)
+    walked = iter_select(data, None, indexes, limit=limit, offset=3,
+                         order_by=("n", descending))
+    sorted_ = iter_select(data, None, {}, limit=limit, offset=3,
+                          order_by=("n", descending))
+    stop = None if limit is None else 3 + limit
+    expected = _ids(_expected(descending))[3:stop]
+    assert _ids(walked) == expected
+    assert _ids(sorted_) == expected
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_order_by_id_desc_with_condition(columnar):
+    data, indexes = _table(columnar)
+    records = iter_select(data, (">", "n", 6), indexes, limit=4,
+                          order_by=("ID", True))
+    expected = [record["ID"] for record in reversed(RECORDS) if record["n"] > 6]
+    assert _ids(records) == expected[:4]
@@ -0,0 +1,22 @@
+from src.primitive_db.api import Database
+from src.primitive_db.parser import normalize_command
+
+
+def test_normalize_keeps_quoted_literals_as_strings():
+    assert normalize_command('insert into t values ("", 7)')[1] == ["", 7]
+    assert normalize_command('insert into t values ("?1", 7)')[1] == ["?1", 7]
+
+
+def test_insert_empty_and_question_mark_strings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = Database()
+    db.create_table("t", ["name:str", "n:int"])
+    db.execute('insert into t values ("", 7)')
+    db.execute('insert into t values ("?1", 8)')
+    assert list(db.execute("select from t")) == [
+        {"ID": 1, "name": "", "n": 7},
+        {"ID": 2, "name": "?1", "n": 8},
+    ]
+    assert list(db.execute('select from t where name = "?1"')) == [
+        {"ID": 2, "name": "?1", "n": 8},
+    ]
@@ -0,0 +1,91 @@
+import pytest
+
+from src.primitive_db.engine import run_script
+from src.primitive_db.indexes import build_index
+from src.primitive_db.planner import choose_path, collect_stats, selectivity
+
+COLUMNS = ["ID:int", "n:int", "flag:bool"]
+RECORDS = [{"ID": i, "n": i % 100, "flag": i % 2 == 0} for i in range(1, 1001)]
+STATS = collect_stats(RECORDS, COLUMNS)
+
+
+def _indexes(**kinds):
+    indexes = {"ID": build_index("ID", "unique", RECORDS)}
+    indexes.update((column, build_index(column, kind, RECORDS))
+                   for column, kind in kinds.items())
+    return indexes
+
+
+def test_collect_stats():
+    assert STATS["rows"] == 1000
+    assert STATS["columns"]["n"] == {"distinct": 100, "min": 0, "max": 99}
+    assert STATS["columns"]["flag"] == {"distinct": 2}
+
+
+def test_selectivity_uses_stats():
+    assert selectivity(("=", "n", 5), STATS, 1000) == pytest.approx(0.01)
+    assert selectivity(("=", "n", 500), STATS, 1000) == 0.0
+    assert selectivity(("<=", "n", 9), STATS, 1000) == pytest.approx(0.1)
+
+
+def test_selective_equality_uses_index():
+    path = choose_path(("=", "n", 5), _indexes(n="hash"), STATS, 1000)
+    assert path.kind == "index"
+    assert path.node == ("=", "n", 5)
+
+
+def test_unselective_equality_scans():
+    path = choose_path(("=", "flag", True), _indexes(flag="hash"), STATS, 1000)
+    assert path.kind == "scan"
+    assert path.node is None
+
+
+def test_id_equality_uses_primary_key():
+    path = choose_path(("=", "ID", 7), _indexes(), STATS, 1000)
+    assert path.kind == "id"
+
+
+def test_range_needs_sorted_index():
+    condition = ("<", "n", 3)
+    assert choose_path(condition, _indexes(n="hash"), STATS, 1000).kind == "scan"
+    path = choose_path(condition, _indexes(n="sorted"), STATS, 1000)
+    assert path.kind == "index"
+    assert path.indexes == (("n", "sorted"),)
+
+
+def test_or_unions_indexes():
+    condition = ("or", (("=", "n", 1), ("=", "n", 2)))
+    path = choose_path(condition, _indexes(n="hash"), STATS, 1000)
+    assert path.describe() == "объединение индексов hash по n, hash по n"
+    assert path.candidates == pytest.approx(20)
+
+
+def test_or_with_unindexed_operand_scans():
+    condition = ("or", (("=", "n", 1), ("=", "flag", True)))
+    assert choose_path(condition, _indexes(n="hash"), STATS, 1000).kind == "scan"
+
+
+def test_and_picks_most_selective_operand():
+    condition = ("and", (("=", "flag", True), ("=", "n", 4)))
+    path = choose_path(condition, _indexes(n="hash", flag="hash"), STATS, 1000)
+    assert path.node == ("=", "n", 4)
+
+
+def test_explain_output(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    with open("rows.jsonl", "w") as f:
+        f.writelines(f'{{"n": {i % 100}}}\n' for i in range(1000))
+    assert run_script([
+        "create_table t n:int",
+        "import t rows.jsonl",
+        "create_index t n",
+        "analyze t",
+        "explain select from t where n = 5",
+        "explain select from t where n != 5",
+    ]) == 0
+    out = capsys.readouterr().out
+    assert 'План: select из "t", строк: 1000, статистика собрана' in out
+    assert "Доступ: индекс hash по n, кандидатов ~10" in out
+    assert "Отвергнуто: полный просмотр, кандидатов ~1000" in out
+    assert "Доступ: полный просмотр, кандидатов ~1000" in out
+    assert "Факт: просмотрено 10, найдено 10" in out
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.primitive_db.server import Server
+from src.primitive_db.session import Session
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = Server(Session())
+    server.run_command("create_table t name:str n:int")
+    yield server
+    server.session.close()
+
+
+@pytest.mark.parametrize("command", [
+    'insert into t values (1, "x")',
+    "update t set missing = 1 where ID = 1",
+    "create_table t name:str",
+    'insert into missing values ("a", 1)',
+    "select from missing",
+    "drop_table missing",
+    "unknown_command",
+])
+def test_failed_commands_are_errors(server, command):
+    response, keep = server.run_command(command)
+    assert response["ok"] is False
+    assert response["error"]
+    assert keep
+
+
+def test_successful_commands(server):
+    response, _ = server.run_command('insert into t values ("a", 1)')
+    assert response == {
+        "ok": True, "message": 'Запись с ID=1 успешно добавлена в таблицу "t".',
+    }
+    response, _ = server.run_command("select from t")
+    assert response == {"ok": True, "columns": ["ID", "name", "n"],
+                        "rows": [[1, "a", 1]]}
+
+
+def test_blocking_command_does_not_stall_event_loop(server, monkeypatch):
+    release = threading.Event()
+
+    def slow_command(command):
+        release.wait(5)  # например, ожидание блокировки другого процесса
+        return {"ok": True, "message": ""}, True
+
+    monkeypatch.setattr(server, "run_command", slow_command)
+
+    async def scenario():
+        task = asyncio.ensure_future(server.submit("select from t"))
+        await asyncio.sleep(0.05)
+        assert not task.done()  # цикл событий свободен, пока команда ждет
+        release.set()
+        return await task
+
+    assert asyncio.run(scenario()) == ({"ok": True, "message": ""}, True)
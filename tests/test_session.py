@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+from src.primitive_db.api import Database
+from src.primitive_db.utils import prepare_table_file
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _ids(db, name):
+    return [record["ID"] for record in db.table(name).select()]
+
+
+def test_drop_table_removes_files(workdir):
+    db = Database()
+    db.create_table("t", {"n": int}).insert(n=1)
+    db.commit()
+    db.drop_table("t")
+    assert not [name for name in os.listdir("data")
+                if name.startswith("t.") and not name.endswith(".lock")]
+    db.create_table("t", {"n": int}).insert(n=2)
+    db.close()
+
+    db = Database()
+    assert list(db.table("t").select()) == [{"ID": 1, "n": 2}]
+    db.close()
+
+
+def test_drop_table_in_transaction_removes_files_on_commit(workdir):
+    db = Database()
+    db.create_table("t", {"n": int}).insert(n=1)
+    db.commit()
+    with db.transaction():
+        db.drop_table("t")
+        assert os.path.exists("data/t.wal")
+    assert not os.path.exists("data/t.wal")
+    db.close()
+
+
+def test_create_table_over_leftover_file_continues_ids(workdir):
+    os.makedirs("data")
+    with open("data/t.json", "w") as f:
+        json.dump([{"ID": 7, "n": 1}], f)
+    db = Database()
+    db.create_table("t", {"n": int}).insert(n=2)
+    assert _ids(db, "t") == [7, 8]
+    db.close()
+
+
+@pytest.mark.parametrize("file_format", ["json", "binary"])
+def test_wal_replay_after_crash_before_wal_removal(workdir, file_format):
+    db = Database()
+    table = db.create_table("t", {"n": int})
+    db.session.metadata["t"].update(storage="columnar", format=file_format)
+    table.insert_many([{"n": 1}, {"n": 2}])
+    table.insert(n=3)
+    table.update({"n": 20}, "n = 2")
+    db.commit()
+    # Сбой после замены основного файла, но до удаления журнала
+    tmp_path, filepath = prepare_table_file("t", db.session.table("t").data,
+                                            file_format)
+    os.replace(tmp_path, filepath)
+    assert os.path.exists("data/t.wal")
+    db.close()
+
+    db = Database()
+    assert [record["n"] for record in db.table("t").select()] == [1, 20, 3]
+    db.close()
@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+from src.primitive_db import utils
+from src.primitive_db.api import Database
+from src.primitive_db.utils import COMMIT_MARKER
+
+
+class Crash(Exception):
+    """Сбой процесса посреди фиксации"""
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = Database()
+    db.create_table("a", {"n": int}).insert(n=1)
+    db.create_table("b", {"n": int}).insert(n=1)
+    db.close()
+    return tmp_path
+
+
+def _values(db, name):
+    return [record["n"] for record in db.table(name).select()]
+
+
+def _commit_with_crash(monkeypatch, apply_commit):
+    """Выполняет транзакцию по двум таблицам, прерывая фиксацию apply_commit"""
+    db = Database()
+    db.begin()
+    db.table("a").insert(n=2)
+    db.table("b").update({"n": 10}, "n = 1")
+    with monkeypatch.context() as patch, pytest.raises(Crash):
+        patch.setattr(utils, "_apply_commit", apply_commit)
+        db.commit()
+
+
+def test_recover_commit_after_crash_before_renames(monkeypatch):
+    def crash(marker):
+        raise Crash
+
+    _commit_with_crash(monkeypatch, crash)
+    assert os.path.exists(COMMIT_MARKER)
+    db = Database()
+    assert not os.path.exists(COMMIT_MARKER)
+    assert _values(db, "a") == [1, 2]
+    assert _values(db, "b") == [10]
+    db.close()
+
+
+def test_recover_commit_after_partial_renames(monkeypatch):
+    def crash(marker):
+        tmp_path, filepath = marker["renames"][0]
+        os.replace(tmp_path, filepath)
+        raise Crash
+
+    _commit_with_crash(monkeypatch, crash)
+    with open(COMMIT_MARKER) as f:
+        renames = json.load(f)["renames"]
+    assert not os.path.exists(renames[0][0]) and os.path.exists(renames[1][0])
+    db = Database()
+    assert _values(db, "a") == [1, 2]
+    assert _values(db, "b") == [10]
+    assert not [name for name in os.listdir("data") if name.endswith(".tmp")]
+    db.close()
+
+
+def test_uncommitted_temporary_files_are_ignored(monkeypatch):
+    def crash(files, removals=()):
+        raise Crash
+
+    db = Database()
+    db.begin()
+    db.table("a").insert(n=2)
+    with monkeypatch.context() as patch, pytest.raises(Crash):
+        patch.setattr("src.primitive_db.session.commit_files", crash)
+        db.commit()
+    assert os.path.exists("data/a.wal.tmp")
+    db = Database()
+    assert _values(db, "a") == [1]
+    db.close()
+
+
+def test_rollback_restores_state():
+    db = Database()
+    with pytest.raises(Crash):
+        with db.transaction():
+            db.table("a").insert(n=2)
+            db.table("b").delete()
+            raise Crash
+    assert _values(db, "a") == [1]
+    assert _values(db, "b") == [1]
+    db.close()
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from src.primitive_db import utils
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.utils import append_wal, has_wal, load_table_data
+
+COLUMNS = ["ID:int", "n:int"]
+
+ENTRIES = [
+    {"op": "insert_many", "rows": [{"ID": 1, "n": 1}, {"ID": 2, "n": 2}]},
+    {"op": "insert", "row": {"ID": 3, "n": 3}},
+    {"op": "update", "ids": [2], "set": {"n": 20}},
+    {"op": "delete", "ids": [1]},
+]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _rows(data):
+    return [dict(record) for record in data]
+
+
+@pytest.mark.parametrize("file_format", ["json", "binary"])
+def test_replay_applies_journal(file_format):
+    append_wal("t", ENTRIES)
+    data = load_table_data("t", file_format, COLUMNS)
+    assert isinstance(data, ColumnarTable) == (file_format == "binary")
+    assert _rows(data) == [{"ID": 2, "n": 20}, {"ID": 3, "n": 3}]
+
+
+def test_replay_skips_torn_line():
+    append_wal("t", ENTRIES[:2])
+    with open("data/t.wal", "a") as f:
+        f.write('{"op": "insert", "row": {"ID": 4')  # оборванная при сбое строка
+    append_wal("t", [{"op": "delete", "ids": [3]}])
+    assert _rows(load_table_data("t")) == [{"ID": 1, "n": 1}, {"ID": 2, "n": 2}]
+
+
+def test_delete_all_then_insert():
+    append_wal("t", ENTRIES[:2] + [
+        {"op": "delete", "ids": None},
+        {"op": "insert", "row": {"ID": 4, "n": 4}},
+    ])
+    assert _rows(load_table_data("t")) == [{"ID": 4, "n": 4}]
+
+
+@pytest.mark.parametrize("file_format", ["json", "binary"])
+def test_checkpoint_replaces_journal(monkeypatch, file_format):
+    monkeypatch.setattr(utils, "WAL_CHECKPOINT_BYTES", 32)
+    data = [{"ID": 1, "n": 1}, {"ID": 2, "n": 2}]
+    if file_format == "binary":
+        data = ColumnarTable.from_records(COLUMNS, data)
+    append_wal("t", ENTRIES[:1], data, file_format)
+    assert not has_wal("t")
+    assert os.path.exists(utils.table_path("t", file_format))
+    assert _rows(load_table_data("t", file_format, COLUMNS)) == _rows(data)
+
+
+def test_small_journal_is_not_checkpointed():
+    append_wal("t", ENTRIES[:1], [{"ID": 1, "n": 1}])
+    assert has_wal("t")
+    assert not os.path.exists("data/t.json")
+    with open("data/t.wal") as f:
+        assert [json.loads(line) for line in f] == ENTRIES[:1]